@@ -0,0 +1,667 @@
+# -*- coding: utf-8 -*-
+"""
+Porównanie dokładności i wydajności funkcji z modułu skrypt.
+
+Uruchomienie:
+    python benchmark.py -n 100000
+    python benchmark.py -t zestaw --rozmiary 1e3 1e4 1e5 --zapisz baza.json
+    python benchmark.py -t zestaw --rozmiary 1e3 1e4 1e5 --porownaj baza.json
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from argparse import ArgumentParser
+from contextlib import contextmanager
+
+import numpy as np
+
+from skrypt import (Kafle, PamiecPodreczna, Transformacje, macierz_parametrow_helmerta, oblicz_stale_elipsoidy, przelicz_blok,
+                    przelicz_kafle, przetworz_plik, przetworz_przyrost, transformacja_helmerta, zbuduj_tablice_gk)
+
+GRS80 = [6378137.000, 0.00669438002290]
+
+
+def losowe_punkty(n, ziarno=0):
+    '''
+    Tworzy losowe punkty na całej kuli ziemskiej, łącznie z biegunami.
+
+    Parametry
+    ----------
+    n : INT
+        liczba punktów
+    ziarno : INT
+        ziarno generatora liczb losowych
+
+    Returns
+    -------
+    fi, lam, h : ARRAY
+        [st. dz., st. dz., m] - współrzędne wzorcowe
+    '''
+    rng = np.random.default_rng(ziarno)
+    fi = rng.uniform(-90, 90, n)
+    lam = rng.uniform(-180, 180, n)
+    h = rng.uniform(-100, 9000, n)
+    fi[:4] = [90, -90, 89.99999, -89.99999]
+    return fi, lam, h
+
+
+def czas(funkcja, *args, powtorzenia=3, **kwargs):
+    '''
+    Zwraca najkrótszy czas wykonania funkcji [s] z kilku powtórzeń.
+    '''
+    najlepszy = np.inf
+    for _ in range(powtorzenia):
+        t0 = time.perf_counter()
+        funkcja(*args, **kwargs)
+        najlepszy = min(najlepszy, time.perf_counter() - t0)
+    return najlepszy
+
+
+def porownanie_metod_xyz2flh(n=100000, n_skalarne=2000):
+    '''
+    Porównuje metody XYZ -> BLH (hirvonen, bowring, vermeille) pod względem
+    maksymalnego błędu fi, lam, h [mm] oraz liczby punktów na sekundę.
+    Wartości wzorcowe pochodzą z przeliczenia odwrotnego BLH -> XYZ.
+    Punkty na biegunach liczone są osobno, ponieważ algorytm Hirvonena nie obsługuje X = Y = 0.
+    '''
+    fi, lam, h = losowe_punkty(n)
+    geo = Transformacje(GRS80)
+    X, Y, Z = geo.odwrotny_hirvonen(fi, lam, h)
+    X[:2] = 0
+    Y[:2] = 0
+    biegun = np.zeros(n, dtype=bool)
+    biegun[:2] = True
+
+    print(f"{'metoda':>12} {'błąd fi [mm]':>14} {'błąd lam [mm]':>14} {'błąd h [mm]':>14} {'bieguny':>8} {'pkt/s':>14}")
+    for metoda in Transformacje.metody:
+        geo = Transformacje(GRS80, method=metoda)
+        with np.errstate(all='ignore'):
+            f, l, hh = geo.xyz2flh(X, Y, Z, output='radiany')
+        df = np.abs(f - np.radians(fi))[~biegun] * geo.a * 1000
+        dl = np.abs(np.angle(np.exp(1j * (l - np.radians(lam)))))[~biegun] * geo.a * np.cos(np.radians(fi[~biegun])) * 1000
+        dh = np.abs(hh - h)[~biegun] * 1000
+        bieguny = np.all(np.abs(hh[biegun] - h[biegun]) < 0.001)
+        with np.errstate(all='ignore'):
+            t = czas(geo.xyz2flh, X, Y, Z, output='radiany')
+        print(f"{metoda:>12} {df.max():>14.6f} {dl.max():>14.6f} {dh.max():>14.6f} {str(bieguny):>8} {n / t:>14.0f}")
+
+    geo = Transformacje(GRS80)
+    m = slice(2, 2 + n_skalarne)
+    t = czas(lambda: [geo.algorytm_hirvonena(x, y, z) for x, y, z in zip(X[m], Y[m], Z[m])], powtorzenia=1)
+    print(f"hirvonen, pętla skalarna: {n_skalarne / t:.0f} pkt/s")
+
+
+def benchmark_stalych(n=20000):
+    '''
+    Mikrobenchmark pojedynczych wywołań flh2PL1992 i flh2PL2000: czas z współdzielonymi
+    stałymi elipsoidy oraz czas, gdy stałe są wyznaczane od nowa przy każdym wywołaniu
+    (tak jak przed wprowadzeniem StaleElipsoidy).
+    '''
+    rng = np.random.default_rng(1)
+    fi = rng.uniform(48.9, 55, n).tolist()
+    lam = rng.uniform(13.5, 25.5, n).tolist()
+    geo = Transformacje(GRS80)
+
+    def bez_pamieci(funkcja):
+        for f, l in zip(fi, lam):
+            geo.stale = oblicz_stale_elipsoidy(geo.a, geo.e2)
+            funkcja(f, l)
+
+    def z_pamiecia(funkcja):
+        for f, l in zip(fi, lam):
+            funkcja(f, l)
+
+    print(f"{'funkcja':>12} {'bez stałych [us]':>18} {'ze stałymi [us]':>18} {'oszczędność':>12}")
+    for funkcja in (geo.flh2PL1992, geo.flh2PL2000):
+        t_bez = czas(bez_pamieci, funkcja) / n * 1e6
+        geo.stale = oblicz_stale_elipsoidy(geo.a, geo.e2)
+        t_z = czas(z_pamiecia, funkcja) / n * 1e6
+        print(f"{funkcja.__name__:>12} {t_bez:>18.2f} {t_z:>18.2f} {(t_bez - t_z) / t_bez:>12.1%}")
+
+
+def plik_testowy(sciezka, XYZ):
+    '''
+    Zapisuje punkty XYZ w formacie wejściowym skryptu (4 linie nagłówka, wartości rozdzielone przecinkiem).
+    '''
+    with open(sciezka, "w") as plik:
+        plik.write("Dane testowe\nX,Y,Z\n\n\n")
+        np.savetxt(plik, XYZ, fmt="%.3f", delimiter=",")
+
+
+def benchmark_rozwiazan(n=100000):
+    '''
+    Test regresyjny potoku wczytanie_oraz_zapisanie: sprawdza, że współrzędne geodezyjne
+    każdego punktu wyznaczane są dokładnie raz (wyniki FLH, PL-1992/2000 i NEU korzystają
+    z tego samego rozwiązania) i podaje czas przetwarzania.
+    '''
+    rng = np.random.default_rng(2)
+    fi = rng.uniform(48.9, 55, n)
+    lam = rng.uniform(13.5, 25.5, n)
+    h = rng.uniform(0, 500, n)
+    geo = Transformacje(GRS80)
+    XYZ = np.column_stack(geo.odwrotny_hirvonen(fi, lam, h))
+    with tempfile.TemporaryDirectory() as katalog:
+        dane = os.path.join(katalog, "wsp_inp.txt")
+        plik_testowy(dane, XYZ)
+        geo.liczba_rozwiazan = 0
+        t0 = time.perf_counter()
+        geo.wczytanie_oraz_zapisanie(dane, xyz_txt=os.path.join(katalog, "wyniki.txt"), neu_txt=os.path.join(katalog, "neu.txt"))
+        t = time.perf_counter() - t0
+    na_punkt = geo.liczba_rozwiazan / n
+    print(f"punkty: {n}, rozwiązania XYZ->BLH: {geo.liczba_rozwiazan} ({na_punkt:.2f} na punkt), czas: {t:.3f} s, {n / t:.0f} pkt/s")
+    assert geo.liczba_rozwiazan == n, "wczytanie_oraz_zapisanie przelicza współrzędne geodezyjne więcej niż raz na punkt"
+
+
+def sprawdzenie_dms(n=100000):
+    '''
+    Sprawdza dms_tablice: stała szerokość tekstu dla kątów od -180° do 180° (także <= -100°),
+    zgodność z dms dla pojedynczych wartości i '-' dla NaN bez ostrzeżeń.
+    '''
+    geo = Transformacje(GRS80)
+    x = np.radians(np.concatenate([np.random.default_rng(0).uniform(-180, 180, n), [-179.999999999, -100, -99.9999999999, -0.0, 0, 180]]))
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        tekst = geo.dms_tablice(np.append(x, np.nan))
+    szerokosci = set(map(len, tekst[:-1].tolist()))
+    print(f"dms_tablice ({x.size} kątów): szerokości {sorted(szerokosci)}, NaN -> {tekst[-1]!r}")
+    assert szerokosci == {len(tekst[0])}, "teksty dms mają różną szerokość"
+    assert tekst[-1] == "-", "NaN powinien dawać '-'"
+    assert all(geo.dms(v) == t for v, t in zip(x[-6:].tolist(), tekst[-7:-1].tolist())), "dms różni się od dms_tablice"
+
+
+def sprawdzenie_PL_odwrotne(n=100000):
+    '''
+    Sprawdza dokładność przeliczeń odwrotnych PL-1992 -> BL i PL-2000 -> BL na gęstej siatce
+    około n punktów pokrywającej obszar 48.9° - 55°N, 13.5° - 25.5°E (przeliczenie wprost, potem odwrotne).
+    '''
+    krok = np.sqrt(6.1 * 12 / n)
+    fi, lam = np.meshgrid(np.linspace(48.9, 55, int(6.1 / krok) + 1), np.linspace(13.5, 25.5, int(12 / krok) + 1))
+    fi = fi.ravel()
+    lam = lam.ravel()
+    geo = Transformacje(GRS80)
+    x92, y92, x00, y00 = geo.flh2PL1992_PL2000(fi, lam)
+    print(f"punkty siatki: {fi.size}")
+    print(f"{'układ':>8} {'błąd fi [mm]':>14} {'błąd lam [mm]':>14} {'pkt/s':>12}")
+    for uklad, x, y, odwrotna in (('PL-1992', x92, y92, geo.PL1992_2flh), ('PL-2000', x00, y00, geo.PL2000_2flh)):
+        t0 = time.perf_counter()
+        f, l = odwrotna(x, y)
+        t = time.perf_counter() - t0
+        df = np.abs(np.radians(f - fi)).max() * geo.a * 1000
+        dl = (np.abs(np.radians(l - lam)) * np.cos(np.radians(fi))).max() * geo.a * 1000
+        print(f"{uklad:>8} {df:>14.6f} {dl:>14.6f} {fi.size / t:>12.0f}")
+        assert df < 0.1 and dl < 0.1, f"przeliczenie odwrotne {uklad} przekracza 0.1 mm"
+
+
+def sprawdzenie_PL_rad(n=100000):
+    '''
+    Porównuje bezpośrednie przeliczenia PL_rad, xyz2PL2000 i xyz2PL1992 z flh2PL2000/flh2PL1992
+    dla losowych punktów w obszarze układów i wokół niego oraz punktów na granicach obszaru
+    i stref PL-2000 (13.5°, 16.5°, 19.5°, 22.5°, 25.5°E, 48.9° i 55°N).
+    '''
+    rng = np.random.default_rng(0)
+    fi = np.concatenate([rng.uniform(48, 56, n), np.repeat([48.9, 52.0, 55.0], 5)])
+    lam = np.concatenate([rng.uniform(12, 27, n), np.tile([13.5, 16.5, 19.5, 22.5, 25.5], 3)])
+    geo = Transformacje(GRS80)
+    for uklad, wzorcowa in (("PL2000", geo.flh2PL2000), ("PL1992", geo.flh2PL1992)):
+        x, y, _ = geo.PL_rad(np.radians(fi), np.radians(lam), uklad)
+        for a, b in zip((x, y), wzorcowa(fi, lam)):
+            assert np.array_equal(np.isnan(a), np.isnan(b)), f"PL_rad {uklad}: inny obszar układu niż {wzorcowa.__name__}"
+            assert np.nanmax(np.abs(a - b)) < 1e-6, f"PL_rad {uklad} różni się od {wzorcowa.__name__}"
+    XYZ = np.column_stack(geo.odwrotny_hirvonen(fi, lam, rng.uniform(0, 500, fi.size)))
+    f, l, _ = geo.xyz2flh(XYZ[:, 0], XYZ[:, 1], XYZ[:, 2])
+    for uklad, bezposrednia, wzorcowa in (("PL2000", geo.xyz2PL2000, geo.flh2PL2000), ("PL1992", geo.xyz2PL1992, geo.flh2PL1992)):
+        wyniki = bezposrednia(XYZ[:, 0], XYZ[:, 1], XYZ[:, 2])[:2]
+        roznica = 0.0
+        for a, b in zip(wyniki, wzorcowa(f, l)):
+            assert np.array_equal(np.isnan(a), np.isnan(b)), f"xyz2{uklad}: inny obszar układu niż xyz2flh + {wzorcowa.__name__}"
+            roznica = max(roznica, np.nanmax(np.abs(a - b)))
+        print(f"xyz2{uklad} względem xyz2flh + {wzorcowa.__name__} ({fi.size} punktów): różnica {roznica * 1000:.6f} mm")
+        assert roznica < 1e-6, f"xyz2{uklad} różni się od xyz2flh + {wzorcowa.__name__}"
+
+
+def sprawdzenie_tablicy_gk(n=100000, bledy=(1e-3, 1e-4, 1e-5)):
+    '''
+    Porównuje odwzorowanie PL-1992/PL-2000 z tablicą interpolacyjną (TablicaGK) z dokładnymi szeregami
+    dla losowych punktów z obszaru układów: rozmiar tablicy, czas budowy, błąd i przyspieszenie.
+    '''
+    rng = np.random.default_rng(0)
+    fi = rng.uniform(48.9, 55, n)
+    lam = rng.uniform(13.5, 25.5, n)
+    geo = Transformacje(GRS80)
+    t_dokladne = czas(geo.flh2PL1992_PL2000, fi, lam)
+    dokladne = geo.flh2PL1992_PL2000(fi, lam)
+    print(f"{'błąd [mm]':>10} {'węzły':>8} {'budowa [s]':>11} {'max błąd [mm]':>14} {'przyspieszenie':>15}")
+    for blad in bledy:
+        t0 = time.perf_counter()
+        geo.tablica = zbuduj_tablice_gk(*GRS80, blad=blad)
+        t_budowy = time.perf_counter() - t0
+        t_tablica = czas(geo.flh2PL1992_PL2000, fi, lam)
+        wyniki = geo.flh2PL1992_PL2000(fi, lam)
+        roznica = max(np.abs(a - b).max() for a, b in zip(dokladne, wyniki))
+        print(f"{blad * 1000:>10.3f} {geo.tablica.dane.shape[1]:>8} {t_budowy:>11.3f} {roznica * 1000:>14.6f} {t_dokladne / t_tablica:>14.2f}x")
+        assert roznica < blad, f"tablica interpolacyjna przekracza zadany błąd {blad} m"
+
+
+def sprawdzenie_helmerta(n=100000):
+    '''
+    Sprawdza konwencję i parametry transformacji Helmerta:
+        przykład "position vector" z EPSG Guidance Note 7-2 (WGS 72 -> WGS 84),
+        PL-1942 -> ETRF89 dla punktu 52°N 21°E względem zaokrąglonych parametrów EPSG:1644
+        (+towgs84=33.4,-146.6,-76.3,-0.359,-0.053,0.844,-0.84) zapisanych wprost wzorem EPSG 9606,
+        przeliczenie tam i z powrotem dla n losowych punktów.
+    '''
+    T, M = macierz_parametrow_helmerta(0.0, 0.0, 4.5, 0.0, 0.0, 0.554, 0.219)
+    wynik = np.array([3657660.66, 255768.55, 5201382.11]) @ M.T + T
+    roznica = np.abs(wynik - [3657660.78, 255778.43, 5201387.75]).max()
+    print(f"EPSG GN 7-2 (position vector): różnica {roznica * 1000:.1f} mm")
+    assert roznica < 0.01, "macierz_parametrow_helmerta nie odtwarza przykładu EPSG 9606"
+
+    X, Y, Z = Transformacje([6378245.000, 0.00669342162296]).odwrotny_hirvonen(52.0, 21.0, 100.0)
+    tx, ty, tz, ds = 33.4, -146.6, -76.3, -0.84e-6
+    rx, ry, rz = np.radians(np.array([-0.359, -0.053, 0.844]) / 3600)
+    wzorcowy = np.array([tx + (1 + ds) * (X - rz * Y + ry * Z),
+                         ty + (1 + ds) * (rz * X + Y - rx * Z),
+                         tz + (1 + ds) * (-ry * X + rx * Y + Z)])
+    wynik = transformacja_helmerta([[X, Y, Z]], 'Krasowski', 'GRS80')[0]
+    roznica = np.abs(wynik - wzorcowy).max()
+    print(f"PL-1942 -> ETRF89 (52°N 21°E) względem EPSG:1644: różnica {roznica:.3f} m")
+    assert roznica < 0.2, "transformacja PL-1942 -> ETRF89 niezgodna z EPSG:1644"
+
+    XYZ = np.column_stack(Transformacje(GRS80).odwrotny_hirvonen(*losowe_punkty(n)))
+    powrot = transformacja_helmerta(transformacja_helmerta(XYZ, 'Krasowski', 'GRS80'), 'GRS80', 'Krasowski')
+    roznica = np.abs(powrot - XYZ).max()
+    print(f"Krasowski -> GRS80 -> Krasowski ({n} punktów): różnica {roznica * 1000:.6f} mm")
+    assert roznica < 1e-6, "przeliczenie Helmerta tam i z powrotem nie jest tożsamością"
+
+
+def sprawdzenie_kafli(n=100000, rozmiary=(1.0, 0.01, 1e-4, 5e-5, 1e-6)):
+    '''
+    Porównuje BL_PL2000 i XYZ_PL2000 przeliczane kaflami (przelicz_kafle) z przeliczeniem bez kafli
+    dla n losowych punktów (także spoza obszaru układów) i punktów na granicach stref (16.5°, 19.5°,
+    22.5°E) i obszaru, również przy małych kaflach z kluczami int32/int64.
+    '''
+    rng = np.random.default_rng(0)
+    # punkty losowe oraz na granicach obszaru i stref PL-2000
+    dane = np.column_stack([np.concatenate([rng.uniform(48, 56, n), np.repeat([48.9, 52.0, 55.0], 5)]),
+                            np.concatenate([rng.uniform(12, 27, n), np.tile([13.5, 16.5, 19.5, 22.5, 25.5], 3)])])
+    geo = Transformacje(GRS80)
+    XYZ = np.column_stack(geo.odwrotny_hirvonen(dane[:, 0], dane[:, 1], np.zeros(len(dane))))
+    print(f"{'funkcja':>10} {'rozmiar [st.]':>14} {'klucz':>6} {'kafle':>8} {'różne wyniki':>13}")
+    for funkcja, wejscie in (('BL_PL2000', dane), ('XYZ_PL2000', XYZ)):
+        wzorcowe = przelicz_blok(geo, funkcja, wejscie, {})
+        for rozmiar in rozmiary:
+            kafle = Kafle(geo, dane[:, 0], dane[:, 1], rozmiar)
+            wyniki = przelicz_kafle(geo, funkcja, wejscie, rozmiar)
+            rozne = np.count_nonzero((wyniki != wzorcowe) & ~(np.isnan(wyniki) & np.isnan(wzorcowe)))
+            print(f"{funkcja:>10} {rozmiar:>14g} {Kafle.siatka(geo, rozmiar)[2].__name__:>6} {len(kafle):>8} {rozne:>13}")
+            assert rozne == 0, f"{funkcja} kaflami {rozmiar}° różni się od przeliczenia bez kafli"
+
+
+def sprawdzenie_biegunow(n=100000):
+    '''
+    Sprawdza algorytm_hirvonena dla punktów na osi Z (fi = ±90°, h = |Z| - b) i danych NaN: wersja
+    skalarna i wsadowa dają te same wyniki, a obliczenia się kończą (także -funkcja XYZ_NEU z biegunem
+    jako początkiem układu, z opcją --cache i bez niej).
+    '''
+    geo = Transformacje(GRS80)
+    b = GRS80[0] * np.sqrt(1 - GRS80[1])
+    XYZ = np.array([[0.0, 0.0, b + 100], [0.0, 0.0, -b - 100], [np.nan, 1.0, 1.0], [3664940.500, 1409153.590, 5009571.170]])
+    wsadowe = np.column_stack(geo.algorytm_hirvonena(XYZ[:, 0], XYZ[:, 1], XYZ[:, 2]))
+    skalarne = np.array([geo.algorytm_hirvonena(*punkt) for punkt in XYZ])
+    assert np.array_equal(skalarne, wsadowe, equal_nan=True), f"{skalarne} != {wsadowe}"
+    assert np.allclose(skalarne[:2], [[90, 0, 100], [-90, 0, 100]], atol=1e-6), f"bieguny: {skalarne[:2]}"
+    skrypt = os.path.join(os.path.dirname(os.path.abspath(__file__)), "skrypt.py")
+    with katalog_roboczy():
+        plik_testowy('bieguny.txt', XYZ[[0, 3, 1]])
+        for opcje in ([], ['--cache', '100']):
+            t0 = time.perf_counter()
+            subprocess.run([sys.executable, skrypt, '-plik', 'bieguny.txt', '-elip', 'GRS80', '-funkcja', 'XYZ_NEU'] + opcje,
+                           capture_output=True, check=True, timeout=60)
+            print(f"XYZ_NEU z biegunem jako początkiem {' '.join(opcje)}: {time.perf_counter() - t0:.2f} s")
+    print(f"bieguny i NaN: wersja skalarna i wsadowa zgodne, h = {skalarne[0, 2]:.6f} m")
+
+
+def sprawdzenie_XYZ_BLH(n=100000):
+    '''
+    Porównuje plik WYNIK_XYZ_BLH.txt z przetworz_plik (n punktów z całej kuli ziemskiej, bloki po
+    1000 punktów) z wynikami pierwotnej pętli po liniach: skalarny algorytm_hirvonena dla każdego
+    punktu i ' '.join(map(str, ...)) - pliki muszą być identyczne bajt w bajt.
+    '''
+    geo = Transformacje(GRS80)
+    XYZ = dane_syntetyczne(n, 'swiat')['XYZ']
+    with katalog_roboczy():
+        plik_testowy('swiat.txt', XYZ)
+        przetworz_plik(geo, 'swiat.txt', 'XYZ_BLH', rozmiar_bloku=1000)
+        wsadowe = open('WYNIK_XYZ_BLH.txt', encoding="utf-8").read().splitlines()
+        with open('swiat.txt') as plik:
+            linie = plik.readlines()[4:]
+    skalarne = [' '.join(map(str, geo.algorytm_hirvonena(*(float(w) for w in linia.split(','))))) for linia in linie]
+    rozne = [i for i, (a, b) in enumerate(zip(skalarne, wsadowe)) if a != b]
+    assert len(skalarne) == len(wsadowe) and not rozne, f"{len(rozne)} różnych linii, np. {rozne[:5]}"
+    print(f"XYZ_BLH: {len(wsadowe)} linii identycznych z pętlą skalarną")
+
+
+def sprawdzenie_pamieci(n=100000):
+    '''
+    Pamięć podręczna (--cache) dla pliku z 20 stacjami zapisanymi w n kolejnych epokach (seriami
+    powtórzeń tego samego punktu): przetworz_plik XYZ_BLH i XYZ_NEU 'consecutive' z pamięcią i bez
+    niej - wyniki identyczne, liczba rozwiązań i czas. Sprawdza też, że rneu przy włączonej pamięci
+    zwraca macierz, którą można zmieniać.
+    '''
+    rng = np.random.default_rng(0)
+    stacje = np.column_stack(Transformacje(GRS80).odwrotny_hirvonen(rng.uniform(49, 55, 20), rng.uniform(14, 24, 20),
+                                                                    rng.uniform(80, 300, 20)))
+    XYZ = np.repeat(stacje, -(-n // 20), axis=0)[:n]
+    with katalog_roboczy():
+        plik_testowy('stacje.txt', XYZ)
+        for funkcja, tryb in (('XYZ_BLH', 'fixed'), ('XYZ_NEU', 'consecutive')):
+            teksty = []
+            for pamiec in (None, PamiecPodreczna()):
+                geo = Transformacje(GRS80)
+                geo.pamiec = pamiec
+                t = czas(przetworz_plik, geo, 'stacje.txt', funkcja, tryb_neu=tryb, powtorzenia=1)
+                teksty.append(open(f'WYNIK_{funkcja}.txt', encoding="utf-8").read())
+                print(f"{funkcja} {'--cache' if pamiec else 'bez pamięci'}: {geo.liczba_rozwiazan} rozwiązań, {t:.3f} s")
+            assert teksty[0] == teksty[1], f"{funkcja}: wyniki z pamięcią różnią się od wyników bez niej"
+    geo = Transformacje(GRS80)
+    geo.pamiec = PamiecPodreczna()
+    R = geo.rneu(52.0, 21.0)
+    R[0, 0] = 0.0
+    assert geo.rneu(52.0, 21.0)[0, 0] != 0.0, "rneu zwraca macierz współdzieloną z pamięcią"
+
+
+def sprawdzenie_kalkulatora(n=100000):
+    '''
+    Sprawdza kalkulator_xyz2flh.py dla punktów na biegunach i danych NaN: obliczenia skalarne
+    (fi = ±90°, h = |Z| - b, brak zawieszenia dla NaN), zgodność z obliczeniami wsadowymi
+    oraz tryb stdin z biegunem poniżej progu obliczeń wsadowych.
+    '''
+    import kalkulator_xyz2flh as kalkulator
+    b = GRS80[0] * np.sqrt(1 - GRS80[1])
+    for Z in (b + 100, -b - 100):
+        fi, lam, h = kalkulator.hirvonen(0.0, 0.0, Z, *GRS80)
+        assert fi == np.copysign(np.pi/2, Z) and abs(h - 100) < 1e-6, f"biegun Z = {Z}: fi = {fi}, h = {h}"
+    t0 = time.perf_counter()
+    fi, lam, h = kalkulator.hirvonen(np.nan, 1.0, 1.0, *GRS80)
+    assert fi != fi and h != h, "dane NaN powinny dać wynik NaN"
+    assert time.perf_counter() - t0 < 1, "algorytm Hirvonena nie kończy się dla danych NaN"
+    punkty = [(0.0, 0.0, b + 100), (0.0, 0.0, -b - 100), (np.nan, 1.0, 1.0), (3664940.500, 1409153.590, 5009571.170)]
+    skalarne = [kalkulator.przelicz_punkt(*punkt) for punkt in punkty]
+    wsadowe = kalkulator.przelicz_tablice(punkty)
+    for s, w in zip(skalarne, wsadowe):
+        assert s[:2] == w[:2] and (s[2] == w[2] or (s[2] != s[2] and w[2] != w[2])), f"{s} != {w}"
+    wynik = subprocess.run([sys.executable, 'kalkulator_xyz2flh.py'], input="0 0 6356852.314\n3664940.5 1409153.59 5009571.17\n",
+                           text=True, capture_output=True, timeout=60, cwd=os.path.dirname(os.path.abspath(__file__)))
+    print(wynik.stdout, end="")
+    assert wynik.returncode == 0 and len(wynik.stdout.splitlines()) == 2, wynik.stderr
+
+
+def sprawdzenie_przyrostu(n=100000):
+    '''
+    Sprawdza tryb przyrostowy (przetworz_przyrost) przy rotacji pliku: plik z 3 punktami zastąpiony
+    dłuższym plikiem z 10 innymi punktami musi zostać przeliczony od początku, a dopisanie kolejnych
+    linii - tylko dopisane. Wyniki porównywane są z przeliczeniem całego pliku (przetworz_plik).
+    '''
+    geo = Transformacje(GRS80)
+    XYZ = np.column_stack(geo.odwrotny_hirvonen(*losowe_punkty(30)))
+    with katalog_roboczy():
+        for dane in (XYZ[:3], XYZ[10:20], XYZ[10:30]):
+            plik_testowy('dane.txt.tmp', dane)
+            os.replace('dane.txt.tmp', 'dane.txt')
+            przetworz_przyrost(geo, 'dane.txt', 'XYZ_BLH')
+            with open('WYNIK_XYZ_BLH.txt') as f:
+                przyrostowo = f.read()
+            przetworz_plik(geo, 'dane.txt', 'XYZ_BLH')
+            with open('WYNIK_XYZ_BLH.txt') as f:
+                assert przyrostowo == f.read(), f"tryb przyrostowy różni się od przeliczenia całego pliku ({len(dane)} punktów)"
+    print("rotacja i dopisywanie: wyniki zgodne z przeliczeniem całego pliku")
+
+
+def sprawdzenie_zwartych(n=100000):
+    '''
+    Porównuje pliki wynikowe wczytanie_oraz_zapisanie dla zwarte="float64" i "float32" (n punktów
+    w obszarze kilku kilometrów) - muszą być identyczne; wypisuje rozmiar wiersza kontenera.
+    '''
+    geo = Transformacje(GRS80)
+    rng = np.random.default_rng(0)
+    XYZ = np.column_stack(geo.odwrotny_hirvonen(52.2 + rng.uniform(0, 0.02, n), 21.0 + rng.uniform(0, 0.03, n),
+                                                rng.uniform(80, 130, n)))
+    with katalog_roboczy():
+        plik_testowy('lokalne.txt', XYZ)
+        teksty = {}
+        for zwarte in ("float64", "float32"):
+            wyniki = geo.wczytanie_oraz_zapisanie('lokalne.txt', xyz_txt=f'wyniki_{zwarte}.txt', neu_txt=f'neu_{zwarte}.txt', zwarte=zwarte)
+            print(f"{zwarte}: {wyniki.bajty_na_punkt()} B/punkt, float32: {', '.join(wyniki.kolumny_float32()) or 'brak'}")
+            teksty[zwarte] = [open(f'{nazwa}_{zwarte}.txt', encoding="utf-8").read() for nazwa in ('wyniki', 'neu')]
+    assert teksty["float64"] == teksty["float32"], "pliki wynikowe float32 różnią się od float64"
+
+
+def dane_syntetyczne(n, obszar, ziarno=0):
+    '''
+    Tworzy syntetyczny zbiór punktów dla zestawu benchmarków.
+
+    Parametry
+    ----------
+    n : INT
+        liczba punktów
+    obszar : STR
+        polska (48.9° - 55°N, 13.5° - 25.5°E, h 0 - 1000 m) lub swiat (cała kula ziemska,
+        bez punktów dokładnie na biegunach - te sprawdza porownanie_metod_xyz2flh)
+    ziarno : INT
+        ziarno generatora liczb losowych
+
+    Returns
+    -------
+    DICT z kluczami fi, lam [st. dz.], h [m], XYZ [m] (N, 3)
+    '''
+    rng = np.random.default_rng(ziarno)
+    if obszar == 'polska':
+        fi = rng.uniform(48.9, 55, n)
+        lam = rng.uniform(13.5, 25.5, n)
+        h = rng.uniform(0, 1000, n)
+    else:
+        fi = rng.uniform(-90, 90, n)
+        lam = rng.uniform(-180, 180, n)
+        h = rng.uniform(-100, 9000, n)
+    XYZ = np.column_stack(Transformacje(GRS80).odwrotny_hirvonen(fi, lam, h))
+    return {'fi': fi, 'lam': lam, 'h': h, 'XYZ': XYZ}
+
+
+@contextmanager
+def katalog_roboczy():
+    '''
+    Tymczasowy katalog roboczy (pliki WYNIK_* tworzone są w bieżącym katalogu).
+    '''
+    poprzedni = os.getcwd()
+    with tempfile.TemporaryDirectory() as katalog:
+        os.chdir(katalog)
+        try:
+            yield katalog
+        finally:
+            os.chdir(poprzedni)
+
+
+def przypadki_zestawu(geo, dane, plik):
+    '''
+    Zwraca słownik nazwa -> funkcja bez argumentów dla wszystkich mierzonych operacji.
+    '''
+    X, Y, Z = dane['XYZ'].T
+    fi, lam, h = dane['fi'], dane['lam'], dane['h']
+    return {
+        'algorytm_hirvonena': lambda: geo.algorytm_hirvonena(X, Y, Z),
+        'odwrotny_hirvonen': lambda: geo.odwrotny_hirvonen(fi, lam, h),
+        'flh2PL1992': lambda: geo.flh2PL1992(fi, lam),
+        'flh2PL2000': lambda: geo.flh2PL2000(fi, lam),
+        'xyz2neu': lambda: geo.xyz2neu_tablice(dane['XYZ']),
+        'dms': lambda: geo.dms_tablice(np.radians(fi)),
+        'wczytanie': lambda: geo.wczytanie_tablica(plik),
+        'wczytanie_oraz_zapisanie': lambda: geo.wczytanie_oraz_zapisanie(plik),
+        'cli_XYZ_BLH': lambda: przetworz_plik(geo, plik, 'XYZ_BLH'),
+        'cli_XYZ_NEU': lambda: przetworz_plik(geo, plik, 'XYZ_NEU'),
+        'cli_XYZ_PL2000': lambda: przetworz_plik(geo, plik, 'XYZ_PL2000'),
+    }
+
+
+def pomiar(funkcja, powtorzenia):
+    '''
+    Mierzy najkrótszy czas wykonania [s] oraz, w osobnym przebiegu, szczytowe zużycie pamięci [MB]
+    (tracemalloc śledzi również tablice NumPy).
+    '''
+    t = czas(funkcja, powtorzenia=powtorzenia)
+    tracemalloc.start()
+    try:
+        funkcja()
+        _, szczyt = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return t, szczyt / 2**20
+
+
+def zestaw(rozmiary=(1000, 10000, 100000), obszary=('polska', 'swiat'), funkcje=None):
+    '''
+    Zestaw benchmarków wszystkich metod Transformacje oraz ścieżek wiersza poleceń
+    na syntetycznych danych. Działa bez dostępu do sieci.
+
+    Parametry
+    ----------
+    rozmiary : LIST
+        liczby punktów (np. 1e3 - 1e7)
+    obszary : LIST
+        polska i/lub swiat
+    funkcje : LIST, opcjonalnie
+        nazwy mierzonych przypadków (domyślnie wszystkie)
+
+    Returns
+    -------
+    wyniki : LIST
+        słowniki z polami funkcja, obszar, n, czas_s, pkt_na_s, pamiec_MB
+    '''
+    geo = Transformacje(GRS80)
+    wyniki = []
+    print(f"{'funkcja':>26} {'obszar':>7} {'n':>9} {'czas [s]':>10} {'pkt/s':>12} {'pamięć [MB]':>12}")
+    for obszar in obszary:
+        for n in rozmiary:
+            dane = dane_syntetyczne(n, obszar)
+            with katalog_roboczy() as katalog:
+                plik = os.path.join(katalog, "wsp_inp.txt")
+                plik_testowy(plik, dane['XYZ'])
+                for nazwa, funkcja in przypadki_zestawu(geo, dane, plik).items():
+                    if funkcje and nazwa not in funkcje:
+                        continue
+                    t, pamiec = pomiar(funkcja, 3 if n <= 100000 else 1)
+                    wyniki.append({'funkcja': nazwa, 'obszar': obszar, 'n': n, 'czas_s': t,
+                                   'pkt_na_s': n / t, 'pamiec_MB': pamiec})
+                    print(f"{nazwa:>26} {obszar:>7} {n:>9} {t:>10.4f} {n / t:>12.0f} {pamiec:>12.1f}")
+    return wyniki
+
+
+def zapisz_baze(wyniki, sciezka):
+    '''
+    Zapisuje wyniki zestawu jako plik JSON z opisem środowiska.
+    '''
+    baza = {'python': sys.version.split()[0], 'numpy': np.__version__, 'platforma': platform.platform(),
+            'data': time.strftime("%Y-%m-%d %H:%M:%S"), 'wyniki': wyniki}
+    with open(sciezka, "w", encoding="utf-8") as plik:
+        json.dump(baza, plik, indent=2, ensure_ascii=False)
+
+
+def porownaj_z_baza(wyniki, sciezka, tolerancja=0.2):
+    '''
+    Porównuje wyniki z zapisaną bazą i zwraca listę regresji - przypadków, w których liczba
+    punktów na sekundę spadła lub szczytowe zużycie pamięci wzrosło o więcej niż tolerancja.
+    '''
+    with open(sciezka, encoding="utf-8") as plik:
+        baza = {(w['funkcja'], w['obszar'], w['n']): w for w in json.load(plik)['wyniki']}
+    regresje = []
+    for w in wyniki:
+        b = baza.get((w['funkcja'], w['obszar'], w['n']))
+        if b is None:
+            continue
+        zmiana = w['pkt_na_s'] / b['pkt_na_s'] - 1
+        zmiana_pamieci = (w['pamiec_MB'] + 1) / (b['pamiec_MB'] + 1) - 1
+        if zmiana < -tolerancja or zmiana_pamieci > tolerancja:
+            regresje.append(w)
+            print(f"REGRESJA {w['funkcja']} {w['obszar']} n={w['n']}: pkt/s {zmiana:+.1%}, pamięć {zmiana_pamieci:+.1%}")
+    print(f"porównano z {sciezka}: {len(regresje)} regresji")
+    return regresje
+
+
+def benchmark_startu(n=None, powtorzenia=10):
+    '''
+    Czas uruchomienia kalkulatora dla jednego punktu (nowy proces, łącznie ze startem Pythona)
+    w porównaniu z dotychczasową ścieżką: import modułu skrypt (NumPy) i trzy rozwiązania Hirvonena.
+    Dodatkowo czas przeliczenia 1000 punktów podanych na stdin w jednym wywołaniu.
+    '''
+    katalog = os.path.dirname(os.path.abspath(__file__))
+    kalkulator = os.path.join(katalog, "kalkulator_xyz2flh.py")
+    punkt = ['-x', '3664940.500', '-y', '1409153.590', '-z', '5009571.170']
+    dotychczas = ("import skrypt; geo = skrypt.Transformacje(skrypt.elipsoidy['GRS80']); "
+                  "f, l, h = geo.algorytm_hirvonena(3664940.5, 1409153.59, 5009571.17); "
+                  "geo.algorytm_hirvonena(3664940.5, 1409153.59, 5009571.17, output='dms'); "
+                  "f, l, h = geo.algorytm_hirvonena(3664940.5, 1409153.59, 5009571.17); "
+                  "geo.flh2PL1992(f, l); geo.flh2PL2000(f, l)")
+    XYZ = dane_syntetyczne(999, 'polska')['XYZ']
+    stdin = "".join("%.3f,%.3f,%.3f\n" % tuple(p) for p in XYZ.tolist())
+    przypadki = {
+        'dotychczas (import skrypt, 3 rozwiązania)': ([sys.executable, '-c', dotychczas], None),
+        'kalkulator, 1 punkt': ([sys.executable, kalkulator, '-m', 'GRS80'] + punkt, None),
+        'kalkulator, 999 punktów ze stdin': ([sys.executable, kalkulator, '-m', 'GRS80'], stdin),
+    }
+    for nazwa, (polecenie, wejscie) in przypadki.items():
+        czasy = []
+        for _ in range(powtorzenia):
+            t0 = time.perf_counter()
+            subprocess.run(polecenie, input=wejscie, text=True, capture_output=True, check=True, cwd=katalog)
+            czasy.append(time.perf_counter() - t0)
+        print(f"{nazwa:>42}: {np.median(czasy) * 1e3:8.1f} ms (mediana z {powtorzenia})")
+
+
+testy = {
+    'metody': porownanie_metod_xyz2flh,
+    'stale': benchmark_stalych,
+    'rozwiazania': benchmark_rozwiazan,
+    'dms': sprawdzenie_dms,
+    'PL_odwrotne': sprawdzenie_PL_odwrotne,
+    'PL_rad': sprawdzenie_PL_rad,
+    'tablica': sprawdzenie_tablicy_gk,
+    'helmert': sprawdzenie_helmerta,
+    'kafle': sprawdzenie_kafli,
+    'bieguny': sprawdzenie_biegunow,
+    'XYZ_BLH': sprawdzenie_XYZ_BLH,
+    'pamiec': sprawdzenie_pamieci,
+    'kalkulator': sprawdzenie_kalkulatora,
+    'przyrost': sprawdzenie_przyrostu,
+    'zwarte': sprawdzenie_zwartych,
+    'start': benchmark_startu,
+}
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument('-n', type=int, default=100000, help="liczba punktów testowych")
+    parser.add_argument('-t', '--test', choices=list(testy) + ['zestaw'], nargs='*', default=list(testy), help="testy do uruchomienia")
+    parser.add_argument('--rozmiary', type=float, nargs='*', default=[1e3, 1e4, 1e5], help="liczby punktów zestawu (1e3 - 1e7)")
+    parser.add_argument('--obszary', choices=['polska', 'swiat'], nargs='*', default=['polska', 'swiat'])
+    parser.add_argument('--funkcje', nargs='*', help="mierzone przypadki zestawu (domyślnie wszystkie)")
+    parser.add_argument('--zapisz', help="plik JSON, do którego zapisywana jest baza wyników zestawu")
+    parser.add_argument('--porownaj', help="plik JSON z bazą, z którą porównywane są wyniki zestawu")
+    parser.add_argument('--tolerancja', type=float, default=0.2, help="dopuszczalne pogorszenie względem bazy")
+    args = parser.parse_args()
+    regresje = []
+    for nazwa in args.test:
+        print(f"== {nazwa}")
+        if nazwa == 'zestaw':
+            wyniki = zestaw([int(n) for n in args.rozmiary], args.obszary, args.funkcje)
+            if args.zapisz:
+                zapisz_baze(wyniki, args.zapisz)
+            if args.porownaj:
+                regresje = porownaj_z_baza(wyniki, args.porownaj, args.tolerancja)
+        else:
+            testy[nazwa](args.n)
+    sys.exit(1 if regresje else 0)
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""
+Parametry elipsoid [a - duża półoś [m], e2 - kwadrat mimośrodu] oraz parametry transformacji
+Helmerta między ich układami odniesienia, wydzielone z modułu skrypt, aby mogły z nich korzystać
+skrypty niewymagające NumPy (kalkulator_xyz2flh.py).
+"""
+elipsoidy = {
+    'WGS84': [6378137.000, 0.00669437999013],
+    'GRS80': [6378137.000, 0.00669438002290],
+    'Krasowski': [6378245.000, 0.00669342162296]
+}
+
+# Transformacja 7-parametrowa (Helmert/Bursa-Wolf, konwencja "position vector", jak EPSG:1644
+# i +towgs84 w PROJ):
+# (tx, ty, tz [m], rx, ry, rz ["], ds [ppm]) przejścia z układu pierwszej elipsoidy do drugiej.
+# Krasowski - układ PL-1942 (Pułkowo 1942(58)), GRS80 - ETRF89. WGS84 utożsamiany jest z ETRF89
+# (różnica poniżej 1 m), tak jak w pozostałych przeliczeniach programu.
+# Kierunek odwrotny wyznaczany jest przez odwrócenie macierzy (skrypt.macierz_helmerta).
+helmert = {
+    ('Krasowski', 'GRS80'): (33.4297, -146.5746, -76.2865, -0.35867, -0.05283, 0.84354, -0.84078),
+    ('Krasowski', 'WGS84'): (33.4297, -146.5746, -76.2865, -0.35867, -0.05283, 0.84354, -0.84078),
+    ('WGS84', 'GRS80'): (0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+}
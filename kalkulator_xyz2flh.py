@@ -1,44 +1,241 @@
 # -*- coding: utf-8 -*-
 """
 Created on Mon Jun  3 19:30:01 2024
-"""
 
+Szybki kalkulator XYZ -> fi, lam, h oraz PL-1992/PL-2000 dla pojedynczych punktów.
+Obliczenia skalarne korzystają wyłącznie z modułu math (jedno rozwiązanie algorytmu Hirvonena
+na punkt), a NumPy i moduł skrypt importowane są dopiero dla dużych partii punktów ze stdin.
+
+Przykłady:
+    python kalkulator_xyz2flh.py -m GRS80 -x 3664940.500 -y 1409153.590 -z 5009571.170
+    python kalkulator_xyz2flh.py -m GRS80 < punkty.txt        (linie X,Y,Z lub X Y Z)
+"""
+import math
+import sys
 from argparse import ArgumentParser
-import skrypt
-from skrypt import Transformacje
-
-parser = ArgumentParser()
-parser.add_argument('-m', '--m', type=str, help="należy podać elipsoide (Krasowski, GRS80, WGS84")
-   
-parser.add_argument('-x', '--x', type=float)
-parser.add_argument('-y', '--y', type=float)
-parser.add_argument('-z', '--z', type=float)
-args = parser.parse_args()
-   
-    
-geo = Transformacje(model = args.m)
-    
-    
-f, l, h = geo.algorytm_hirvonena(args.x, args.y, args.z)
-fi, lam, ha = geo.algorytm_hirvonena(args.x, args.y, args.z, output="dms")
-
-print("")
-print("")
-print("Elipsoida:", args.m)
-print(f"Wyniki_hirvonen'; fi = {fi}, lam = {lam}, ha = {ha:^.3f}[m]")
-  
-fi, lam, ha = geo.algorytm_hirvonena(args.x, args.y, args.z)
-if lam >= 13.5 and lam <= 25.5 and fi <= 55.0 and fi >= 48.9:
-    x92, y92 = geo.flh2PL1992(fi,lam)
-    x00, y00 = geo.flh2PL2000(fi,lam)
-    print(f"Wyniki_z_transformacji_1992_oraz_2000; X1992 = {x92:^.3f}[m], Y1992 = {y92:^.3f}[m], X2000 = {x00:^.3f}[m], Y2000 = {y00:^.3f}[m]")
-else:
-    x92 = " '-' " 
-    y92 = " '-' " 
-    x00 = " '-' " 
-    y00 = " '-' " 
-    print(f"Wyniki_z_transformacji_1992_i_2000; X1992 = {x92}[m], Y1992 = {y92}[m], X2000 = {x00}[m], Y2000 = {y00}[m]")
-    print("niewłaściwe położenie")
-  
-print("")
-print("")
\ No newline at end of file
+
+from elipsoidy import elipsoidy
+
+prog_tablic = 1000
+prog_zbieznosci = 0.000001/206265
+
+
+def hirvonen(X, Y, Z, a, e2, max_iter=20):
+    '''
+    Algorytm Hirvonena dla jednego punktu (tylko math). Punkty na osi Z (p = 0) liczone są wprost
+    (fi = ±90°, h = |Z| - b).
+
+    Parametry
+    ----------
+    X, Y, Z : FLOAT
+        [m] - współrzędne w układzie orto-kartezjańskim
+    a, e2 : FLOAT
+        duża półoś i kwadrat mimośrodu elipsoidy
+    max_iter : INT
+        maksymalna liczba iteracji; bez zbieżności (np. dane NaN) zwracane jest ostatnie przybliżenie,
+        jak w Transformacje.algorytm_hirvonena_tablice
+
+    Returns
+    -------
+    fi, lam : FLOAT
+        [rad] - szerokość i długość geodezyjna
+    h : FLOAT
+        [m] - wysokość elipsoidalna
+    '''
+    p = math.sqrt(X**2 + Y**2)
+    if p == 0:
+        return math.copysign(math.pi/2, Z), math.atan2(Y, X), abs(Z) - a * math.sqrt(1 - e2)
+    fi = math.atan(Z/(p * (1 - e2)))
+    h = math.nan
+    for _ in range(max_iter):
+        N = a / math.sqrt(1 - e2 * math.sin(fi)**2)
+        h = (p / math.cos(fi)) - N
+        fip = fi
+        fi = math.atan(Z / (p * (1 - e2 * (N / (N+h)))))
+        if abs(fip - fi) < prog_zbieznosci:
+            break
+    return fi, math.atan2(Y, X), h
+
+
+def dms(x):
+    '''
+    Zamiana radianów na tekst ±ddd°mm′ss.sssss″ o stałej szerokości (jak Transformacje.dms); '-' dla NaN.
+    '''
+    if x != x:
+        return "-"
+    znak = "-" if x < 0 else " "
+    x = abs(x) * 180/math.pi
+    d = math.floor(x)
+    m = math.floor(60 * (x - d))
+    s = (x - d - m/60)*3600
+    if s > 59.999995:
+        s = 0
+        m += 1
+    if m == 60:
+        m = 0
+        d += 1
+    return "%s%3d°%02d′%08.5f″" % (znak, d, m, s)
+
+
+def gauss_kruger(fi, lam, l0, m0, a, e2):
+    '''
+    Odwzorowanie Gaussa-Krügera dla jednego punktu (te same szeregi co Transformacje.gauss_kruger).
+
+    Parametry
+    ----------
+    fi, lam, l0 : FLOAT
+        [rad] - szerokość, długość i południk osiowy
+    m0 : FLOAT
+        skala na południku osiowym
+
+    Returns
+    -------
+    x, y : FLOAT
+        [m] - współrzędne pomnożone przez m0 (bez przesunięć układu)
+    '''
+    e4 = e2**2
+    e6 = e2**3
+    b2 = a**2 * (1 - e2)
+    e_2 = (a**2 - b2)/b2
+    A0 = 1 - (e2/4) - ((3*e4)/64) - ((5*e6)/256)
+    A2 = (3/8) * (e2 + e4/4 + (15*e6)/128)
+    A4 = (15/256) * (e4 + (3*e6)/4)
+    A6 = (35*e6)/3072
+    dl = lam - l0
+    dl2 = dl**2
+    dl4 = dl2**2
+    sin_fi = math.sin(fi)
+    cos_fi = math.cos(fi)
+    cos2 = cos_fi**2
+    t2 = math.tan(fi)**2
+    t4 = t2**2
+    n2 = e_2 * cos2
+    n4 = n2 ** 2
+    N = a / math.sqrt(1 - e2 * sin_fi**2)
+    sigma = a * ((A0 * fi) - A2 * math.sin(2*fi) + A4 * math.sin(4*fi) - A6 * math.sin(6*fi))
+    xgk = sigma + (dl2/2) * N * sin_fi * cos_fi * (1 + (dl2/12)*cos2*(5 - t2 + 9 * n2 + 4 * n4) + (dl4/360) * (cos2**2)*(61 - (58 * t2) + t4 + (270 * n2) - (330 * n2 * t2)))
+    ygk = dl * N * cos_fi * (1 + (dl2/6) * cos2 * (1 - t2 + n2) + (dl4/120) * (cos2**2) * (5 - (18 * t2) + t4 + (14 * n2) - 58 * n2 * t2))
+    return xgk * m0, ygk * m0
+
+
+def przelicz_punkt(X, Y, Z, model="GRS80"):
+    '''
+    Przelicza jeden punkt: jedno rozwiązanie Hirvonena, z którego wynikają fi, lam w dms
+    oraz współrzędne PL-1992/PL-2000.
+
+    Returns
+    -------
+    fi, lam : STR
+        [dms]
+    h : FLOAT
+        [m]
+    x92, y92, x00, y00 : FLOAT lub None
+        [m] - None dla punktów spoza obszaru układów (48.9° - 55°N, 13.5° - 25.5°E)
+    '''
+    a, e2 = elipsoidy[model]
+    fi, lam, h = hirvonen(X, Y, Z, a, e2)
+    fi_st, lam_st = fi*180/math.pi, lam*180/math.pi
+    if 13.5 <= lam_st <= 25.5 and 48.9 <= fi_st <= 55.0:
+        x92, y92 = gauss_kruger(fi, lam, math.radians(19), 0.9993, a, e2)
+        strefa = min(int((lam_st - 13.5) // 3), 3) + 5
+        x00, y00 = gauss_kruger(fi, lam, math.radians(3 * strefa), 0.999923, a, e2)
+        PL = (x92 - 5300000, y92 + 500000, x00, y00 + strefa * 1000000 + 500000)
+    else:
+        PL = (None, None, None, None)
+    return (dms(fi), dms(lam), h) + PL
+
+
+def przelicz_tablice(XYZ, model="GRS80"):
+    '''
+    Wsadowe przeliczenie dużej partii punktów (leniwy import NumPy i modułu skrypt).
+
+    Returns
+    -------
+    LIST krotek jak w przelicz_punkt
+    '''
+    import numpy as np
+    from skrypt import Transformacje
+
+    geo = Transformacje(elipsoidy[model])
+    XYZ = np.asarray(XYZ, dtype=np.float64)
+    fi, lam, h = geo.xyz2flh(XYZ[:, 0], XYZ[:, 1], XYZ[:, 2], output="radiany")
+    # punkty na osi Z liczone tak samo jak w hirvonen
+    biegun = (XYZ[:, 0] == 0) & (XYZ[:, 1] == 0)
+    fi[biegun] = np.copysign(np.pi/2, XYZ[biegun, 2])
+    h[biegun] = np.abs(XYZ[biegun, 2]) - geo.a * np.sqrt(1 - geo.e2)
+    PL = geo.flh2PL1992_PL2000(fi, lam, jednostki="radiany")
+    PL = [[None if v != v else v for v in kolumna.tolist()] for kolumna in PL]
+    return list(zip(geo.dms_tablice(fi).tolist(), geo.dms_tablice(lam).tolist(), h.tolist(), *PL))
+
+
+def wiersz_wyniku(wynik):
+    '''
+    Jedna linia wyniku dla trybu stdin: fi lam h x1992 y1992 x2000 y2000 ('-' poza obszarem układów).
+    '''
+    fi, lam, h = wynik[:3]
+    PL = ["-" if v is None else f"{v:.3f}" for v in wynik[3:]]
+    return f"{fi} {lam} {h:.3f} " + " ".join(PL)
+
+
+def wczytaj_stdin(strumien):
+    '''
+    Wczytuje punkty X, Y, Z (rozdzielone przecinkiem lub spacjami) ze strumienia; błędne linie są pomijane.
+
+    Returns
+    -------
+    punkty : LIST krotek (X, Y, Z)
+    bledne : LIST numerów linii
+    '''
+    punkty = []
+    bledne = []
+    for nr, linia in enumerate(strumien, start=1):
+        pola = linia.replace(',', ' ').split()
+        if not pola:
+            continue
+        try:
+            X, Y, Z = map(float, pola)
+        except ValueError:
+            bledne.append(nr)
+            continue
+        punkty.append((X, Y, Z))
+    return punkty, bledne
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument('-m', '--m', type=str, default='GRS80', choices=list(elipsoidy), help="należy podać elipsoide (Krasowski, GRS80, WGS84)")
+    parser.add_argument('-x', '--x', type=float)
+    parser.add_argument('-y', '--y', type=float)
+    parser.add_argument('-z', '--z', type=float)
+    args = parser.parse_args()
+
+    if args.x is None or args.y is None or args.z is None:
+        punkty, bledne = wczytaj_stdin(sys.stdin)
+        if len(punkty) >= prog_tablic:
+            wyniki = przelicz_tablice(punkty, args.m)
+        else:
+            wyniki = [przelicz_punkt(X, Y, Z, args.m) for X, Y, Z in punkty]
+        sys.stdout.write("".join(wiersz_wyniku(w) + "\n" for w in wyniki))
+        if bledne:
+            print(f"Pominięto błędne linie: {', '.join(map(str, bledne))}", file=sys.stderr)
+        sys.exit(0)
+
+    fi, lam, ha, x92, y92, x00, y00 = przelicz_punkt(args.x, args.y, args.z, args.m)
+
+    print("")
+    print("")
+    print("Elipsoida:", args.m)
+    print(f"Wyniki_hirvonen'; fi = {fi}, lam = {lam}, ha = {ha:^.3f}[m]")
+
+    if x92 is not None:
+        print(f"Wyniki_z_transformacji_1992_oraz_2000; X1992 = {x92:^.3f}[m], Y1992 = {y92:^.3f}[m], X2000 = {x00:^.3f}[m], Y2000 = {y00:^.3f}[m]")
+    else:
+        x92 = " '-' "
+        y92 = " '-' "
+        x00 = " '-' "
+        y00 = " '-' "
+        print(f"Wyniki_z_transformacji_1992_i_2000; X1992 = {x92}[m], Y1992 = {y92}[m], X2000 = {x00}[m], Y2000 = {y00}[m]")
+        print("niewłaściwe położenie")
+
+    print("")
+    print("")
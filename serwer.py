@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Serwer przeliczeń współrzędnych działający w tle. Obiekty Transformacje dla wszystkich elipsoid
+są tworzone raz, przy starcie procesów puli, więc pojedyncze zapytanie nie płaci za import
+NumPy i parsowanie argumentów. Zapytania obsługuje pętla asyncio (wielu klientów naraz),
+a obliczenia wykonywane są w puli procesów.
+
+Protokół: HTTP/1.1 przez localhost (TCP) lub gniazdo uniksowe.
+    POST /<funkcja>?elip=<elipsoida>
+        Content-Type: application/json
+            {"dane": [[...], ...], "poczatek": [X, Y, Z] (opcjonalnie, dla XYZ_NEU)}
+            odpowiedź: {"funkcja", "elipsoida", "kolumny", "wyniki"}; null oznacza punkt spoza obszaru układu
+        Content-Type: application/octet-stream
+            surowe float64 (little-endian), wiersz po wierszu (kolumny_wejscia[funkcja] wartości na punkt)
+            odpowiedź: surowe float64, kolumny_wyjscia[funkcja] wartości na punkt
+        Dla XYZ_NEU początek układu (lub pierwszy punkt) musi być skończony i leżeć poza osią Z (400).
+        Zapytanie, którego obliczenia trwają dłużej niż --timeout sekund, kończy się odpowiedzią 503.
+    GET /status
+        elipsoidy, funkcje i liczba obsłużonych zapytań
+
+Uruchomienie:
+    python serwer.py --port 8765 --workers 2 --timeout 30
+    python serwer.py --unix /tmp/transformacje.sock
+"""
+import asyncio
+import json
+import os
+import socket
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from skrypt import PamiecPodreczna, Transformacje, elipsoidy, funkcje, kolumny_wejscia, kolumny_wyjscia, przelicz_blok
+
+_instancje = {}
+
+
+def _inicjalizuj_pracownika():
+    '''
+    Inicjalizacja procesu puli: obiekty Transformacje dla wszystkich elipsoid, z pamięcią podręczną
+    początków układu NEU (stacje bazowe powtarzające się w kolejnych zapytaniach liczone są raz).
+    '''
+    for nazwa, elipsoida in elipsoidy.items():
+        _instancje[nazwa] = Transformacje(elipsoida)
+        _instancje[nazwa].pamiec = PamiecPodreczna()
+
+
+def oblicz(elip, funkcja, dane, poczatek=None):
+    '''
+    Zadanie procesu puli: przelicza tablicę dane (n, kolumny_wejscia[funkcja]) funkcją ze słownika funkcje.
+
+    Parametry
+    ----------
+    elip : STR
+        klucz ze słownika elipsoidy
+    funkcja : STR
+        klucz ze słownika funkcje
+    dane : ARRAY (n, k)
+    poczatek : ARRAY (3,), opcjonalnie
+        początek układu NEU dla XYZ_NEU (domyślnie pierwszy punkt danych)
+
+    Returns
+    -------
+    wynik : ARRAY (n, m)
+    '''
+    if not _instancje:
+        _inicjalizuj_pracownika()
+    stan = {} if poczatek is None else {'XYZ0': np.asarray(poczatek, dtype=np.float64)}
+    if not len(dane):
+        return np.empty((0, len(kolumny_wyjscia[funkcja])))
+    return przelicz_blok(_instancje[elip], funkcja, dane, stan)
+
+
+class BladZapytania(Exception):
+    '''
+    Błąd w zapytaniu klienta (odpowiedź HTTP 400/404).
+    '''
+    def __init__(self, komunikat, status=400):
+        super().__init__(komunikat)
+        self.status = status
+
+
+class Serwer:
+    """
+    Serwer HTTP/1.1 na asyncio. Zapytania z wielu połączeń obsługiwane są współbieżnie,
+    a obliczenia przekazywane do puli procesów z gotowymi obiektami Transformacje.
+    """
+    statusy = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error',
+               503: 'Service Unavailable'}
+
+    def __init__(self, workers=1, limit_czasu=60.0):
+        self.pula = ProcessPoolExecutor(workers, initializer=_inicjalizuj_pracownika)
+        self.liczba_zapytan = 0
+        # [s] - czas oczekiwania na wynik z puli; po jego przekroczeniu klient dostaje odpowiedź 503
+        # (przerwane obliczenie zajmuje proces puli do końca, ale nie blokuje pętli asyncio)
+        self.limit_czasu = limit_czasu
+
+    async def obsluz_polaczenie(self, czytnik, pisarz):
+        '''
+        Obsługuje jedno połączenie (keep-alive: wiele zapytań po kolei).
+        '''
+        try:
+            while True:
+                linia = await czytnik.readline()
+                if not linia:
+                    break
+                metoda, sciezka, _ = linia.decode('latin1').split(' ', 2)
+                naglowki = {}
+                while True:
+                    linia = await czytnik.readline()
+                    if linia in (b'\r\n', b'\n', b''):
+                        break
+                    klucz, _, wartosc = linia.decode('latin1').partition(':')
+                    naglowki[klucz.strip().lower()] = wartosc.strip()
+                cialo = await czytnik.readexactly(int(naglowki.get('content-length', 0)))
+                status, typ, odpowiedz = await self.odpowiedz(metoda, sciezka, naglowki, cialo)
+                zamknij = naglowki.get('connection', '').lower() == 'close'
+                pisarz.write((f"HTTP/1.1 {status} {Serwer.statusy[status]}\r\n"
+                              f"Content-Type: {typ}\r\nContent-Length: {len(odpowiedz)}\r\n"
+                              f"Connection: {'close' if zamknij else 'keep-alive'}\r\n\r\n").encode('latin1') + odpowiedz)
+                await pisarz.drain()
+                if zamknij:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            pisarz.close()
+
+    async def odpowiedz(self, metoda, sciezka, naglowki, cialo):
+        '''
+        Returns
+        -------
+        status : INT
+        typ : STR
+            Content-Type odpowiedzi
+        odpowiedz : BYTES
+        '''
+        adres = urlsplit(sciezka)
+        try:
+            if adres.path == '/status':
+                return 200, 'application/json', json.dumps({
+                    'elipsoidy': list(elipsoidy), 'funkcje': list(funkcje), 'liczba_zapytan': self.liczba_zapytan}).encode()
+            if metoda != 'POST':
+                raise BladZapytania('Przeliczenia wymagają metody POST', 405)
+            funkcja = adres.path.strip('/')
+            if funkcja not in funkcje:
+                raise BladZapytania(f'Nieznana funkcja {funkcja}, dostępne: {", ".join(funkcje)}', 404)
+            elip = parse_qs(adres.query).get('elip', ['GRS80'])[0]
+            if elip not in elipsoidy:
+                raise BladZapytania(f'Nieznana elipsoida {elip}, dostępne: {", ".join(elipsoidy)}')
+            kolumny = kolumny_wejscia[funkcja]
+            binarne = naglowki.get('content-type', '').startswith('application/octet-stream')
+            poczatek = None
+            if binarne:
+                if len(cialo) % (8 * kolumny):
+                    raise BladZapytania(f'Długość danych nie jest wielokrotnością {kolumny} wartości float64')
+                dane = np.frombuffer(cialo, dtype='<f8').reshape(-1, kolumny)
+            else:
+                zapytanie = json.loads(cialo)
+                dane = np.asarray(zapytanie['dane'], dtype=np.float64).reshape(-1, kolumny)
+                poczatek = zapytanie.get('poczatek')
+            if funkcja == 'XYZ_NEU' and len(dane):
+                XYZ0 = np.asarray(dane[0] if poczatek is None else poczatek, dtype=np.float64)
+                if XYZ0.shape != (3,) or not np.isfinite(XYZ0).all():
+                    raise BladZapytania('Początek układu NEU musi mieć trzy skończone współrzędne X, Y, Z')
+                if XYZ0[0] == 0 and XYZ0[1] == 0:
+                    raise BladZapytania('Początek układu NEU leży na osi Z (biegun) - kierunek północy jest nieokreślony')
+            try:
+                wynik = await asyncio.wait_for(
+                    asyncio.get_running_loop().run_in_executor(self.pula, oblicz, elip, funkcja, dane, poczatek), self.limit_czasu)
+            except asyncio.TimeoutError:
+                raise BladZapytania(f'Przekroczono limit czasu obliczeń ({self.limit_czasu} s)', 503)
+            self.liczba_zapytan += 1
+            if binarne:
+                return 200, 'application/octet-stream', np.ascontiguousarray(wynik, dtype='<f8').tobytes()
+            wyniki = [[None if v != v else v for v in wiersz] for wiersz in wynik.tolist()]
+            return 200, 'application/json', json.dumps({
+                'funkcja': funkcja, 'elipsoida': elip, 'kolumny': kolumny_wyjscia[funkcja], 'wyniki': wyniki}).encode()
+        except BladZapytania as blad:
+            return blad.status, 'application/json', json.dumps({'blad': str(blad)}, ensure_ascii=False).encode()
+        except (KeyError, ValueError, TypeError) as blad:
+            return 400, 'application/json', json.dumps({'blad': f'Nieprawidłowe zapytanie: {blad}'}, ensure_ascii=False).encode()
+        except Exception as blad:
+            return 500, 'application/json', json.dumps({'blad': str(blad)}, ensure_ascii=False).encode()
+
+    async def uruchom(self, host='127.0.0.1', port=8765, unix=None):
+        '''
+        Uruchamia serwer na localhost (host, port) lub na gnieździe uniksowym unix.
+        '''
+        # rozgrzanie puli: procesy tworzą obiekty Transformacje przed pierwszym zapytaniem
+        await asyncio.get_running_loop().run_in_executor(self.pula, oblicz, 'GRS80', 'XYZ_BLH', np.empty((0, 3)))
+        if unix is not None:
+            if os.path.exists(unix):
+                os.remove(unix)
+            serwer = await asyncio.start_unix_server(self.obsluz_polaczenie, path=unix)
+            print(f"Serwer przeliczeń nasłuchuje na gnieździe {unix}")
+        else:
+            serwer = await asyncio.start_server(self.obsluz_polaczenie, host, port)
+            print(f"Serwer przeliczeń nasłuchuje na http://{host}:{port}")
+        try:
+            async with serwer:
+                await serwer.serve_forever()
+        finally:
+            self.pula.shutdown()
+
+
+class Klient:
+    """
+    Prosty klient serwera przeliczeń, utrzymujący jedno połączenie (keep-alive).
+    """
+
+    def __init__(self, host='127.0.0.1', port=8765, unix=None):
+        if unix is not None:
+            self.gniazdo = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.gniazdo.connect(unix)
+        else:
+            self.gniazdo = socket.create_connection((host, port))
+            self.gniazdo.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.plik = self.gniazdo.makefile('rb')
+
+    def zapytanie(self, funkcja, dane, elip='GRS80', binarne=True, poczatek=None):
+        '''
+        Wysyła partię punktów i zwraca wyniki.
+
+        Parametry
+        ----------
+        funkcja : STR
+            klucz ze słownika funkcje
+        dane : ARRAY (n, kolumny_wejscia[funkcja])
+        elip : STR
+            klucz ze słownika elipsoidy
+        binarne : BOOL
+            True - dane przesyłane jako float64, False - jako JSON
+        poczatek : ARRAY (3,), opcjonalnie
+            początek układu NEU (tylko JSON)
+
+        Returns
+        -------
+        wynik : ARRAY (n, m)
+        '''
+        if binarne:
+            cialo = np.ascontiguousarray(dane, dtype='<f8').tobytes()
+            typ = 'application/octet-stream'
+        else:
+            zapytanie = {'dane': np.asarray(dane, dtype=np.float64).tolist()}
+            if poczatek is not None:
+                zapytanie['poczatek'] = list(poczatek)
+            cialo = json.dumps(zapytanie).encode()
+            typ = 'application/json'
+        self.gniazdo.sendall((f"POST /{funkcja}?elip={elip} HTTP/1.1\r\nHost: localhost\r\n"
+                              f"Content-Type: {typ}\r\nContent-Length: {len(cialo)}\r\n\r\n").encode('latin1') + cialo)
+        status = int(self.plik.readline().split()[1])
+        naglowki = {}
+        while True:
+            linia = self.plik.readline()
+            if linia in (b'\r\n', b''):
+                break
+            klucz, _, wartosc = linia.decode('latin1').partition(':')
+            naglowki[klucz.strip().lower()] = wartosc.strip()
+        odpowiedz = self.plik.read(int(naglowki['content-length']))
+        if status != 200:
+            raise Exception(json.loads(odpowiedz)['blad'])
+        if binarne:
+            return np.frombuffer(odpowiedz, dtype='<f8').reshape(-1, len(kolumny_wyjscia[funkcja]))
+        return np.array(json.loads(odpowiedz)['wyniki'], dtype=np.float64)
+
+    def zamknij(self):
+        self.plik.close()
+        self.gniazdo.close()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1', help="adres nasłuchiwania (domyślnie tylko localhost)")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="ścieżka gniazda uniksowego (zamiast TCP)")
+    parser.add_argument('--workers', type=int, default=1, help="liczba procesów obliczeniowych")
+    parser.add_argument('--timeout', type=float, default=60.0, help="limit czasu obliczeń jednego zapytania [s]")
+    args = parser.parse_args()
+    try:
+        asyncio.run(Serwer(args.workers, args.timeout).uruchom(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
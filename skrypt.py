@@ -3,13 +3,592 @@
 Created on Mon Apr 22 17:13:57 2024
 """
 import numpy as np
-from argparse import ArgumentParser
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import islice, repeat
+import hashlib
+import json
+import os
 import sys
+import tempfile
+import time
+import zipfile
+
+from elipsoidy import elipsoidy, helmert
+
+naglowek_wynikow = ("Wyniki_obliczen; XYZ, fi, lambda, h, x1992, y1992, x2000, y2000.\n"
+                    "Znak '-' w; x1992, y1992, x2000, y2000 oznacza, że dla podanych współrzędnych (X, Y, Z) po obliczeniu współrzędnych geodezyjnych fi oraz lam. Fi i lam nie należą do dozwolonych współrzędnych układów 1992 oraz 2000.\n"
+                    "\n"
+                    "          X                    Y                    Z                    fi                 lambda                 h                  x1992                y1992                x2000                y2000        \n")
+
+naglowek_neu = ("Wyniki_obliczen; neu.\n"
+                "                        n                                                 e                                                 u                         \n")
+
+
+@dataclass(frozen=True)
+class StaleElipsoidy:
+    """
+    Niezmienne stałe pochodne elipsoidy, obliczane raz i współdzielone przez wszystkie obiekty Transformacje.
+        a, e2 - duża półoś i kwadrat mimośrodu
+        b - mała półoś
+        e_2 - kwadrat drugiego mimośrodu
+        e4, e6 - potęgi kwadratu mimośrodu
+        A0, A2, A4, A6 - współczynniki długości łuku południka
+        prog - próg zbieżności algorytmu Hirvonena [rad]
+        l0_PL1992 - [rad] południk osiowy układu PL-1992
+        l0_PL2000 - [rad] południki osiowe stref 5, 6, 7, 8 układu PL-2000
+        zakres_PL - [rad] obszar układów PL-1992/PL-2000: (fi_min, fi_max, lam_min, lam_max)
+    """
+    a: float
+    e2: float
+    b: float
+    e_2: float
+    e4: float
+    e6: float
+    A0: float
+    A2: float
+    A4: float
+    A6: float
+    prog: float
+    l0_PL1992: float
+    l0_PL2000: tuple
+    zakres_PL: tuple
+
+
+def oblicz_stale_elipsoidy(a, e2):
+    '''
+    Oblicza stałe pochodne elipsoidy o dużej półosi a i kwadracie mimośrodu e2.
+
+    Returns
+    -------
+    StaleElipsoidy
+    '''
+    a2 = a**2
+    b2 = a2 * (1 - e2)
+    e4 = e2**2
+    e6 = e2**3
+    return StaleElipsoidy(
+        a=a,
+        e2=e2,
+        b=np.sqrt(b2),
+        e_2=(a2 - b2)/b2,
+        e4=e4,
+        e6=e6,
+        A0=1 - (e2/4) - ((3*e4)/64) - ((5*e6)/256),
+        A2=(3/8) * (e2 + e4/4 + (15*e6)/128),
+        A4=(15/256) * (e4 + (3*e6)/4),
+        A6=(35*e6)/3072,
+        prog=0.000001/206265,
+        l0_PL1992=np.radians(19),
+        l0_PL2000=tuple(np.radians(l0) for l0 in (15, 18, 21, 24)),
+        zakres_PL=tuple(np.radians(k) for k in (48.9, 55, 13.5, 25.5)),
+    )
+
+
+@lru_cache(maxsize=None)
+def stale_elipsoidy(a, e2):
+    '''
+    Zwraca współdzielony obiekt StaleElipsoidy dla danej elipsoidy (obliczany tylko przy pierwszym wywołaniu).
+    '''
+    return oblicz_stale_elipsoidy(a, e2)
+
+
+for _parametry in elipsoidy.values():
+    stale_elipsoidy(*_parametry)
+
+
+def macierz_parametrow_helmerta(tx, ty, tz, rx, ry, rz, ds):
+    '''
+    Przekształcenie liniowe XYZ' = XYZ @ M.T + T dla 7 parametrów Helmerta w konwencji
+    "position vector" (EPSG 9606, +towgs84 w PROJ):
+        M = (1 + ds) * [[1, -rz, ry], [rz, 1, -rx], [-ry, rx, 1]]
+
+    Parametry
+    ----------
+    tx, ty, tz : FLOAT
+        [m] - przesunięcia
+    rx, ry, rz : FLOAT
+        ["] - obroty
+    ds : FLOAT
+        [ppm] - zmiana skali
+
+    Returns
+    -------
+    T : ARRAY (3,)
+        [m] - wektor przesunięcia
+    M : ARRAY (3, 3)
+        macierz obrotu ze zmianą skali
+    '''
+    rx, ry, rz = np.radians(np.array([rx, ry, rz]) / 3600)
+    T = np.array([tx, ty, tz], dtype=np.float64)
+    M = (1 + ds * 1e-6) * np.array([[1, -rz, ry], [rz, 1, -rx], [-ry, rx, 1]])
+    return T, M
+
+
+@lru_cache(maxsize=None)
+def macierz_helmerta(z, do):
+    '''
+    Transformacja Helmerta (7 parametrów, konwencja "position vector") między układami elipsoid
+    z i do, w postaci jednego przekształcenia liniowego XYZ_do = XYZ_z @ M.T + T
+    (macierz_parametrow_helmerta). Dla kierunku przeciwnego do zapisanego w słowniku helmert
+    macierz jest odwracana dokładnie (a nie przez zmianę znaków parametrów), więc przeliczenie
+    tam i z powrotem jest tożsamością.
+
+    Parametry
+    ----------
+    z, do : STR
+        klucze ze słownika elipsoidy
+
+    Returns
+    -------
+    T : ARRAY (3,)
+        [m] - wektor przesunięcia
+    M : ARRAY (3, 3)
+        macierz obrotu ze zmianą skali
+    '''
+    if z == do:
+        T, M = np.zeros(3), np.eye(3)
+    elif (z, do) in helmert:
+        T, M = macierz_parametrow_helmerta(*helmert[(z, do)])
+    elif (do, z) in helmert:
+        T, M = macierz_helmerta(do, z)
+        M = np.linalg.inv(M)
+        T = -M @ T
+    else:
+        raise NotImplementedError(f"{z} -> {do} - brak parametrów transformacji, dostępne: "
+                                  f"{', '.join(f'{a} <-> {b}' for a, b in helmert)}")
+    T.flags.writeable = False
+    M.flags.writeable = False
+    return T, M
+
+
+def transformacja_helmerta(XYZ, z, do):
+    '''
+    Wsadowa transformacja Helmerta współrzędnych XYZ z układu elipsoidy z do układu elipsoidy do
+    (jeden iloczyn macierzy dla wszystkich punktów). Wynik można bezpośrednio przeliczyć obiektem
+    Transformacje(elipsoidy[do]), np. na BLH lub PL-2000.
+
+    Parametry
+    ----------
+    XYZ : ARRAY (N, 3)
+        [m] - współrzędne orto-kartezjańskie w układzie z
+    z, do : STR
+        klucze ze słownika elipsoidy
+
+    Returns
+    -------
+    XYZ : ARRAY (N, 3)
+        [m] - współrzędne orto-kartezjańskie w układzie do
+    '''
+    T, M = macierz_helmerta(z, do)
+    return np.asarray(XYZ, dtype=np.float64) @ M.T + T
+
+
+class PamiecPodreczna:
+    """
+    Ograniczona pamięć podręczna LRU dla powtarzających się punktów (np. stacji bazowych
+    i początków układu NEU). Obiekt przypisany do Transformacje.pamiec przechowuje:
+        rozwiązania XYZ -> fi, lam, h - klucz (a, e2, metoda, X, Y, Z zaokrąglone do miejsca miejsc po przecinku)
+        macierze obrotu NEU - klucz (fi, lam) [rad]
+    Tablice XYZ nie są zapisywane w pamięci - przy włączonej pamięci xyz2flh rozwiązuje raz serie
+    kolejnych powtórzeń punktu, a powtórzenia liczy jako trafienia.
+    Po przekroczeniu rozmiaru usuwany jest najdawniej używany wpis. Punkty różniące się o mniej
+    niż zaokrąglenie (domyślnie 0.1 mm) otrzymują rozwiązanie pierwszego z nich.
+    """
+
+    def __init__(self, rozmiar=1024, miejsca=4):
+        self.rozmiar = rozmiar
+        self.miejsca = miejsca
+        self.wpisy = OrderedDict()
+        self.trafienia = 0
+        self.chybienia = 0
+
+    def klucz_xyz(self, geo, X, Y, Z):
+        '''
+        Klucz rozwiązania XYZ -> fi, lam, h dla obiektu Transformacje geo.
+        '''
+        return ('flh', geo.a, geo.e2, geo.method,
+                round(float(X), self.miejsca), round(float(Y), self.miejsca), round(float(Z), self.miejsca))
+
+    def pobierz(self, klucz, oblicz):
+        '''
+        Zwraca wartość zapisaną pod kluczem, a przy jej braku oblicza ją funkcją oblicz() i zapamiętuje.
+        '''
+        if klucz in self.wpisy:
+            self.wpisy.move_to_end(klucz)
+            self.trafienia += 1
+            return self.wpisy[klucz]
+        self.chybienia += 1
+        wartosc = oblicz()
+        PamiecPodreczna.zapisz(self, klucz, wartosc)
+        return wartosc
+
+    def zapisz(self, klucz, wartosc):
+        self.wpisy[klucz] = wartosc
+        self.wpisy.move_to_end(klucz)
+        if len(self.wpisy) > self.rozmiar:
+            self.wpisy.popitem(last=False)
+
+    def statystyki(self):
+        '''
+        Returns
+        -------
+        DICT - rozmiar, liczba wpisów, trafienia, chybienia i odsetek trafień
+        '''
+        zapytania = self.trafienia + self.chybienia
+        return {'rozmiar': self.rozmiar, 'wpisy': len(self.wpisy), 'trafienia': self.trafienia,
+                'chybienia': self.chybienia, 'skutecznosc': self.trafienia / zapytania if zapytania else 0.0}
+
+
+class TablicaGK:
+    """
+    Tablica interpolacyjna odwzorowania Gaussa-Krügera dla jednej elipsoidy. Odwzorowanie zapisane jest
+    jako wielomian różnicy długości dl = lam - l0, którego współczynniki zależą tylko od szerokości fi:
+        x = sigma + dl^2 * (p1 + dl^2 * (p2 + dl^2 * p3))
+        y = dl * (q1 + dl^2 * (q2 + dl^2 * q3))
+    Współczynniki stabelaryzowane są w równych odstępach fi i interpolowane liniowo, dzięki czemu
+    odwzorowanie bloku to kilka odczytów z tablicy i mnożeń zamiast pełnych szeregów trygonometrycznych.
+    Tablica nie zależy od strefy (południka osiowego) - te same węzły obsługują PL-1992 i wszystkie
+    strefy PL-2000. Punkty spoza zakresu fi lub z |dl| > dl_max przeliczane są dokładnie.
+
+    Plik .npy (15, n): wiersz 0 - (a, e2, fi_min, krok, dl_max, blad, n), wiersze 1-7 - współczynniki
+    (sigma, p1, p2, p3, q1, q2, q3) w węzłach fi_min + i * krok, wiersze 8-14 - ich przyrosty do
+    następnego węzła. Każdy współczynnik jest ciągłym wierszem, a plik wczytywany jest z mapowaniem w pamięci.
+    """
+
+    def __init__(self, dane, sciezka=None):
+        self.a, self.e2, self.fi_min, self.krok, self.dl_max, self.blad, _ = (float(v) for v in dane[0, :7])
+        self.dane = dane
+        self.sciezka = sciezka
+
+    def oblicz(self, fi, dl):
+        '''
+        Interpolacja odwzorowania dla punktów z zakresu tablicy.
+
+        Parametry
+        ----------
+        fi, dl : ARRAY
+            [rad] - szerokość i różnica długości względem południka osiowego
+
+        Returns
+        -------
+        x, y : ARRAY
+            [m] - współrzędne Gaussa-Krügera (bez skali m0) punktów z maski
+        maska : ARRAY
+            punkty obsłużone przez tablicę (pozostałe należy przeliczyć dokładnie)
+        '''
+        u = (fi - self.fi_min) / self.krok
+        with np.errstate(invalid='ignore'):
+            maska = (u >= 0) & (u < self.dane.shape[1] - 1) & (np.abs(dl) <= self.dl_max)
+        if not maska.all():
+            u = u[maska]
+            dl = dl[maska]
+        i = u.astype(np.intp)
+        t = u - i
+        w = [np.take(self.dane[k], i) + t * np.take(self.dane[k + 7], i) for k in range(1, 8)]
+        dl2 = dl**2
+        x = w[0] + dl2 * (w[1] + dl2 * (w[2] + dl2 * w[3]))
+        y = dl * (w[4] + dl2 * (w[5] + dl2 * w[6]))
+        return(x, y, maska)
+
+    def zapisz(self, sciezka):
+        '''
+        Zapisuje tablicę do pliku .npy (do późniejszego wczytania przez wczytaj_tablice_gk).
+        '''
+        np.save(sciezka, self.dane)
+        self.sciezka = sciezka
+
+
+def wspolczynniki_gk(a, e2, fi):
+    '''
+    Dokładne współczynniki (sigma, p1, p2, p3, q1, q2, q3) odwzorowania Gaussa-Krügera (opis w TablicaGK)
+    dla szerokości fi [rad] - te same szeregi co Transformacje.gauss_kruger_szeregi.
+
+    Returns
+    -------
+    ARRAY (n, 7)
+    '''
+    st = stale_elipsoidy(a, e2)
+    sin_fi = np.sin(fi)
+    cos_fi = np.cos(fi)
+    cos2 = cos_fi**2
+    t2 = np.tan(fi)**2
+    t4 = t2**2
+    n2 = st.e_2 * cos2
+    n4 = n2 ** 2
+    N = a / np.sqrt(1 - e2 * sin_fi**2)
+    sigma = a * ((st.A0 * fi) - st.A2 * np.sin(2*fi) + st.A4 * np.sin(4*fi) - st.A6 * np.sin(6*fi))
+    p1 = N * sin_fi * cos_fi / 2
+    q1 = N * cos_fi
+    return np.column_stack([sigma, p1,
+                            p1 * cos2 * (5 - t2 + 9 * n2 + 4 * n4) / 12,
+                            p1 * (cos2**2) * (61 - (58 * t2) + t4 + (270 * n2) - (330 * n2 * t2)) / 360,
+                            q1,
+                            q1 * cos2 * (1 - t2 + n2) / 6,
+                            q1 * (cos2**2) * (5 - (18 * t2) + t4 + (14 * n2) - 58 * n2 * t2) / 120])
+
+
+def zbuduj_tablice_gk(a, e2, blad=1e-4, dl_max=np.radians(6.5), krok=1e-3, maks_wezlow=2000000):
+    '''
+    Buduje tablicę TablicaGK dla obszaru układów PL-1992/PL-2000, zagęszczając węzły (krok / 2),
+    dopóki błąd interpolacji nie spadnie poniżej połowy blad. Błąd sprawdzany jest w środkach
+    wszystkich przedziałów (tam błąd interpolacji liniowej gładkiej funkcji jest największy) dla
+    najgorszego przypadku |dl| = dl_max i sumy błędów wszystkich współczynników.
+
+    Parametry
+    ----------
+    a, e2 : FLOAT
+        duża półoś i kwadrat mimośrodu elipsoidy
+    blad : FLOAT
+        [m] - dopuszczalny błąd x, y
+    dl_max : FLOAT
+        [rad] - największa różnica długości obsługiwana przez tablicę (6.5° - cały obszar PL-1992)
+    krok : FLOAT
+        [rad] - początkowy odstęp węzłów
+    maks_wezlow : INT
+        największa dopuszczalna liczba węzłów
+
+    Returns
+    -------
+    TablicaGK
+
+    Raises
+    ------
+    ValueError
+        zadany błąd wymaga więcej niż maks_wezlow węzłów
+    '''
+    fi_min, fi_max = stale_elipsoidy(a, e2).zakres_PL[:2]
+    potegi = np.array([1, dl_max**2, dl_max**4, dl_max**6, dl_max, dl_max**3, dl_max**5])
+    while True:
+        n = int(np.ceil((fi_max - fi_min) / krok)) + 3
+        if n > maks_wezlow:
+            raise ValueError(f"błąd {blad} m wymaga ponad {maks_wezlow} węzłów tablicy - należy użyć przeliczenia dokładnego")
+        start = fi_min - krok
+        wezly = wspolczynniki_gk(a, e2, start + krok * np.arange(n))
+        srodki = wspolczynniki_gk(a, e2, start + krok * (np.arange(n - 1) + 0.5))
+        bledy = np.abs((wezly[:-1] + wezly[1:]) / 2 - srodki) * potegi
+        osiagniety = max(bledy[:, :4].sum(axis=1).max(), bledy[:, 4:].sum(axis=1).max())
+        if osiagniety < blad / 2:
+            break
+        krok /= 2
+    dane = np.zeros((15, n))
+    dane[0, :7] = (a, e2, start, krok, dl_max, blad, n)
+    dane[1:8] = wezly.T
+    dane[8:, :-1] = np.diff(wezly, axis=0).T
+    return TablicaGK(dane)
+
+
+def wczytaj_tablice_gk(sciezka):
+    '''
+    Wczytuje tablicę TablicaGK zapisaną przez TablicaGK.zapisz (plik mapowany w pamięci).
+    '''
+    return TablicaGK(np.load(sciezka, mmap_mode='r'), sciezka)
+
+
+def tablica_gk(a, e2, sciezka, blad=1e-4):
+    '''
+    Zwraca tablicę z pliku sciezka, jeśli została zbudowana dla tej elipsoidy z błędem nie większym
+    niż blad; w przeciwnym razie buduje nową tablicę i zapisuje ją w tym pliku.
+    '''
+    if os.path.exists(sciezka):
+        tablica = wczytaj_tablice_gk(sciezka)
+        if (tablica.a, tablica.e2) == (a, e2) and tablica.blad <= blad:
+            return tablica
+    tablica = zbuduj_tablice_gk(a, e2, blad)
+    tablica.zapisz(sciezka)
+    return tablica
+
+
+class WynikiZwarte:
+    """
+    Zwarty kontener wyników potoku wsadowego (wczytanie_oraz_zapisanie): jedna tablica strukturalna
+    z wierszem na punkt i kolumnami X, Y, Z, fi, lam, h, x92, y92, x00, y00, n, e, u zamiast osobnych
+    tablic. Przy float32 kolumny zapisywane w plikach z dokładnością do milimetra (X, Y, Z, h,
+    x92, y92, x00, y00 - Transformacje.format_metry) przechowywane są jako float32 względem przesunięcia
+    (środek zakresu pierwszego bloku zaokrąglony do metra). Blok, którego błąd dekodowania przekracza
+    tolerancję (domyślnie 0.1 mm) lub zmienia choć jedną wartość wypisaną z dokładnością do milimetra,
+    przełącza kolumnę z powrotem na float64 - pliki wynikowe są więc identyczne jak przy float64.
+    Kąty fi, lam [rad] oraz n, e, u (wypisywane z 16 miejscami po przecinku) pozostają float64.
+        dane - tablica strukturalna (N,)
+        przesuniecia - [m] przesunięcia kolumn zapisanych jako float32
+    """
+    kolumny = ('X', 'Y', 'Z', 'fi', 'lam', 'h', 'x92', 'y92', 'x00', 'y00', 'n', 'e', 'u')
+    milimetrowe = ('X', 'Y', 'Z', 'h', 'x92', 'y92', 'x00', 'y00')
+
+    def __init__(self, n, float32=False, tolerancja=0.0001):
+        self.przesuniecia = {k: None for k in WynikiZwarte.milimetrowe} if float32 else {}
+        self.tolerancja = tolerancja
+        self.dane = np.zeros(n, dtype=[(k, np.float32 if k in self.przesuniecia else np.float64) for k in WynikiZwarte.kolumny])
+
+    def __len__(self):
+        return len(self.dane)
+
+    def zapisz(self, start, wyniki):
+        '''
+        Zapisuje kolumny wyników (DICT nazwa: ARRAY float64) w wierszach od start.
+        '''
+        for nazwa, wartosci in wyniki.items():
+            wartosci = np.asarray(wartosci, dtype=np.float64)
+            stop = start + len(wartosci)
+            if nazwa in self.przesuniecia:
+                if self.przesuniecia[nazwa] is None:
+                    skonczone = wartosci[np.isfinite(wartosci)]
+                    self.przesuniecia[nazwa] = float(np.round((skonczone.min() + skonczone.max()) / 2)) if skonczone.size else 0.0
+                kod = (wartosci - self.przesuniecia[nazwa]).astype(np.float32)
+                odkodowane = kod.astype(np.float64) + self.przesuniecia[nazwa]
+                with np.errstate(invalid='ignore'):
+                    blad = np.abs(odkodowane - wartosci)
+                if not np.any(blad > self.tolerancja) and WynikiZwarte.ten_sam_tekst(wartosci, odkodowane, blad):
+                    self.dane[nazwa][start:stop] = kod
+                    continue
+                WynikiZwarte.rozszerz(self, nazwa)
+            self.dane[nazwa][start:stop] = wartosci
+
+    @staticmethod
+    def ten_sam_tekst(wartosci, odkodowane, blad):
+        '''
+        Sprawdza, czy wartości po odkodowaniu wypisują się tak samo jak oryginalne (%.3f). Tekst może
+        się zmienić tylko dla wartości leżących bliżej połowy milimetra niż wynosi błąd, więc tylko one
+        są formatowane i porównywane.
+        '''
+        with np.errstate(invalid='ignore'):
+            tysiace = wartosci * 1000
+            podejrzane = np.abs(tysiace - np.floor(tysiace) - 0.5) <= blad * 1000 + 1e-6
+        indeksy = np.flatnonzero(podejrzane)
+        return all("%.3f" % a == "%.3f" % b for a, b in zip(wartosci[indeksy].tolist(), odkodowane[indeksy].tolist()))
+
+    def rozszerz(self, nazwa):
+        '''
+        Zamienia kolumnę float32 na float64 (z odkodowaniem zapisanych już wartości).
+        '''
+        typ = [(k, np.float64 if k == nazwa else self.dane.dtype[k]) for k in WynikiZwarte.kolumny]
+        dane = np.empty(len(self.dane), dtype=typ)
+        for k in WynikiZwarte.kolumny:
+            dane[k] = WynikiZwarte.kolumna(self, k) if k == nazwa else self.dane[k]
+        self.dane = dane
+        del self.przesuniecia[nazwa]
+
+    def kolumna(self, nazwa, start=0, stop=None):
+        '''
+        Zwraca kolumnę (lub jej wiersze start..stop-1) jako float64.
+        '''
+        wartosci = self.dane[nazwa][start:stop].astype(np.float64)
+        if nazwa in self.przesuniecia:
+            wartosci += self.przesuniecia[nazwa]
+        return wartosci
+
+    def wyniki(self, start=0, stop=None):
+        '''
+        Returns
+        -------
+        wyniki : DICT
+            kolumny float64 jak w Transformacje.zapisanie_tablice
+        neu : ARRAY (n, 3)
+        '''
+        wyniki = {k: WynikiZwarte.kolumna(self, k, start, stop) for k in WynikiZwarte.kolumny[:10]}
+        neu = np.column_stack([WynikiZwarte.kolumna(self, k, start, stop) for k in ('n', 'e', 'u')])
+        return(wyniki, neu)
+
+    def bajty_na_punkt(self):
+        return self.dane.itemsize
+
+    def kolumny_float32(self):
+        return [k for k in WynikiZwarte.kolumny if self.dane.dtype[k] == np.float32]
+
+
+class Profil:
+    """
+    Liczniki i czasy etapów przetwarzania (tryb --profile). Obiekt przypisany do Transformacje.profil zbiera:
+        etapy - dla każdego etapu czas [s], liczbę punktów i liczbę wywołań
+        iteracje - histogram liczby iteracji algorytmu Hirvonena potrzebnych do zbieżności
+        bajty - liczba bajtów zapisanych do plików wynikowych
+    """
+
+    def __init__(self):
+        self.etapy = {}
+        self.iteracje = np.zeros(0, dtype=np.int64)
+        self.bajty = 0
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def etap(self, nazwa, punkty=0):
+        '''
+        Mierzy czas bloku kodu i dolicza go, razem z liczbą punktów, do etapu nazwa.
+        Zwracany słownik pozwala podać liczbę punktów znaną dopiero wewnątrz bloku (klucz punkty).
+        '''
+        pomiar = {'punkty': punkty}
+        t0 = time.perf_counter()
+        try:
+            yield pomiar
+        finally:
+            etap = self.etapy.setdefault(nazwa, {'czas_s': 0.0, 'punkty': 0, 'wywolania': 0})
+            etap['czas_s'] += time.perf_counter() - t0
+            etap['punkty'] += int(pomiar['punkty'])
+            etap['wywolania'] += 1
+
+    def dodaj_iteracje(self, liczby):
+        '''
+        Dolicza do histogramu liczby iteracji Hirvonena (INT lub ARRAY, jedna wartość na punkt).
+        '''
+        histogram = np.bincount(np.ravel(liczby).astype(np.int64))
+        if len(histogram) >= len(self.iteracje):
+            histogram[:len(self.iteracje)] += self.iteracje
+            self.iteracje = histogram
+        else:
+            self.iteracje[:len(histogram)] += histogram
+
+    def podsumowanie(self):
+        '''
+        Returns
+        -------
+        DICT - czas całkowity, etapy, bajty zapisane oraz statystyki iteracji Hirvonena (min/średnia/max, histogram)
+        '''
+        wynik = {'czas_calkowity_s': time.perf_counter() - self.start, 'etapy': self.etapy, 'bajty_zapisane': self.bajty}
+        liczby = np.flatnonzero(self.iteracje)
+        if len(liczby):
+            punkty = int(self.iteracje.sum())
+            wynik['iteracje_hirvonena'] = {
+                'punkty': punkty,
+                'min': int(liczby[0]),
+                'srednia': float(np.arange(len(self.iteracje)) @ self.iteracje) / punkty,
+                'max': int(liczby[-1]),
+                'histogram': {str(k): int(self.iteracje[k]) for k in liczby.tolist()},
+            }
+        return wynik
+
+    def dolacz(self, inny):
+        '''
+        Dolicza etapy, iteracje i bajty innego obiektu Profil (np. z procesu puli).
+        Czasy etapów wykonywanych równolegle są sumowane, czyli odpowiadają łącznemu czasowi procesów.
+        '''
+        for nazwa, etap in inny.etapy.items():
+            suma = self.etapy.setdefault(nazwa, {'czas_s': 0.0, 'punkty': 0, 'wywolania': 0})
+            for klucz in suma:
+                suma[klucz] += etap[klucz]
+        Profil.dodaj_iteracje(self, np.repeat(np.arange(len(inny.iteracje)), inny.iteracje))
+        self.bajty += inny.bajty
+
+    def zapisz(self, sciezka, **opis):
+        '''
+        Zapisuje podsumowanie, uzupełnione o pola opis (np. funkcja, plik), jako plik JSON.
+        '''
+        with open(sciezka, "w", encoding="utf-8") as plik:
+            json.dump({**opis, **Profil.podsumowanie(self)}, plik, indent=2, ensure_ascii=False)
+
 
 class Transformacje:
     
+    metody = ("hirvonen", "bowring", "vermeille")
+    format_rad = "%16.12f"
+    format_dziesietne = "%16.10f"
+    format_metry = "%21.3f"
+    format_neu = "%50.16f"
+    brak_PL = "         '-'         "
     
-    def __init__(self, elipsoida):
+    def __init__(self, elipsoida, method="hirvonen"):
         """
         Parametry elipsoid:
             a - duża półoś elipsoidy - promień równikowy
@@ -19,9 +598,31 @@ class Transformacje:
         + WGS84: https://en.wikipedia.org/wiki/World_Geodetic_System#WGS84
         + Inne powierzchnie odniesienia: https://en.wikibooks.org/wiki/PROJ.4#Spheroid
         + Parametry planet: https://nssdc.gsfc.nasa.gov/planetary/factsheet/index.html
+
+        method - metoda przeliczenia XYZ -> BLH używana przez xyz2flh:
+            hirvonen - iteracyjny algorytm Hirvonena
+            bowring - jednokrokowa metoda Bowringa
+            vermeille - rozwiązanie zamknięte Vermeille'a
         """
+        if method not in Transformacje.metody:
+            raise NotImplementedError(f"{method} - metoda nie jest obsługiwana, dostępne: {', '.join(Transformacje.metody)}")
         self.a = elipsoida[0]
         self.e2 = elipsoida[1]
+        self.stale = stale_elipsoidy(self.a, self.e2)
+        self.method = method
+        self.liczba_rozwiazan = 0
+        self.profil = None
+        self.pamiec = None
+        self.tablica = None
+
+    def etap(self, nazwa, punkty=0):
+        '''
+        Pomiar etapu przetwarzania, gdy włączone jest profilowanie (self.profil), w przeciwnym razie nic nie robi.
+        '''
+        if self.profil is None:
+            return nullcontext({})
+        return self.profil.etap(nazwa, punkty)
+
     def dms(self, x):
         '''
         Funkcja dms służy nam do zamiany jednostek, z radianów na stopnie.  
@@ -35,42 +636,69 @@ class Transformacje:
         x : STR
             [dms] - stopnie, minuty, sekundy
         '''
-        sig = ' '
-        if x < 0:
-            sig = '-'
-            x = abs(x)
-        x = x * 180/np.pi
-        d = int(x)
-        m = int(60 * (x - d))
+        return(str(Transformacje.dms_tablice(self, [x])[0]))
+
+    def dms_liczbowo(self, x):
+        '''
+        Wektorowa zamiana radianów na stopnie, minuty i sekundy, z przeniesieniem
+        zaokrąglenia sekund (59.999995″ -> 1′) i minut (60′ -> 1°).
+
+        Parametry
+        ----------
+        x : ARRAY
+            [rad]
+
+        Returns
+        -------
+        dms : ARRAY strukturalna o polach
+            znak (-1 lub 1, 0 dla NaN), d [°], m [′], s [″] (d = m = 0, s = NaN dla NaN)
+        '''
+        x = np.asarray(x, dtype=np.float64)
+        wynik = np.empty(x.shape, dtype=[('znak', 'i1'), ('d', 'i4'), ('m', 'i1'), ('s', 'f8')])
+        brak = np.isnan(x)
+        wynik['znak'] = np.where(x < 0, -1, np.where(brak, 0, 1))
+        x = np.where(brak, np.nan, np.abs(x) * 180/np.pi)
+        d = np.floor(x)
+        m = np.floor(60 * (x - d))
         s = (x - d - m/60)*3600
-        if s > 59.999995:
-            s = 0
-            m = m + 1
-        if m == 60:
-            m = 0
-            d = d + 1
-        
-        d = str(d)
-        if len(d) == 1:
-            d = "  " + d
-        elif len(d) == 2:
-            d = " " + d
-        elif len(d) == 3:
-            d = d
-            
-        if m < 10:
-            m = str(m)
-            m = "0" + m
-            
-        if s < 10:
-            s = "%.5f"%s
-            s = str(s)
-            s= "0" + s
-        else:
-            s = ("%.5f"%s)
-            
-        x1=(f'{d}°{m}′{s}″')  
-        return(x1)
+        przeniesienie = s > 59.999995
+        s[przeniesienie] = 0
+        m[przeniesienie] += 1
+        przeniesienie = m == 60
+        m[przeniesienie] = 0
+        d[przeniesienie] += 1
+        wynik['d'] = np.where(brak, 0, d)
+        wynik['m'] = np.where(brak, 0, m)
+        wynik['s'] = s
+        return(wynik)
+
+    def dms_tablice(self, x):
+        '''
+        Wektorowa wersja funkcji dms - zamienia całą kolumnę radianów na teksty ±ddd°mm′ss.sssss″
+        o stałej szerokości: pierwszy znak to '-' dla wartości ujemnych lub spacja, a stopnie zajmują
+        zawsze trzy pozycje. Dla NaN zwracany jest tekst '-'.
+
+        Parametry
+        ----------
+        x : ARRAY
+            [rad]
+
+        Returns
+        -------
+        x : ARRAY STR
+            [dms] - stopnie, minuty, sekundy
+        '''
+        x = np.asarray(x, dtype=np.float64)
+        dms = Transformacje.dms_liczbowo(self, x).ravel()
+        znaki = ["-" if z < 0 else " " for z in dms['znak'].tolist()]
+        pola = [None] * (4 * len(znaki))
+        pola[0::4] = znaki
+        pola[1::4] = dms['d'].tolist()
+        pola[2::4] = dms['m'].tolist()
+        pola[3::4] = dms['s'].tolist()
+        tekst = np.array(("%s%3d°%02d′%08.5f″\n" * len(znaki) % tuple(pola)).split("\n")[:-1], dtype=str)
+        tekst[dms['znak'] == 0] = "-"
+        return(tekst.reshape(x.shape))
         
         
     def NP(self, fi):
@@ -92,14 +720,18 @@ class Transformacje:
         return(N)
     
     
-    def algorytm_hirvonena(self, X, Y, Z, output="dec_degree"):
+    def algorytm_hirvonena(self, X, Y, Z, output="dec_degree", max_iter=20):
         '''
         Algorytm Hirvonena służy do konwersji współrzędnych prostokątnych (x, y, z) na współrzędne geodezyjne (fi, Lambda, h). Jest to proces iteracyjny, który umożliwia osiągnięcie dokładności rzędu 1 milimetra po kilku powtórzeniach procedury.
+         Dla tablic X, Y, Z obliczenia wykonywane są wsadowo przez algorytm_hirvonena_tablice.
+         Punkty na osi Z (p = 0) liczone są wprost: fi = ±90°, h = |Z| - b.
 
          Parametry
          ----------
-         X, Y, Z : FLOAT
-              współrzędne w układzie orto-kartezjańskim, 
+         X, Y, Z : FLOAT lub ARRAY
+              współrzędne w układzie orto-kartezjańskim,
+         max_iter : INT
+              maksymalna liczba iteracji; bez zbieżności (np. dane NaN) zwracane jest ostatnie przybliżenie
 
          Returns
          -------
@@ -115,17 +747,29 @@ class Transformacje:
          -radiany - rad 
          """
         '''
+        if np.ndim(X) > 0:
+            return Transformacje.algorytm_hirvonena_tablice(self, X, Y, Z, output=output, max_iter=max_iter)
 
         p = np.sqrt(X**2 + Y**2)
-        fi = np.arctan(Z/(p * (1 - self.e2)))
-        while True:
-            N = Transformacje.NP(self, fi)
-            h = (p / np.cos(fi)) - N
-            fip = fi
-            fi = np.arctan(Z / (p * (1 - self.e2 * (N / (N+h)))))
-            if np.abs(fip - fi) < (0.000001/206265):
-                break
+        iteracje = 0
+        if p == 0:
+            fi = np.copysign(np.pi/2, Z)
+            h = np.abs(Z) - self.stale.b
+        else:
+            fi = np.arctan(Z/(p * (1 - self.e2)))
+            h = np.nan
+            while iteracje < max_iter:
+                N = Transformacje.NP(self, fi)
+                h = (p / np.cos(fi)) - N
+                fip = fi
+                fi = np.arctan(Z / (p * (1 - self.e2 * (N / (N+h)))))
+                iteracje += 1
+                if np.abs(fip - fi) < self.stale.prog:
+                    break
         lam = np.arctan2(Y, X)
+        self.liczba_rozwiazan += 1
+        if self.profil is not None:
+            self.profil.dodaj_iteracje(iteracje)
         if output == "dec_degree":
             fi=(fi*180/np.pi)
             lam=(lam*180/np.pi)
@@ -141,6 +785,213 @@ class Transformacje:
         else:
             raise NotImplementedError(f"{output} - output format not defined")
 
+    def algorytm_hirvonena_tablice(self, X, Y, Z, output="dec_degree", max_iter=20):
+        '''
+        Wsadowa wersja algorytmu Hirvonena. Wszystkie punkty iterowane są jednocześnie,
+        a maska zbieżności wyłącza z obliczeń punkty, które osiągnęły już wymaganą dokładność.
+        Warunek zbieżności i punkty na osi Z (fi = ±90°, h = |Z| - b) są takie same jak w wersji
+        skalarnej, więc wyniki są identyczne.
+
+        Parametry
+        ----------
+        X, Y, Z : ARRAY
+            [m] - współrzędne w układzie orto-kartezjańskim
+        output : STR
+            dec_degree, dms lub radiany
+        max_iter : INT
+            maksymalna liczba iteracji; punkty, które nie osiągnęły zbieżności, zachowują ostatnie przybliżenie
+
+        Returns
+        -------
+        fi, lam : ARRAY
+            [st. dz. / dms / rad] - szerokość i długość geodezyjna
+        h : ARRAY
+            [m] - wysokość elipsoidalna
+        '''
+        X = np.asarray(X, dtype=np.float64)
+        Y = np.asarray(Y, dtype=np.float64)
+        Z = np.asarray(Z, dtype=np.float64)
+        # float_power liczy kwadrat przez pow() jak X**2 dla liczb float w wersji skalarnej;
+        # X**2 dla tablic to mnożenie X*X, które co ok. tysięczny punkt różni się o 1 ulp
+        p = np.sqrt(np.float_power(X, 2) + np.float_power(Y, 2))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fi = np.arctan(Z/(p * (1 - self.e2)))
+            h = np.zeros_like(p)
+            aktywne = np.ones(p.shape, dtype=bool)
+            iteracje = np.zeros(p.shape, dtype=np.int64) if self.profil is not None else None
+            for _ in range(max_iter):
+                if iteracje is not None:
+                    iteracje[aktywne] += 1
+                fi_a = fi[aktywne]
+                p_a = p[aktywne]
+                N = Transformacje.NP(self, fi_a)
+                h_a = (p_a / np.cos(fi_a)) - N
+                fi_n = np.arctan(Z[aktywne] / (p_a * (1 - self.e2 * (N / (N+h_a)))))
+                h[aktywne] = h_a
+                fi[aktywne] = fi_n
+                aktywne[aktywne] = ~(np.abs(fi_a - fi_n) < self.stale.prog)
+                if not aktywne.any():
+                    break
+        biegun = p == 0
+        if biegun.any():
+            fi[biegun] = np.copysign(np.pi/2, Z[biegun])
+            h[biegun] = np.abs(Z[biegun]) - self.stale.b
+        lam = np.arctan2(Y, X)
+        self.liczba_rozwiazan += np.size(lam)
+        if iteracje is not None:
+            self.profil.dodaj_iteracje(iteracje)
+        return Transformacje.format_flh(self, fi, lam, h, output)
+
+    def format_flh(self, fi, lam, h, output):
+        '''
+        Zamienia wyniki fi, lam [rad] na format wyjściowy stosowany przez funkcje XYZ -> BLH.
+
+        Parametry
+        ----------
+        fi, lam : FLOAT lub ARRAY
+            [rad] - szerokość i długość geodezyjna
+        h : FLOAT lub ARRAY
+            [m] - wysokość elipsoidalna
+        output : STR
+            dec_degree, dms lub radiany
+
+        Returns
+        -------
+        fi, lam, h
+        '''
+        if output == "dec_degree":
+            return (fi*180/np.pi, lam*180/np.pi, h)
+        elif output == "dms":
+            if np.ndim(fi) == 0:
+                return (Transformacje.dms(self, fi), Transformacje.dms(self, lam), h)
+            return (Transformacje.dms_tablice(self, fi), Transformacje.dms_tablice(self, lam), h)
+        elif output == 'radiany':
+            return (fi, lam, h)
+        else:
+            raise NotImplementedError(f"{output} - output format not defined")
+
+    def xyz2flh(self, X, Y, Z, output="dec_degree"):
+        '''
+        Przeliczenie XYZ -> BLH metodą wybraną w konstruktorze (parametr method).
+        Działa zarówno dla pojedynczych wartości, jak i dla tablic. Pojedyncze punkty
+        zapamiętywane są w self.pamiec (jeśli włączona); w tablicach pamięć pomija kolejne
+        powtórzenia tego samego punktu (xyz2flh_serie) - pełne wyszukiwanie powtórzeń kosztuje
+        więcej niż samo rozwiązanie wektorowe.
+
+        Parametry
+        ----------
+        X, Y, Z : FLOAT lub ARRAY
+            [m] - współrzędne w układzie orto-kartezjańskim
+        output : STR
+            dec_degree, dms lub radiany
+
+        Returns
+        -------
+        fi, lam, h
+        '''
+        if self.pamiec is not None and np.ndim(X) == 0:
+            klucz = self.pamiec.klucz_xyz(self, X, Y, Z)
+            fi, lam, h = self.pamiec.pobierz(klucz, lambda: Transformacje.xyz2flh_metoda(self, X, Y, Z, "radiany"))
+            return Transformacje.format_flh(self, fi, lam, h, output)
+        if self.pamiec is not None:
+            return Transformacje.xyz2flh_serie(self, X, Y, Z, output)
+        return Transformacje.xyz2flh_metoda(self, X, Y, Z, output)
+
+    def xyz2flh_serie(self, X, Y, Z, output="dec_degree"):
+        '''
+        Przeliczenie tablic XYZ -> BLH, w którym serie kolejnych punktów o tych samych współrzędnych
+        (zaokrąglonych jak klucze self.pamiec) rozwiązywane są raz, np. stacja bazowa zapisywana
+        w każdej epoce. Wyszukanie serii to jedno porównanie sąsiednich wierszy (ok. 10% czasu
+        rozwiązania, gdy punkty się nie powtarzają). Powtórzenia liczone są jako trafienia pamięci.
+        '''
+        X = np.asarray(X, dtype=np.float64)
+        Y = np.asarray(Y, dtype=np.float64)
+        Z = np.asarray(Z, dtype=np.float64)
+        klucze = np.round(np.column_stack([X.ravel(), Y.ravel(), Z.ravel()]), self.pamiec.miejsca)
+        poczatki = np.ones(len(klucze), dtype=bool)
+        np.any(klucze[1:] != klucze[:-1], axis=1, out=poczatki[1:])
+        indeksy = np.flatnonzero(poczatki)
+        self.pamiec.chybienia += len(indeksy)
+        self.pamiec.trafienia += len(klucze) - len(indeksy)
+        if len(indeksy) == len(klucze):
+            return Transformacje.xyz2flh_metoda(self, X, Y, Z, output)
+        fi, lam, h = Transformacje.xyz2flh_metoda(self, X.ravel()[indeksy], Y.ravel()[indeksy], Z.ravel()[indeksy], "radiany")
+        dlugosci = np.diff(np.append(indeksy, len(klucze)))
+        fi, lam, h = (np.repeat(v, dlugosci).reshape(X.shape) for v in (fi, lam, h))
+        return Transformacje.format_flh(self, fi, lam, h, output)
+
+    def xyz2flh_metoda(self, X, Y, Z, output="dec_degree"):
+        '''
+        Przeliczenie XYZ -> BLH metodą self.method, bez pamięci podręcznej.
+        '''
+        if self.method == "bowring":
+            return Transformacje.bowring(self, X, Y, Z, output=output)
+        elif self.method == "vermeille":
+            return Transformacje.vermeille(self, X, Y, Z, output=output)
+        return Transformacje.algorytm_hirvonena(self, X, Y, Z, output=output)
+
+    def bowring(self, X, Y, Z, output="dec_degree"):
+        '''
+        Jednokrokowa metoda Bowringa (1976). Szerokość wyznaczana jest bez iteracji z szerokości
+        zredukowanej, a wysokość ze wzoru h = p cos(fi) + Z sin(fi) - a^2/N, który jest stabilny także na biegunach.
+        Dla punktów przy powierzchni Ziemi błąd jest rzędu 0.01 mm.
+
+        Parametry
+        ----------
+        X, Y, Z : FLOAT lub ARRAY
+            [m] - współrzędne w układzie orto-kartezjańskim
+        output : STR
+            dec_degree, dms lub radiany
+
+        Returns
+        -------
+        fi, lam, h
+        '''
+        b = self.stale.b
+        p = np.sqrt(X**2 + Y**2)
+        theta = np.arctan2(Z * self.a, p * b)
+        fi = np.arctan2(Z + self.stale.e_2 * b * np.sin(theta)**3, p - self.e2 * self.a * np.cos(theta)**3)
+        N = Transformacje.NP(self, fi)
+        h = p * np.cos(fi) + Z * np.sin(fi) - self.a**2 / N
+        lam = np.arctan2(Y, X)
+        self.liczba_rozwiazan += np.size(lam)
+        return Transformacje.format_flh(self, fi, lam, h, output)
+
+    def vermeille(self, X, Y, Z, output="dec_degree"):
+        '''
+        Rozwiązanie zamknięte Vermeille'a (2004). Nie wymaga iteracji i obsługuje punkty na biegunach
+        (X = 0, Y = 0). Nie jest określone jedynie w okolicy środka elipsoidy.
+
+        Parametry
+        ----------
+        X, Y, Z : FLOAT lub ARRAY
+            [m] - współrzędne w układzie orto-kartezjańskim
+        output : STR
+            dec_degree, dms lub radiany
+
+        Returns
+        -------
+        fi, lam, h
+        '''
+        e4 = self.stale.e4
+        pp = X**2 + Y**2
+        p = pp / self.a**2
+        q = (1 - self.e2) / self.a**2 * Z**2
+        r = (p + q - e4) / 6
+        s = e4 * p * q / (4 * r**3)
+        t = np.cbrt(1 + s + np.sqrt(s * (2 + s)))
+        u = r * (1 + t + 1/t)
+        v = np.sqrt(u**2 + e4 * q)
+        w = self.e2 * (u + v - q) / (2 * v)
+        k = np.sqrt(u + v + w**2) - w
+        D = k * np.sqrt(pp) / (k + self.e2)
+        DZ = np.sqrt(D**2 + Z**2)
+        fi = 2 * np.arctan2(Z, D + DZ)
+        h = (k + self.e2 - 1) / k * DZ
+        lam = np.arctan2(Y, X)
+        self.liczba_rozwiazan += np.size(lam)
+        return Transformacje.format_flh(self, fi, lam, h, output)
+
     def odwrotny_hirvonen(self, fi, lam, h):
        '''
       Algorytm odwrotny do algorytmu Hirvonena służy do przekształcania współrzędnych geodezyjnych (B, L, H) 
@@ -171,122 +1022,423 @@ class Transformacje:
        return(X,Y,Z)
    
    
+    def gauss_kruger(self, fi, lam, l0, m0):
+       '''
+       Wspólny, wektorowy rdzeń odwzorowania Gaussa-Krügera dla układów PL-1992 i PL-2000.
+       Każdy punkt może mieć własny południk osiowy oraz skalę, dzięki czemu punkty
+       z różnych stref (lub obu układów) przeliczane są w jednym przebiegu.
+       Z przypisaną tablicą interpolacyjną (self.tablica = TablicaGK) tablice punktów przeliczane są
+       interpolacją, a punkty spoza tablicy i pojedyncze punkty - dokładnymi szeregami.
+
+       Parametry
+       ----------
+       fi, lam : FLOAT lub ARRAY
+           [rad] - szerokość i długość geodezyjna
+       l0 : FLOAT lub ARRAY
+           [rad] - południk osiowy
+       m0 : FLOAT lub ARRAY
+           skala na południku osiowym
+
+       Returns
+       -------
+        x, y : FLOAT lub ARRAY
+             [m] - współrzędne w odwzorowaniu Gaussa-Krügera pomnożone przez skalę m0
+             (bez przesunięć układu)
+       '''
+       if self.tablica is None or np.ndim(fi) == 0:
+           return Transformacje.gauss_kruger_szeregi(self, fi, lam, l0, m0)
+       fi, lam, l0, m0 = np.broadcast_arrays(fi, lam, l0, m0)
+       x = np.empty(fi.shape)
+       y = np.empty(fi.shape)
+       xt, yt, maska = self.tablica.oblicz(fi, lam - l0)
+       x[maska] = xt * m0[maska]
+       y[maska] = yt * m0[maska]
+       if not maska.all():
+           reszta = ~maska
+           x[reszta], y[reszta] = Transformacje.gauss_kruger_szeregi(self, fi[reszta], lam[reszta], l0[reszta], m0[reszta])
+       return(x, y)
+
+
+    def gauss_kruger_szeregi(self, fi, lam, l0, m0):
+       '''
+       Dokładne odwzorowanie Gaussa-Krügera (pełne szeregi trygonometryczne).
+
+       Parametry
+       ----------
+       fi, lam : FLOAT lub ARRAY
+           [rad] - szerokość i długość geodezyjna
+       l0 : FLOAT lub ARRAY
+           [rad] - południk osiowy
+       m0 : FLOAT lub ARRAY
+           skala na południku osiowym
+
+       Returns
+       -------
+        x, y : FLOAT lub ARRAY
+             [m] - współrzędne w odwzorowaniu Gaussa-Krügera pomnożone przez skalę m0
+             (bez przesunięć układu)
+
+       '''
+       st = self.stale
+       dl = lam - l0
+       dl2 = dl**2
+       dl4 = dl2**2
+       sin_fi = np.sin(fi)
+       cos_fi = np.cos(fi)
+       cos2 = cos_fi**2
+       t2 = np.tan(fi)**2
+       t4 = t2**2
+       n2 = st.e_2 * cos2
+       n4 = n2 ** 2
+       N = Transformacje.NP(self, fi)
+       sigma = self.a * ((st.A0 * fi) - st.A2 * np.sin(2*fi) + st.A4 * np.sin(4*fi) - st.A6 * np.sin(6*fi))
+       xgk = sigma + (dl2/2) * N * sin_fi * cos_fi * (1 + (dl2/12)*cos2*(5 - t2 + 9 * n2 + 4 * n4) + (dl4/360) * (cos2**2)*(61 - (58 * t2) + t4 + (270 * n2) - (330 * n2 * t2)))
+       ygk = dl * N * cos_fi * (1 + (dl2/6) * cos2 * (1 - t2 + n2) + (dl4/120) * (cos2**2) * (5 - (18 * t2) + t4 + (14 * n2) - 58 * n2 * t2))
+       return(xgk * m0, ygk * m0)
+
+
+    def maska_PL(self, fi, lam):
+       '''
+       Zwraca maskę punktów leżących w obszarze obsługiwanym przez układy PL-1992 i PL-2000
+       (48.9° <= fi <= 55°, 13.5° <= lam <= 25.5°).
+
+       Parametry
+       ----------
+       fi, lam : FLOAT lub ARRAY
+           [st. dz.] - szerokość i długość
+
+       Returns
+       -------
+        maska : BOOL lub ARRAY
+       '''
+       return (lam >= 13.5) & (lam <= 25.5) & (fi <= 55) & (fi >= 48.9)
+
+
+    def strefy_PL2000(self, lam):
+       '''
+       Wektorowe przypisanie stref układu PL-2000 (południki 15°, 18°, 21° i 24°E).
+
+       Parametry
+       ----------
+       lam : ARRAY
+           [st. dz.] - długość
+
+       Returns
+       -------
+        strefa : ARRAY
+             numer strefy (5, 6, 7, 8), NaN poza zakresem 13.5° - 25.5°
+        l0 : ARRAY
+             [rad] - południk osiowy strefy, NaN poza zakresem
+       '''
+       lam = np.asarray(lam, dtype=np.float64)
+       with np.errstate(invalid='ignore'):
+           indeks = np.minimum(np.floor((lam - 13.5) / 3), 3)
+       poza = (lam < 13.5) | (lam > 25.5) | np.isnan(lam)
+       indeks = np.where(poza, 0, indeks).astype(np.intp)
+       strefa = np.where(poza, np.nan, indeks + 5)
+       l0 = np.where(poza, np.nan, np.take(self.stale.l0_PL2000, indeks))
+       return(strefa, l0)
+
+
     def flh2PL1992(self, fi, lam):
        '''
        Układ współrzędnych 1992 (PUWG-92) to system płaskich współrzędnych prostokątnych,
        który używa odwzorowania Gaussa-Krügera dla elipsoidy GRS80 w ramach pojedynczej dziesięciostopniowej strefy.
+       Dla tablic punkty spoza obszaru układu otrzymują wartość NaN.
 
        Parametry
        ----------
-       fi : FLOAT
+       fi : FLOAT lub ARRAY
            [st. dz.] - szerokość
-       lam : FLOAT
+       lam : FLOAT lub ARRAY
            [st. dz] - długośc
 
        Returns
        -------
-        X1992, Y1992 : FLOAT
+        X1992, Y1992 : FLOAT lub ARRAY
              [m] - współrzędne (1992)
 
        '''
-       
-       if lam > 25.5 or lam < 13.5:
-           raise NotImplementedError(f"{Transformacje.dms(self, np.radians(lam))} ten południk nie jest obsługiwany przez układ współrzędnych płaskich PL1992")
-           
-       if fi > 55 or fi < 48.9:
-           raise NotImplementedError(f"{Transformacje.dms(self, np.radians(fi))} ten równoleżnik nie jest obsługiwany przez układ współrzędnych płaskich PL1992")
-           
-       fi = np.radians(fi)
-       lam = np.radians(lam)
-       a2 = self.a**2
-       b2 = a2 * (1 - self.e2)
-       e_2 = (a2 - b2)/b2
-       l0 = np.radians(19)
-       dl = lam - l0
-       dl2 = dl**2
-       dl4 = dl**4
-       t = np.tan(fi)
-       t2 = t**2
-       t4 = t**4
-       n2 = e_2 * (np.cos(fi)**2)
-       n4 = n2 ** 2
-       N = Transformacje.NP(self, fi)
-       e4 = self.e2**2
-       e6 = self.e2**3
-       A0 = 1 - (self.e2/4) - ((3*e4)/64) - ((5*e6)/256)
-       A2 = (3/8) * (self.e2 + e4/4 + (15*e6)/128)
-       A4 = (15/256) * (e4 + (3*e6)/4)
-       A6 = (35*e6)/3072
-       sigma = self.a * ((A0 * fi) - A2 * np.sin(2*fi) + A4 * np.sin(4*fi) - A6 * np.sin(6*fi))
-       xgk = sigma + ((dl**2)/2) * N * np.sin(fi) * np.cos(fi) * (1 + ((dl**2)/12)*(np.cos(fi)**2)*(5 - t2 + 9 * n2 + 4 * n4) + (dl4/360) * (np.cos(fi)**4)*(61 - (58 * t2) + t4 + (270 * n2) - (330 * n2 * t2)))
-       ygk = dl * N * np.cos(fi) * (1 + (dl2/6) * (np.cos(fi)**2) * (1 - t2 + n2) + (dl4/120) * (np.cos(fi)**4) * (5 - (18 * t2) + t4 + (14 * n2) - 58 * n2 * t2))
-       x92 = xgk * 0.9993 - 5300000
-       y92 = ygk * 0.9993 + 500000
+       if np.ndim(fi) == 0 and np.ndim(lam) == 0:
+           if lam > 25.5 or lam < 13.5:
+               raise NotImplementedError(f"{Transformacje.dms(self, np.radians(lam))} ten południk nie jest obsługiwany przez układ współrzędnych płaskich PL1992")
+
+           if fi > 55 or fi < 48.9:
+               raise NotImplementedError(f"{Transformacje.dms(self, np.radians(fi))} ten równoleżnik nie jest obsługiwany przez układ współrzędnych płaskich PL1992")
+
+           xgk, ygk = Transformacje.gauss_kruger(self, np.radians(fi), np.radians(lam), self.stale.l0_PL1992, 0.9993)
+           return(xgk - 5300000, ygk + 500000)
+
+       fi = np.asarray(fi, dtype=np.float64)
+       lam = np.asarray(lam, dtype=np.float64)
+       poza = ~Transformacje.maska_PL(self, fi, lam)
+       xgk, ygk = Transformacje.gauss_kruger(self, np.radians(fi), np.radians(lam), self.stale.l0_PL1992, 0.9993)
+       x92 = np.where(poza, np.nan, xgk - 5300000)
+       y92 = np.where(poza, np.nan, ygk + 500000)
        return(x92,y92)
-   
-   
+
+
     def flh2PL2000(self, fi, lam):
        '''
       Układ współrzędnych 2000 to system prostych współrzędnych płaskich.
       Wykorzystuje on odwzorowanie Gaussa-Krügera dla elipsoidy GRS 80 w czterech określonych strefach, na południkach
-      15°E, 18°E, 21°E i 24°E.
+      15°E, 18°E, 21°E i 24°E. Dla tablic punkty spoza obszaru układu otrzymują wartość NaN.
 
        Parametry
        ----------
-       fi : FLOAT
+       fi : FLOAT lub ARRAY
            [st. dz.] - szerokość 
-       lam : FLOAT
+       lam : FLOAT lub ARRAY
            [st. dz.] - długośc 
 
        Returns
        -------
-        X2000, Y2000 : FLOAT
+        X2000, Y2000 : FLOAT lub ARRAY
              [m] - współrzędne 
 
        '''
-         
-       if lam >= 13.5 and lam < 16.5:
-           l0 = np.radians(15)
-       elif lam >= 16.5 and lam < 19.5:
-           l0 = np.radians(18)
-       elif lam >= 19.5 and lam < 22.5:
-           l0 = np.radians(21)
-       elif lam >= 22.5 and lam <= 25.5:
-           l0 = np.radians(24)
-       else:
-           raise NotImplementedError(f"{Transformacje.dms(self, np.radians(lam))} ten południk nie mieści się w zakresie")
-       
-       if fi > 55 or fi < 48.9:
-           raise NotImplementedError(f"{Transformacje.dms(self, np.radians(fi))} ten równoleżnik nie mieści się w zakresie")
-           
-       fi = np.radians(fi)
-       lam = np.radians(lam)
-       a2 = self.a**2
-       b2 = a2 * (1 - self.e2)
-       e_2 = (a2 - b2)/b2
-       dl = lam - l0
-       dl2 = dl**2
-       dl4 = dl**4
-       t = np.tan(fi)
-       t2 = t**2
-       t4 = t**4
-       n2 = e_2 * (np.cos(fi)**2)
-       n4 = n2 ** 2
-       N = Transformacje.NP(self, fi)
-       e4 = self.e2**2
-       e6 = self.e2**3
-       A0 = 1 - (self.e2/4) - ((3*e4)/64) - ((5*e6)/256)
-       A2 = (3/8) * (self.e2 + e4/4 + (15*e6)/128)
-       A4 = (15/256) * (e4 + (3*e6)/4)
-       A6 = (35*e6)/3072
-       sigma = self.a * ((A0 * fi) - A2 * np.sin(2*fi) + A4 * np.sin(4*fi) - A6 * np.sin(6*fi))
-       xgk = sigma + ((dl**2)/2) * N * np.sin(fi) * np.cos(fi) * (1 + ((dl**2)/12)*(np.cos(fi)**2)*(5 - t2 + 9 * n2 + 4 * n4) + (dl4/360) * (np.cos(fi)**4)*(61 - (58 * t2) + t4 + (270 * n2) - (330 * n2 * t2)))
-       ygk = dl * N * np.cos(fi) * (1 + (dl2/6) * (np.cos(fi)**2) * (1 - t2 + n2) + (dl4/120) * (np.cos(fi)**4) * (5 - (18 * t2) + t4 + (14 * n2) - 58 * n2 * t2))
-       strefa = round(l0 * 180/np.pi)/3
-       x00 = xgk * 0.999923
-       y00 = ygk * 0.999923 + strefa * 1000000 + 500000
+       if np.ndim(fi) == 0 and np.ndim(lam) == 0:
+           if lam < 13.5 or lam > 25.5:
+               raise NotImplementedError(f"{Transformacje.dms(self, np.radians(lam))} ten południk nie mieści się w zakresie")
+
+           if fi > 55 or fi < 48.9:
+               raise NotImplementedError(f"{Transformacje.dms(self, np.radians(fi))} ten równoleżnik nie mieści się w zakresie")
+
+           indeks = min(int((lam - 13.5) // 3), 3)
+           xgk, ygk = Transformacje.gauss_kruger(self, np.radians(fi), np.radians(lam), self.stale.l0_PL2000[indeks], 0.999923)
+           return(xgk, ygk + (indeks + 5) * 1000000 + 500000)
+
+       fi = np.asarray(fi, dtype=np.float64)
+       lam = np.asarray(lam, dtype=np.float64)
+       poza = ~Transformacje.maska_PL(self, fi, lam)
+       strefa, l0 = Transformacje.strefy_PL2000(self, lam)
+       xgk, ygk = Transformacje.gauss_kruger(self, np.radians(fi), np.radians(lam), l0, 0.999923)
+       x00 = np.where(poza, np.nan, xgk)
+       y00 = np.where(poza, np.nan, ygk + strefa * 1000000 + 500000)
        return(x00,y00)
+
+
+    def flh2PL1992_PL2000(self, fi, lam, jednostki="dec_degree"):
+       '''
+       Oblicza współrzędne w układach PL-1992 i PL-2000 w jednym przebiegu rdzenia Gaussa-Krügera
+       (tablice punktów dla obu układów są łączone z odpowiednimi południkami osiowymi i skalami).
+
+       Parametry
+       ----------
+       fi, lam : ARRAY
+           [st. dz.] lub [rad] - szerokość i długość
+       jednostki : STR
+           dec_degree lub radiany - jednostki fi, lam
+
+       Returns
+       -------
+        X1992, Y1992, X2000, Y2000 : ARRAY
+             [m] - współrzędne, NaN dla punktów spoza obszaru układów
+       '''
+       fi = np.atleast_1d(np.asarray(fi, dtype=np.float64))
+       lam = np.atleast_1d(np.asarray(lam, dtype=np.float64))
+       if jednostki == "radiany":
+           fi_r, lam_r = fi, lam
+           fi, lam = fi*180/np.pi, lam*180/np.pi
+       else:
+           fi_r, lam_r = np.radians(fi), np.radians(lam)
+       n = fi.size
+       poza = ~Transformacje.maska_PL(self, fi, lam)
+       strefa, l0 = Transformacje.strefy_PL2000(self, lam)
+       l0_oba = np.concatenate([np.full(n, self.stale.l0_PL1992), l0])
+       m0_oba = np.concatenate([np.full(n, 0.9993), np.full(n, 0.999923)])
+       x, y = Transformacje.gauss_kruger(self, np.concatenate([fi_r, fi_r]), np.concatenate([lam_r, lam_r]), l0_oba, m0_oba)
+       x92 = np.where(poza, np.nan, x[:n] - 5300000)
+       y92 = np.where(poza, np.nan, y[:n] + 500000)
+       x00 = np.where(poza, np.nan, x[n:])
+       y00 = np.where(poza, np.nan, y[n:] + strefa * 1000000 + 500000)
+       return(x92, y92, x00, y00)
    
+    def PL_rad(self, fi, lam, uklad="PL2000", strefa=None, jednostki="radiany"):
+       '''
+       Przeliczenie współrzędnych geodezyjnych w radianach na układ PL-2000 lub PL-1992,
+       bez wyjątków dla punktów spoza obszaru układu. Obszar i strefy wyznaczane są w stopniach
+       (maska_PL, strefy_PL2000), tak samo jak w flh2PL2000, także dla punktów na granicach stref.
+
+       Parametry
+       ----------
+       fi, lam : ARRAY
+           [rad] lub [st. dz.] - szerokość i długość
+       uklad : STR
+           PL2000 lub PL1992
+       strefa : INT, opcjonalnie
+           strefa PL-2000 (5 - 8) wspólna dla wszystkich punktów (np. kafla z Kafle) - jeden
+           południk osiowy zamiast wyznaczania strefy każdego punktu
+       jednostki : STR
+           radiany lub dec_degree - jednostki fi, lam
+
+       Returns
+       -------
+        x, y : ARRAY
+             [m] - współrzędne, NaN poza obszarem układu
+        maska : ARRAY
+             True dla punktów w obszarze układu
+       '''
+       if jednostki == "dec_degree":
+           fi_st, lam_st = fi, lam
+           fi, lam = np.radians(fi), np.radians(lam)
+       else:
+           fi_st, lam_st = fi*180/np.pi, lam*180/np.pi
+       maska = Transformacje.maska_PL(self, fi_st, lam_st)
+       if uklad == "PL1992":
+           xgk, ygk = Transformacje.gauss_kruger(self, fi, lam, self.stale.l0_PL1992, 0.9993)
+           return(np.where(maska, xgk - 5300000, np.nan), np.where(maska, ygk + 500000, np.nan), maska)
+       elif uklad != "PL2000":
+           raise NotImplementedError(f"{uklad} - układ nie jest obsługiwany")
+       if strefa is not None:
+           xgk, ygk = Transformacje.gauss_kruger(self, fi, lam, self.stale.l0_PL2000[strefa - 5], 0.999923)
+           return(np.where(maska, xgk, np.nan), np.where(maska, ygk + strefa * 1000000 + 500000, np.nan), maska)
+       strefa, l0 = Transformacje.strefy_PL2000(self, lam_st)
+       xgk, ygk = Transformacje.gauss_kruger(self, fi, lam, l0, 0.999923)
+       return(np.where(maska, xgk, np.nan), np.where(maska, ygk + strefa * 1000000 + 500000, np.nan), maska)
+
+
+    def xyz2PL2000(self, X, Y, Z):
+       '''
+       Bezpośrednie przeliczenie XYZ -> PL-2000 (jedno rozwiązanie XYZ -> BLH, obliczenia w radianach).
+
+       Parametry
+       ----------
+       X, Y, Z : ARRAY
+           [m] - współrzędne orto-kartezjańskie
+
+       Returns
+       -------
+        x00, y00 : ARRAY
+             [m] - współrzędne (2000), NaN poza obszarem układu
+        maska : ARRAY
+             True dla punktów w obszarze układu
+       '''
+       fi, lam, _ = Transformacje.xyz2flh(self, X, Y, Z, output="radiany")
+       return Transformacje.PL_rad(self, fi, lam, "PL2000")
+
+
+    def xyz2PL1992(self, X, Y, Z):
+       '''
+       Bezpośrednie przeliczenie XYZ -> PL-1992 (jedno rozwiązanie XYZ -> BLH, obliczenia w radianach).
+
+       Parametry
+       ----------
+       X, Y, Z : ARRAY
+           [m] - współrzędne orto-kartezjańskie
+
+       Returns
+       -------
+        x92, y92 : ARRAY
+             [m] - współrzędne (1992), NaN poza obszarem układu
+        maska : ARRAY
+             True dla punktów w obszarze układu
+       '''
+       fi, lam, _ = Transformacje.xyz2flh(self, X, Y, Z, output="radiany")
+       return Transformacje.PL_rad(self, fi, lam, "PL1992")
+
+
+    def gauss_kruger_odwrotne(self, xgk, ygk, l0, max_iter=20):
+       '''
+       Odwrotne odwzorowanie Gaussa-Krügera (wektorowe). Szerokość punktu głównego wyznaczana jest
+       iteracyjnie z długości łuku południka, a następnie poprawiana rozwinięciem w szereg.
+       Na koniec wynik korygowany jest kilkoma iteracjami względem odwzorowania wprost (gauss_kruger),
+       dzięki czemu oba przekształcenia są wzajemnie odwrotne również na brzegach 10-stopniowej strefy PL-1992.
+
+       Parametry
+       ----------
+       xgk, ygk : FLOAT lub ARRAY
+           [m] - współrzędne Gaussa-Krügera (podzielone przez skalę, bez przesunięć układu)
+       l0 : FLOAT lub ARRAY
+           [rad] - południk osiowy
+       max_iter : INT
+           maksymalna liczba iteracji szerokości punktu głównego
+
+       Returns
+       -------
+        fi, lam : FLOAT lub ARRAY
+             [rad] - szerokość i długość geodezyjna
+       '''
+       st = self.stale
+       fi1 = xgk / (self.a * st.A0)
+       for _ in range(max_iter):
+           sigma = self.a * ((st.A0 * fi1) - st.A2 * np.sin(2*fi1) + st.A4 * np.sin(4*fi1) - st.A6 * np.sin(6*fi1))
+           poprawka = (xgk - sigma) / (self.a * st.A0)
+           fi1 = fi1 + poprawka
+           if np.all(np.abs(poprawka) < 1e-13) or np.all(np.isnan(poprawka)):
+               break
+       sin2 = np.sin(fi1)**2
+       cos_fi1 = np.cos(fi1)
+       N1 = self.a / np.sqrt(1 - self.e2 * sin2)
+       M1 = self.a * (1 - self.e2) / np.sqrt((1 - self.e2 * sin2)**3)
+       t2 = np.tan(fi1)**2
+       t4 = t2**2
+       n2 = st.e_2 * cos_fi1**2
+       y2 = (ygk / N1)**2
+       y4 = y2**2
+       fi = fi1 - (ygk**2 * np.tan(fi1)) / (2 * M1 * N1) * (1 - (y2/12) * (5 + 3*t2 + n2 - 9*n2*t2) + (y4/360) * (61 + 90*t2 + 45*t4))
+       lam = l0 + (ygk / (N1 * cos_fi1)) * (1 - (y2/6) * (1 + 2*t2 + n2) + (y4/120) * (5 + 28*t2 + 24*t4 + 6*n2 + 8*n2*t2))
+       for _ in range(max_iter):
+           x, y = Transformacje.gauss_kruger_szeregi(self, fi, lam, l0, 1)
+           dx = xgk - x
+           dy = ygk - y
+           if not np.any(np.abs(dx) > 1e-7) and not np.any(np.abs(dy) > 1e-7):
+               break
+           # odwzorowanie jest wiernokątne: różnice obracane są o zbieżność południków
+           gamma = (lam - l0) * np.sin(fi)
+           sin2 = np.sin(fi)**2
+           M = self.a * (1 - self.e2) / np.sqrt((1 - self.e2 * sin2)**3)
+           N = self.a / np.sqrt(1 - self.e2 * sin2)
+           fi = fi + (dx * np.cos(gamma) + dy * np.sin(gamma)) / M
+           lam = lam + (dy * np.cos(gamma) - dx * np.sin(gamma)) / (N * np.cos(fi))
+       return(fi, lam)
+
+
+    def PL1992_2flh(self, x92, y92):
+       '''
+       Przeliczenie współrzędnych płaskich układu PL-1992 na współrzędne geodezyjne.
+
+       Parametry
+       ----------
+       x92, y92 : FLOAT lub ARRAY
+           [m] - współrzędne (1992)
+
+       Returns
+       -------
+        fi, lam : FLOAT lub ARRAY
+             [st. dz.] - szerokość i długość
+       '''
+       x92 = np.asarray(x92, dtype=np.float64)
+       y92 = np.asarray(y92, dtype=np.float64)
+       fi, lam = Transformacje.gauss_kruger_odwrotne(self, (x92 + 5300000) / 0.9993, (y92 - 500000) / 0.9993, self.stale.l0_PL1992)
+       return(fi*180/np.pi, lam*180/np.pi)
+
+
+    def PL2000_2flh(self, x00, y00):
+       '''
+       Przeliczenie współrzędnych płaskich układu PL-2000 na współrzędne geodezyjne.
+       Strefa (5, 6, 7 lub 8) odczytywana jest z cyfry milionów współrzędnej Y;
+       punkty o innym numerze strefy otrzymują wartość NaN.
+
+       Parametry
+       ----------
+       x00, y00 : FLOAT lub ARRAY
+           [m] - współrzędne (2000)
+
+       Returns
+       -------
+        fi, lam : FLOAT lub ARRAY
+             [st. dz.] - szerokość i długość
+       '''
+       x00 = np.asarray(x00, dtype=np.float64)
+       y00 = np.asarray(y00, dtype=np.float64)
+       strefa = np.floor(y00 / 1000000)
+       poza = (strefa < 5) | (strefa > 8) | np.isnan(strefa)
+       strefa = np.where(poza, np.nan, strefa)
+       l0 = np.where(poza, np.nan, np.take(self.stale.l0_PL2000, np.where(poza, 5, strefa).astype(np.intp) - 5))
+       fi, lam = Transformacje.gauss_kruger_odwrotne(self, x00 / 0.999923, (y00 - strefa * 1000000 - 500000) / 0.999923, l0)
+       return(fi*180/np.pi, lam*180/np.pi)
+
     def dXYZ(self, xa, ya, za, xb, yb, zb):
         '''
        Funkcja ta służy do oblicenia różnic, pomiędzy wspolrzednymi, punktów A oraz B.
@@ -321,15 +1473,31 @@ class Transformacje:
         Returns
         -------
         R ARRAY
-            macierz obrotu R
+            macierz obrotu R (przy włączonej pamięci - kopia zapamiętanej macierzy)
              
         '''
         fi=np.radians(fi)
         lam=np.radians(lam)
+        if self.pamiec is not None:
+            return Transformacje.rneu_punktu(self, fi, lam).copy()
         R = np.array([[-np.sin(fi)*np.cos(lam), -np.sin(lam), np.cos(fi)*np.cos(lam)],
                       [-np.sin(fi)*np.sin(lam),  np.cos(lam), np.cos(fi)*np.sin(lam)],
                       [np.cos(fi),             0,         np.sin(fi)          ]])
         return(R)
+
+    def rneu_punktu(self, fi, lam):
+        '''
+        Macierz obrotu R (3, 3) jednego punktu fi, lam [rad], zapamiętywana w self.pamiec
+        (jeśli włączona). Zwracane macierze są tylko do odczytu (współdzielone przez kolejne
+        wywołania); publiczna metoda rneu zwraca ich kopie.
+        '''
+        def oblicz():
+            R = Transformacje.rneu_tablice(self, fi, lam, jednostki="radiany")
+            R.flags.writeable = False
+            return R
+        if self.pamiec is None:
+            return oblicz()
+        return self.pamiec.pobierz(('rneu', float(fi), float(lam)), oblicz)
     
     
     def xyz2neu(self, fi, lam, xa, ya, za, xb, yb, zb):
@@ -358,42 +1526,149 @@ class Transformacje:
         R = Transformacje.rneu(self, fi,lam)
         neu = R.T @ dX
         n = neu[0];   e = neu[1];   u = neu[2]
-        n = "%.16f"%n; e = "%.16f"%e; u="%.16f"%u
-        dlugosc = []
-        xx = len(n); dlugosc.append(xx)
-        yy = len(e); dlugosc.append(yy)
-        zz = len(u); dlugosc.append(zz)
-        P = 50
-        
-        while xx < P:
-            n = str(" ") + n
-            xx += 1
-        
-        while yy < P:
-            e = str(" ") + e
-            yy += 1
-            
-        while zz < P:
-            u = str(" ") + u
-            zz +=1
-            
+        n = Transformacje.format_neu%n; e = Transformacje.format_neu%e; u = Transformacje.format_neu%u
         return(n, e, u)
     
+    def rneu_tablice(self, fi, lam, jednostki="dec_degree"):
+        '''
+        Wektorowa wersja rneu - tworzy stos macierzy obrotu R dla wielu punktów naraz.
+
+        Parametry
+        ----------
+        fi, lam : ARRAY
+            [st. dz.] lub [rad] - szerokość i długość
+        jednostki : STR
+            dec_degree lub radiany - jednostki fi, lam
+
+        Returns
+        -------
+        R : ARRAY (N, 3, 3)
+            macierze obrotu R
+        '''
+        fi = np.asarray(fi, dtype=np.float64)
+        lam = np.asarray(lam, dtype=np.float64)
+        if jednostki != "radiany":
+            fi, lam = np.radians(fi), np.radians(lam)
+        sin_fi, cos_fi = np.sin(fi), np.cos(fi)
+        sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+        R = np.empty(fi.shape + (3, 3))
+        R[..., 0, 0] = -sin_fi*cos_lam; R[..., 0, 1] = -sin_lam; R[..., 0, 2] = cos_fi*cos_lam
+        R[..., 1, 0] = -sin_fi*sin_lam; R[..., 1, 1] = cos_lam;  R[..., 1, 2] = cos_fi*sin_lam
+        R[..., 2, 0] = cos_fi;          R[..., 2, 1] = 0;        R[..., 2, 2] = sin_fi
+        return(R)
+
+
+    def xyz2neu_tablice(self, XYZ, poczatek=None, fi=None, lam=None):
+        '''
+        Wsadowe przeliczenie całej trajektorii do układu NEU.
+        Bez podanego początku liczone są wektory między kolejnymi punktami (punkt i jest początkiem
+        układu dla punktu i+1), a z podanym początkiem - wektory wszystkich punktów względem niego.
+
+        Parametry
+        ----------
+        XYZ : ARRAY (N, 3)
+            [m] - współrzędne orto-kartezjańskie punktów
+        poczatek : ARRAY (3,), opcjonalnie
+            [m] - współrzędne stałego początku układu NEU
+        fi, lam : FLOAT lub ARRAY, opcjonalnie
+            [rad] - znane już współrzędne geodezyjne początków układu (stałego początku
+            lub punktów XYZ[:-1]); jeśli podane, początki nie są ponownie przeliczane
+
+        Returns
+        -------
+        neu : ARRAY (N-1, 3) lub (N, 3)
+            [m] - współrzędne n, e, u
+        '''
+        XYZ = np.asarray(XYZ, dtype=np.float64).reshape(-1, 3)
+        if poczatek is not None:
+            poczatek = np.asarray(poczatek, dtype=np.float64)
+            if fi is None:
+                fi, lam, _ = Transformacje.xyz2flh(self, poczatek[0], poczatek[1], poczatek[2], output="radiany")
+            if np.ndim(fi) == 0:
+                R = Transformacje.rneu_punktu(self, fi, lam)
+            else:
+                R = Transformacje.rneu_tablice(self, fi, lam, jednostki="radiany")
+            return((XYZ - poczatek) @ R)
+        A = XYZ[:-1]
+        if fi is None:
+            fi, lam, _ = Transformacje.xyz2flh(self, A[:, 0], A[:, 1], A[:, 2], output="radiany")
+        R = Transformacje.rneu_tablice(self, fi, lam, jednostki="radiany")
+        dX = XYZ[1:] - A
+        return(np.matmul(R.transpose(0, 2, 1), dX[:, :, None])[:, :, 0])
+
     def wczytanie(self, Dane):
-       with open (Dane,"r") as plik:
-           tip = np.genfromtxt(plik, delimiter=",",dtype = '<U20', skip_header = 4)
-           X=[]
-           Y=[]
-           Z=[]
-           for i in tip:
-               x=i[0]
-               X.append(float(x))
-               y=i[1]
-               Y.append(float(y))
-               z=i[2]
-               Z.append(float(z))
-           wielkosc = len(X)
+       '''
+       Wczytuje plik z danymi XYZ i zwraca je w postaci list (zachowane dla zgodności,
+       obliczenia wsadowe korzystają z wczytanie_tablica).
+
+       Returns
+       -------
+       X, Y, Z : LIST
+       wielkosc : INT
+           liczba punktów
+       '''
+       XYZ, bledne = Transformacje.wczytanie_tablica(self, Dane)
+       X = XYZ[:, 0].tolist()
+       Y = XYZ[:, 1].tolist()
+       Z = XYZ[:, 2].tolist()
+       wielkosc = len(X)
        return(X, Y, Z, wielkosc)
+
+    def wczytanie_tablica(self, Dane, mmap=None, kolumny=3, pomin=4, rozmiar_bloku=100000):
+       '''
+       Wczytuje plik z danymi rozdzielonymi przecinkiem bezpośrednio do ciągłej tablicy float64 (N, 3).
+       Błędne linie są pomijane, a ich numery zwracane, zamiast przerywać wczytywanie całego pliku.
+
+       Parametry
+       ----------
+       Dane : STR
+           plik z danymi xyz; pliki .npy, .npz, .parquet, .arrow/.feather wczytywane są
+           bez parsowania tekstu (wczytaj_binarne, .npy mapowany w pamięci)
+       mmap : STR, opcjonalnie
+           ścieżka pliku .npy; jeśli podana, wynik zapisywany jest blokami do pliku
+           mapowanego w pamięci (dla bardzo dużych plików). Przy błędnych liniach plik
+           zawiera na końcu nieużywane wiersze - zwracany widok jest do nich przycięty.
+       kolumny : INT
+           liczba kolumn w linii
+       pomin : INT
+           liczba linii nagłówka do pominięcia
+       rozmiar_bloku : INT
+           liczba linii parsowanych naraz
+
+       Returns
+       -------
+       XYZ : ARRAY (N, kolumny)
+           [m] - współrzędne
+       bledne : LIST
+           numery (od 1) linii pliku, których nie udało się odczytać
+       '''
+       bledne = []
+       if os.path.splitext(Dane)[1].lower() in formaty_binarne:
+           XYZ = wczytaj_binarne(Dane, kolumny)
+           if mmap is not None:
+               kopia = np.lib.format.open_memmap(mmap, mode='w+', dtype=np.float64, shape=XYZ.shape)
+               for k in range(0, len(XYZ), rozmiar_bloku):
+                   kopia[k:k + rozmiar_bloku] = XYZ[k:k + rozmiar_bloku]
+               kopia.flush()
+               XYZ = kopia
+           return(XYZ, bledne)
+       if mmap is None:
+           with open(Dane, "r") as plik:
+               bloki = list(czytaj_bloki(plik, kolumny, rozmiar_bloku, pomin, bledne))
+           if not bloki:
+               return(np.empty((0, kolumny)), bledne)
+           return(np.concatenate(bloki), bledne)
+
+       with open(Dane, "r") as plik:
+           n = max(sum(1 for _ in plik) - pomin, 0)
+       XYZ = np.lib.format.open_memmap(mmap, mode='w+', dtype=np.float64, shape=(n, kolumny))
+       k = 0
+       with open(Dane, "r") as plik:
+           for blok in czytaj_bloki(plik, kolumny, rozmiar_bloku, pomin, bledne):
+               XYZ[k:k + len(blok)] = blok
+               k += len(blok)
+       XYZ.flush()
+       return(XYZ[:k], bledne)
     
     def zapisanie(self, X, Y, Z, f, l, h, x92, y92, x00, y00, N, E, U, xyz_txt, neu_txt ): 
         '''
@@ -428,24 +1703,253 @@ class Transformacje:
             Z[i] = Transformacje.zmiana_na_dms(self, Z[i])
         
         with open(xyz_txt , "w",  encoding="utf-8") as plik:
-            plik.write(f"Wyniki_obliczen; XYZ, fi, lambda, h, x1992, y1992, x2000, y2000.\n")
-            plik.write(f"Znak '-' w; x1992, y1992, x2000, y2000 oznacza, że dla podanych współrzędnych (X, Y, Z) po obliczeniu współrzędnych geodezyjnych fi oraz lam. Fi i lam nie należą do dozwolonych współrzędnych układów 1992 oraz 2000.\n")
-            plik.write(f"\n")
-            plik.write(f"          X                    Y                    Z                    fi                 lambda                 h                  x1992                y1992                x2000                y2000        ")
-            plik.write(f"\n")
+            plik.write(naglowek_wynikow)
             for x, y, z, f, l, h, x92, y92, x00, y00 in zip(X, Y, Z, f, l, h, x92, y92, x00, y00):
                 plik.write(f"{x}{y}{z}     {f}     {l}{h}{x92}{y92}{x00}{y00}")
-                plik.write(f"\n")
+                plik.write("\n")
         
         with open(neu_txt , "w", encoding="utf-8") as plik1:
-            plik1.write(f"Wyniki_obliczen; neu.\n")
-            plik1.write(f"                        n                                                 e                                                 u                         ")
-            plik1.write(f"\n")
+            plik1.write(naglowek_neu)
             for n, e, u in zip(N, E, U):
                 plik1.write(f"{n}{e}{u}")
-                plik1.write(f"\n")
-        
-    def wczytanie_oraz_zapisanie(self, Dane, output ='dms' , xyz_txt = 'wszystkie_wyniki.txt', neu_txt = "Wyniki_NEU.txt" ):
+                plik1.write("\n")
+
+    def formatuj_kolumne(self, wartosci, fmt, brak=None):
+        '''
+        Formatuje całą kolumnę liczb jedną operacją formatowania tekstu.
+
+        Parametry
+        ----------
+        wartosci : ARRAY
+            kolumna wyników
+        fmt : STR
+            format pojedynczej wartości, np. Transformacje.format_metry
+        brak : STR, opcjonalnie
+            tekst wstawiany w miejsce wartości NaN
+
+        Returns
+        -------
+        kolumna : LIST
+            sformatowane wartości
+        '''
+        wartosci = np.asarray(wartosci, dtype=np.float64)
+        kolumna = ((fmt + "\n") * len(wartosci) % tuple(wartosci.tolist())).split("\n")[:-1]
+        if brak is not None:
+            for i in np.flatnonzero(np.isnan(wartosci)).tolist():
+                kolumna[i] = brak
+        return(kolumna)
+
+    def zapisanie_tablice(self, wyniki, neu, output, xyz_txt, neu_txt):
+        '''
+        Zapisuje wyniki przechowywane jako kolumny float64. Tekst powstaje dopiero tutaj,
+        jednym formatowaniem na kolumnę, w układzie identycznym jak w funkcji zapisanie.
+
+        Parametry
+        ----------
+        wyniki : DICT
+            kolumny ARRAY: X, Y, Z [m], fi, lam [rad], h [m], x92, y92, x00, y00 [m] (NaN poza obszarem układów)
+        neu : ARRAY (N, 3)
+            [m] - współrzędne n, e, u
+        output : STR
+            format fi, lam: dms, radiany lub dec_degree
+        xyz_txt, neu_txt : STR
+            nazwy plików wynikowych
+
+        Returns
+        -------
+        PLIK TXT
+        '''
+        with Transformacje.etap(self, 'formatowanie', len(wyniki['fi']) + len(neu)):
+            tekst = Transformacje.tekst_wynikow(self, wyniki, output)
+            tekst_neu = Transformacje.tekst_neu(self, neu)
+
+        with Transformacje.etap(self, 'zapis', len(wyniki['fi']) + len(neu)):
+            with open(xyz_txt, "w", encoding="utf-8") as plik:
+                plik.write(naglowek_wynikow)
+                plik.write(tekst)
+
+            with open(neu_txt, "w", encoding="utf-8") as plik1:
+                plik1.write(naglowek_neu)
+                plik1.write(tekst_neu)
+        if self.profil is not None:
+            self.profil.bajty += os.path.getsize(xyz_txt) + os.path.getsize(neu_txt)
+
+    def tekst_wynikow(self, wyniki, output):
+        '''
+        Tworzy wiersze pliku wszystkie_wyniki.txt (bez nagłówka) z kolumn float64.
+
+        Parametry
+        ----------
+        wyniki : DICT
+            kolumny jak w zapisanie_tablice
+        output : STR
+            format fi, lam: dms, radiany lub dec_degree
+
+        Returns
+        -------
+        tekst : STR
+        '''
+        metry = Transformacje.format_metry
+        if output == "dms":
+            F = Transformacje.dms_tablice(self, wyniki['fi']).tolist()
+            L = Transformacje.dms_tablice(self, wyniki['lam']).tolist()
+        elif output == "radiany":
+            F = Transformacje.formatuj_kolumne(self, wyniki['fi'], Transformacje.format_rad)
+            L = Transformacje.formatuj_kolumne(self, wyniki['lam'], Transformacje.format_rad)
+        else:
+            F = Transformacje.formatuj_kolumne(self, wyniki['fi']*180/np.pi, Transformacje.format_dziesietne)
+            L = Transformacje.formatuj_kolumne(self, wyniki['lam']*180/np.pi, Transformacje.format_dziesietne)
+        # pierwsza pozycja tekstu dms to znak, więc odstęp przed nim jest o jedną spację krótszy
+        odstep = ["    " if output == "dms" else "     "] * len(F)
+        kolumny = [Transformacje.formatuj_kolumne(self, wyniki['X'], metry),
+                   Transformacje.formatuj_kolumne(self, wyniki['Y'], metry),
+                   Transformacje.formatuj_kolumne(self, wyniki['Z'], metry),
+                   odstep, F, odstep, L,
+                   Transformacje.formatuj_kolumne(self, wyniki['h'], metry)]
+        kolumny += [Transformacje.formatuj_kolumne(self, wyniki[k], metry, Transformacje.brak_PL) for k in ('x92', 'y92', 'x00', 'y00')]
+        return("".join(map("".join, zip(*kolumny, ["\n"] * len(F)))))
+
+    def tekst_neu(self, neu):
+        '''
+        Tworzy wiersze pliku Wyniki_NEU.txt (bez nagłówka) z tablicy NEU (N, 3).
+        '''
+        kolumny = [Transformacje.formatuj_kolumne(self, neu[:, i], Transformacje.format_neu) for i in range(3)]
+        return("".join(map("".join, zip(*kolumny, ["\n"] * len(neu)))))
+
+    def oblicz_wyniki(self, XYZ):
+        '''
+        Oblicza wszystkie wyniki potoku wsadowego dla tablicy punktów: jedno rozwiązanie XYZ -> BLH
+        na punkt, wykorzystywane przez współrzędne PL-1992/2000 oraz NEU kolejnych par punktów.
+
+        Parametry
+        ----------
+        XYZ : ARRAY (N, 3)
+            [m] - współrzędne orto-kartezjańskie
+
+        Returns
+        -------
+        wyniki : DICT
+            kolumny fi, lam [rad], h, x92, y92, x00, y00 [m]
+        neu : ARRAY (N-1, 3)
+            [m] - NEU punktu i+1 względem punktu i
+        '''
+        n = len(XYZ)
+        with Transformacje.etap(self, 'xyz2flh', n):
+            fi, lam, h = Transformacje.xyz2flh(self, XYZ[:, 0], XYZ[:, 1], XYZ[:, 2], output="radiany")
+        with Transformacje.etap(self, 'PL1992_PL2000', n):
+            x92, y92, x00, y00 = Transformacje.flh2PL1992_PL2000(self, fi, lam, jednostki="radiany")
+        wyniki = {'fi': fi, 'lam': lam, 'h': h, 'x92': x92, 'y92': y92, 'x00': x00, 'y00': y00}
+        with Transformacje.etap(self, 'neu', n):
+            neu = Transformacje.xyz2neu_tablice(self, XYZ, fi=fi[:-1], lam=lam[:-1])
+        return(wyniki, neu)
+
+    def zapisanie_zwarte(self, sciezka, n, output, xyz_txt, neu_txt, float32=False, rozmiar_bloku=100000):
+        '''
+        Oblicza wyniki blokami do zwartego kontenera WynikiZwarte, a następnie zapisuje pliki
+        wynikowe, formatując tekst również blokami - w pamięci są tylko kontener i jeden blok.
+
+        Parametry
+        ----------
+        sciezka : STR
+            plik .npy z tablicą XYZ (N, 3) mapowany w pamięci
+        n : INT
+            liczba punktów
+        output : STR
+            format fi, lam: dms, radiany lub dec_degree
+        xyz_txt, neu_txt : STR
+            nazwy plików wynikowych
+        float32 : BOOL
+            kodowanie kolumn metrycznych jako float32 względem przesunięcia
+        rozmiar_bloku : INT
+            liczba punktów w bloku
+
+        Returns
+        -------
+        WynikiZwarte
+        '''
+        XYZ = np.load(sciezka, mmap_mode='r')
+        zwarte = WynikiZwarte(n, float32)
+        for start in range(0, n, rozmiar_bloku):
+            stop = min(start + rozmiar_bloku, n)
+            poczatek = max(start - 1, 0)
+            blok = np.asarray(XYZ[poczatek:stop])
+            wyniki, neu = Transformacje.oblicz_wyniki(self, blok)
+            przesuniecie = start - poczatek
+            wyniki = {k: v[przesuniecie:] for k, v in wyniki.items()}
+            wyniki['X'], wyniki['Y'], wyniki['Z'] = blok[przesuniecie:, 0], blok[przesuniecie:, 1], blok[przesuniecie:, 2]
+            if start == 0:
+                fi0, lam0 = wyniki['fi'][:1], wyniki['lam'][:1]
+            zwarte.zapisz(start, wyniki)
+            zwarte.zapisz(max(start, 1), {'n': neu[:, 0], 'e': neu[:, 1], 'u': neu[:, 2]})
+        if n:
+            # pierwszy wiersz pliku NEU: ostatni punkt względem pierwszego
+            with Transformacje.etap(self, 'neu', 1):
+                neu = Transformacje.xyz2neu_tablice(self, np.asarray(XYZ[[0, n - 1]]), fi=fi0, lam=lam0)
+            zwarte.zapisz(0, {'n': neu[:, 0], 'e': neu[:, 1], 'u': neu[:, 2]})
+        del XYZ
+
+        with open(xyz_txt, "w", encoding="utf-8") as plik, open(neu_txt, "w", encoding="utf-8") as plik1:
+            plik.write(naglowek_wynikow)
+            plik1.write(naglowek_neu)
+            for start in range(0, n, rozmiar_bloku):
+                stop = min(start + rozmiar_bloku, n)
+                wyniki, neu = zwarte.wyniki(start, stop)
+                with Transformacje.etap(self, 'formatowanie', 2 * (stop - start)):
+                    tekst = Transformacje.tekst_wynikow(self, wyniki, output)
+                    tekst_neu = Transformacje.tekst_neu(self, neu)
+                with Transformacje.etap(self, 'zapis', 2 * (stop - start)):
+                    plik.write(tekst)
+                    plik1.write(tekst_neu)
+        if self.profil is not None:
+            self.profil.bajty += os.path.getsize(xyz_txt) + os.path.getsize(neu_txt)
+        return zwarte
+
+    def zapisanie_rownolegle(self, sciezka, n, output, xyz_txt, neu_txt, workers, rozmiar_bloku=100000):
+        '''
+        Równoległe obliczenie i sformatowanie wyników wczytanie_oraz_zapisanie. Dane wejściowe
+        przekazywane są procesom jako plik .npy mapowany w pamięci (bez kopiowania list między
+        procesami), a gotowe fragmenty tekstu zapisywane są w pierwotnej kolejności. Każdy blok
+        (poza pierwszym) otrzymuje dodatkowo ostatni punkt poprzedniego bloku, aby zachować
+        ciągłość par NEU na granicach bloków.
+
+        Parametry
+        ----------
+        sciezka : STR
+            plik .npy z tablicą XYZ (N, 3)
+        n : INT
+            liczba punktów do przeliczenia
+        output : STR
+            format fi, lam: dms, radiany lub dec_degree
+        xyz_txt, neu_txt : STR
+            nazwy plików wynikowych
+        workers : INT
+            liczba procesów
+        rozmiar_bloku : INT
+            liczba punktów w bloku
+        '''
+        XYZ = np.load(sciezka, mmap_mode='r')
+        poczatki = list(range(0, n, rozmiar_bloku))
+        konce = [min(p + rozmiar_bloku, n) for p in poczatki]
+        with ProcessPoolExecutor(workers, initializer=_inicjalizuj_pracownika,
+                                 initargs=([self.a, self.e2], self.method, sciezka, self.profil is not None,
+                                           parametry_pamieci(self), parametry_tablicy(self))) as pula, \
+                open(xyz_txt, "w", encoding="utf-8") as plik, open(neu_txt, "w", encoding="utf-8") as plik1:
+            plik.write(naglowek_wynikow)
+            plik1.write(naglowek_neu)
+            for i, (tekst, tekst_neu, fi0, lam0, profil) in enumerate(pula.map(_zapisz_zakres, poczatki, konce, repeat(output))):
+                if i == 0:
+                    neu = Transformacje.xyz2neu_tablice(self, XYZ[[0, n - 1]], fi=fi0, lam=lam0)
+                    plik1.write(Transformacje.tekst_neu(self, neu))
+                if profil is not None:
+                    self.profil.dolacz(profil)
+                with Transformacje.etap(self, 'zapis', konce[i] - poczatki[i]):
+                    plik.write(tekst)
+                    plik1.write(tekst_neu)
+        del XYZ
+        if self.profil is not None:
+            self.profil.bajty += os.path.getsize(xyz_txt) + os.path.getsize(neu_txt)
+
+    def wczytanie_oraz_zapisanie(self, Dane, output ='dms' , xyz_txt = 'wszystkie_wyniki.txt', neu_txt = "Wyniki_NEU.txt", workers = 1, zwarte = None):
         '''
          funkcja ta wczytuje i zapisuje plik.
     
@@ -458,70 +1962,51 @@ class Transformacje:
          XYZ_txt: STR
              nazwa pliku wynikowego na xyz, flh, PL1992, PL2000
          NEU_txt: STR
+         workers : INT
+             liczba procesów obliczeniowych (1 - bez puli procesów)
+         zwarte : STR, opcjonalnie
+             float64 lub float32 - wyniki przechowywane w zwartym kontenerze WynikiZwarte
+             (float32 - kolumny milimetrowe kodowane względem przesunięcia, jeśli nie zmienia to
+             wypisanych wartości), liczone i zapisywane blokami w jednym procesie
     
          Returns
          -------
          Plik txt
+         WynikiZwarte - jeśli podano zwarte
     
          '''
-        X, Y, Z, C = Transformacje.wczytanie(self, Dane)
-        F=[]
-        L=[]
-        H=[]
-        X92=[]
-        Y92=[]
-        X00=[]
-        Y00=[]
-        N=[]
-        E=[]
-        U=[]
-        for x, y, z in zip(X, Y, Z):
-             f,l,h = Transformacje.algorytm_hirvonena(self, x, y, z, output = output)
-             if output == "dms":
-                 F.append(f)
-                 L.append(l)
-             elif output == "radiany":
-                 f=Transformacje.zmiana_na_rad(self,f)
-                 l=Transformacje.zmiana_na_rad(self,l)
-                 F.append(f)
-                 L.append(l)
-             else:
-                 f=Transformacje.zmiana_na_dziesietne(self,f)
-                 l=Transformacje.zmiana_na_dziesietne(self,l)
-                 F.append(f)
-                 L.append(l)
-             H.append(Transformacje.zmiana_na_dms(self, h))
-             f,l,h = Transformacje.algorytm_hirvonena(self, x, y, z)
-             
-             if l >= 13.5 and l <= 25.5 and f <= 55.0 and f >= 48.9:
-                 x92, y92 = Transformacje.flh2PL1992(self, f,l)
-                 X92.append(Transformacje.zmiana_na_dms(self, x92))
-                 Y92.append(Transformacje.zmiana_na_dms(self, y92))
-                 x00, y00 = Transformacje.flh2PL2000(self, f,l)
-                 X00.append(Transformacje.zmiana_na_dms(self, x00))
-                 Y00.append(Transformacje.zmiana_na_dms(self, y00))
-             else:
-                 x92 = "         '-'         " ; X92.append(x92)
-                 y92 = "         '-'         " ; Y92.append(y92)
-                 x00 = "         '-'         " ; X00.append(x00)
-                 y00 = "         '-'         " ; Y00.append(y00)
-         
-        f1, l1, h1 = Transformacje.algorytm_hirvonena(self, X[0], Y[0], Z[0])
-        n1, e1, u1 = Transformacje.xyz2neu(self, f1, l1, X[0], Y[0], Z[0], X[-1], Y[-1], Z[-1])
-        N.append(n1)
-        E.append(e1)
-        U.append(u1)
-         
-        i=0
-        while i<(C-1):
-            f, l, h = Transformacje.algorytm_hirvonena(self, X[i], Y[i], Z[i])
-            n, e, u = Transformacje.xyz2neu(self, f, l, X[i], Y[i], Z[i], X[i+1], Y[i+1], Z[i+1])
-            N.append(n)
-            E.append(e)
-            U.append(u)
-            i+=1
-         
-        Transformacje.zapisanie(self, X, Y, Z, F, L, H, X92, Y92, X00, Y00, N, E, U, xyz_txt, neu_txt )     
+        if output not in ("dms", "radiany", "dec_degree"):
+            raise NotImplementedError(f"{output} - output format not defined")
+        if zwarte not in (None, "float64", "float32"):
+            raise NotImplementedError(f"{zwarte} - zwarte: float64 lub float32")
+        if workers > 1 or zwarte is not None:
+            wyniki = None
+            with tempfile.TemporaryDirectory() as katalog:
+                sciezka = os.path.join(katalog, "dane.npy")
+                with Transformacje.etap(self, 'wczytanie') as pomiar:
+                    XYZ, bledne = Transformacje.wczytanie_tablica(self, Dane, mmap=sciezka)
+                    pomiar['punkty'] = n = len(XYZ)
+                del XYZ
+                if zwarte is not None:
+                    wyniki = Transformacje.zapisanie_zwarte(self, sciezka, n, output, xyz_txt, neu_txt, zwarte == "float32")
+                else:
+                    Transformacje.zapisanie_rownolegle(self, sciezka, n, output, xyz_txt, neu_txt, workers)
+            if bledne:
+                print(f"Pominięto błędne linie pliku {Dane}: {', '.join(map(str, bledne))}")
+            return wyniki
+
+        with Transformacje.etap(self, 'wczytanie') as pomiar:
+            XYZ, bledne = Transformacje.wczytanie_tablica(self, Dane)
+            pomiar['punkty'] = len(XYZ)
+        if bledne:
+            print(f"Pominięto błędne linie pliku {Dane}: {', '.join(map(str, bledne))}")
+        wyniki, neu = Transformacje.oblicz_wyniki(self, XYZ)
+        wyniki['X'], wyniki['Y'], wyniki['Z'] = XYZ[:, 0], XYZ[:, 1], XYZ[:, 2]
+        fi, lam = wyniki['fi'], wyniki['lam']
+        with Transformacje.etap(self, 'neu', 1):
+            neu = np.concatenate([Transformacje.xyz2neu_tablice(self, XYZ[[0, -1]], fi=fi[:1], lam=lam[:1]), neu])
+
+        Transformacje.zapisanie_tablice(self, wyniki, neu, output, xyz_txt, neu_txt)
          
          
     def zmiana_na_rad(self, liczba):
@@ -537,13 +2022,8 @@ class Transformacje:
         liczba : STR
             string
              '''
-        zm_liczba = "%.12f"%liczba
-        P = 16
-        xx = len(zm_liczba)
-        while xx < P:
-            zm_liczba = str(" ") + zm_liczba
-            xx += 1
-        return(zm_liczba)  
+        zm_liczba = Transformacje.format_rad%liczba
+        return(zm_liczba)
          
     def zmiana_na_dziesietne(self, liczba):
         '''
@@ -556,13 +2036,8 @@ class Transformacje:
         liczba : STR
             string
              '''
-        zm_liczba = "%.10f"%liczba
-        P = 16
-        xx = len(zm_liczba)
-        while xx < P:
-            zm_liczba = str(" ") + zm_liczba
-            xx += 1
-        return(zm_liczba)        
+        zm_liczba = Transformacje.format_dziesietne%liczba
+        return(zm_liczba)
         
     
     def zmiana_na_dms(self, liczba):
@@ -578,29 +2053,906 @@ class Transformacje:
             string
         
         '''
-        zm_liczba = "%.3f"%liczba
-        P = 21
-        xx = len(zm_liczba)
-        while xx < P:
-            zm_liczba = str(" ") + zm_liczba
-            xx += 1
+        zm_liczba = Transformacje.format_metry%liczba
         return(zm_liczba)
            
-if __name__ == "__main__":
-    elipsoidy = {
-        'WGS84': [6378137.000, 0.00669437999013],
-        'GRS80': [6378137.000, 0.00669438002290],
-        'Krasowski': [6378245.000, 0.00669342162296]
-    }
-
-    funkcje = {
-        'XYZ_BLH': 'xyz2flh',
-        'BLH_XYZ': 'flh2xyz',
-        'XYZ_NEU': 'xyz2neu',
-        'BL_PL2000': 'PL2000',
-        'BL_PL1992': 'PL1992'
-    }
+funkcje = {
+    'XYZ_BLH': 'xyz2flh',
+    'BLH_XYZ': 'flh2xyz',
+    'XYZ_NEU': 'xyz2neu',
+    'BL_PL2000': 'PL2000',
+    'BL_PL1992': 'PL1992',
+    'PL2000_BL': 'PL2000_flh',
+    'PL1992_BL': 'PL1992_flh',
+    'XYZ_PL2000': 'xyz2PL2000',
+    'XYZ_PL1992': 'xyz2PL1992'
+}
+
+kolumny_wejscia = {
+    'XYZ_BLH': 3,
+    'BLH_XYZ': 3,
+    'XYZ_NEU': 3,
+    'BL_PL2000': 2,
+    'BL_PL1992': 2,
+    'PL2000_BL': 2,
+    'PL1992_BL': 2,
+    'XYZ_PL2000': 3,
+    'XYZ_PL1992': 3
+}
+
+kolumny_wyjscia = {
+    'XYZ_BLH': ('fi', 'lam', 'h'),
+    'BLH_XYZ': ('X', 'Y', 'Z'),
+    'XYZ_NEU': ('n', 'e', 'u'),
+    'BL_PL2000': ('x2000', 'y2000'),
+    'BL_PL1992': ('x1992', 'y1992'),
+    'PL2000_BL': ('fi', 'lam'),
+    'PL1992_BL': ('fi', 'lam'),
+    'XYZ_PL2000': ('x2000', 'y2000'),
+    'XYZ_PL1992': ('x1992', 'y1992')
+}
+
+formaty_binarne = ('.npy', '.npz', '.parquet', '.arrow', '.feather')
+
+formaty_wyjscia = ('txt', 'npy', 'npz', 'parquet', 'arrow')
 
+tryby_neu = ('fixed', 'consecutive')
+
+
+def importuj_pyarrow():
+    '''
+    Importuje opcjonalną bibliotekę pyarrow (formaty Parquet i Arrow).
+    '''
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise Exception('Formaty Parquet i Arrow wymagają biblioteki pyarrow (pip install pyarrow).')
+    return pyarrow
+
+
+def tablica_z_kolumn(kolumny_tabeli, kolumny):
+    '''
+    Składa tablicę float64 (n, kolumny) z pierwszych kolumn tabeli lub bloku pyarrow.
+    '''
+    if len(kolumny_tabeli) < kolumny:
+        raise ValueError(f'Plik zawiera {len(kolumny_tabeli)} kolumn, wymagane {kolumny}')
+    return np.column_stack([np.asarray(k.to_numpy(zero_copy_only=False), dtype=np.float64)
+                            for k in kolumny_tabeli[:kolumny]]).reshape(-1, kolumny)
+
+
+def wczytaj_binarne(plik, kolumny):
+    '''
+    Wczytuje plik binarny wybrany po rozszerzeniu, bez pośredniego tekstu:
+        .npy - tablica (N, kolumny) mapowana w pamięci (bez kopiowania)
+        .npz - tablica (N, kolumny) lub osobne kolumny 1D w kolejności zapisu
+        .parquet, .arrow/.feather - pierwsze kolumny tabeli (wymaga pyarrow; plik Arrow mapowany w pamięci)
+
+    Returns
+    -------
+    dane : ARRAY (N, kolumny)
+    '''
+    rozszerzenie = os.path.splitext(plik)[1].lower()
+    if rozszerzenie == '.npy':
+        dane = np.load(plik, mmap_mode='r')
+    elif rozszerzenie == '.npz':
+        with np.load(plik) as archiwum:
+            tablice = [archiwum[k] for k in archiwum.files]
+        dane = tablice[0] if len(tablice) == 1 and np.ndim(tablice[0]) == 2 else np.column_stack(tablice)
+    elif rozszerzenie == '.parquet':
+        pa = importuj_pyarrow()
+        return tablica_z_kolumn(pa.parquet.read_table(plik).columns, kolumny)
+    else:
+        pa = importuj_pyarrow()
+        with pa.memory_map(plik, 'r') as zrodlo:
+            return tablica_z_kolumn(pa.ipc.open_file(zrodlo).read_all().columns, kolumny)
+    if dane.ndim != 2 or dane.shape[1] != kolumny:
+        raise ValueError(f'Tablica {plik} ma wymiary {dane.shape}, wymagane (N, {kolumny})')
+    return dane if dane.dtype == np.float64 else dane.astype(np.float64)
+
+
+def czytaj_bloki_binarne(plik, kolumny, rozmiar_bloku=100000):
+    '''
+    Czyta plik binarny (.npy, .npz, .parquet, .arrow/.feather) blokami po rozmiar_bloku punktów.
+    Plik .npy jest mapowany w pamięci, a Parquet czytany grupami wierszy, więc w pamięci
+    znajduje się tylko bieżący blok.
+
+    Returns
+    -------
+    generator ARRAY (n, kolumny)
+    '''
+    if os.path.splitext(plik)[1].lower() == '.parquet':
+        pa = importuj_pyarrow()
+        for blok in pa.parquet.ParquetFile(plik).iter_batches(batch_size=rozmiar_bloku):
+            yield tablica_z_kolumn(blok.columns, kolumny)
+        return
+    dane = wczytaj_binarne(plik, kolumny)
+    for start in range(0, len(dane), rozmiar_bloku):
+        yield np.asarray(dane[start:start + rozmiar_bloku])
+
+
+def czytaj_bloki_pliku(plik, kolumny, rozmiar_bloku=100000, bledne=None):
+    '''
+    Czyta plik wejściowy blokami: format binarny wybierany jest po rozszerzeniu (formaty_binarne),
+    pozostałe pliki traktowane są jako tekst rozdzielony przecinkiem z czterema liniami nagłówka.
+
+    Returns
+    -------
+    generator ARRAY (n, kolumny)
+    '''
+    if os.path.splitext(plik)[1].lower() in formaty_binarne:
+        yield from czytaj_bloki_binarne(plik, kolumny, rozmiar_bloku)
+        return
+    with open(plik, 'r') as f:
+        yield from czytaj_bloki(f, kolumny, rozmiar_bloku, bledne=bledne)
+
+
+class ZapisNpy:
+    """
+    Strumieniowy zapis tablicy float64 do pliku .npy, gdy liczba wierszy nie jest znana z góry.
+    Nagłówek ma stałą długość i przy zamknięciu jest uzupełniany o końcową liczbę wierszy,
+    a bloki dopisywane są bezpośrednio jako surowe bajty.
+    """
+    dlugosc_naglowka = 128
+
+    def __init__(self, sciezka, kolumny=None):
+        '''
+        kolumny - liczba kolumn tablicy 2D; None dla tablicy 1D
+        '''
+        self.sciezka = sciezka
+        self.kolumny = kolumny
+        self.wiersze = 0
+        self.plik = open(sciezka, 'wb')
+        ZapisNpy.zapisz_naglowek(self)
+
+    def zapisz_naglowek(self):
+        ksztalt = (self.wiersze,) if self.kolumny is None else (self.wiersze, self.kolumny)
+        opis = "{'descr': '<f8', 'fortran_order': False, 'shape': %s, }" % (ksztalt,)
+        opis = opis.ljust(ZapisNpy.dlugosc_naglowka - 11) + "\n"
+        self.plik.seek(0)
+        self.plik.write(b'\x93NUMPY\x01\x00' + len(opis).to_bytes(2, 'little') + opis.encode('latin1'))
+        self.plik.seek(0, os.SEEK_END)
+
+    def zapisz(self, dane):
+        self.plik.write(np.ascontiguousarray(dane, dtype='<f8').tobytes())
+        self.wiersze += len(dane)
+
+    def zamknij(self):
+        ZapisNpy.zapisz_naglowek(self)
+        self.plik.close()
+
+
+class ZapisWynikow:
+    """
+    Zapis wyników trybu -plik do pliku WYNIK_<funkcja>.<format> w jednym z formatów formaty_wyjscia:
+        txt - tekst, wartości rozdzielone spacją
+        npy - tablica float64 (N, kolumny)
+        npz - osobne kolumny float64 nazwane jak w kolumny_wyjscia
+        parquet, arrow - tabela z kolumnami nazwanymi jak w kolumny_wyjscia (wymaga pyarrow)
+    Obiekt używany jest jako menedżer kontekstu, a bloki zapisywane są metodą zapisz.
+    Z dopisz=True wyniki dopisywane są na końcu istniejącego pliku (tylko txt).
+    """
+
+    def __init__(self, geo, trans_wsp, format_wyjscia='txt', dopisz=False):
+        if format_wyjscia not in formaty_wyjscia:
+            raise NotImplementedError(f"{format_wyjscia} - format nie jest obsługiwany, dostępne: {', '.join(formaty_wyjscia)}")
+        if dopisz and format_wyjscia != 'txt':
+            raise NotImplementedError(f"{format_wyjscia} - dopisywanie wyników obsługuje tylko format txt")
+        self.geo = geo
+        self.format = format_wyjscia
+        self.nazwy = kolumny_wyjscia[trans_wsp]
+        self.sciezka = f"WYNIK_{trans_wsp.upper()}.{format_wyjscia}"
+        if format_wyjscia == 'txt':
+            self.plik = open(self.sciezka, 'a' if dopisz else 'w')
+        elif format_wyjscia == 'npy':
+            self.plik = ZapisNpy(self.sciezka, len(self.nazwy))
+        elif format_wyjscia == 'npz':
+            self.katalog = tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(self.sciezka)))
+            self.plik = [ZapisNpy(os.path.join(self.katalog.name, f"{nazwa}.npy")) for nazwa in self.nazwy]
+        else:
+            self.pa = importuj_pyarrow()
+            schemat = self.pa.schema([(nazwa, self.pa.float64()) for nazwa in self.nazwy])
+            if format_wyjscia == 'parquet':
+                self.plik = self.pa.parquet.ParquetWriter(self.sciezka, schemat)
+            else:
+                self.plik = self.pa.ipc.new_file(self.sciezka, schemat)
+
+    def zapisz(self, dane):
+        '''
+        Zapisuje blok wyników ARRAY (n, kolumny).
+        '''
+        if self.format == 'txt':
+            zapisz_blok(self.geo, self.plik, dane)
+            return
+        with self.geo.etap('zapis', len(dane)):
+            if self.format == 'npy':
+                self.plik.zapisz(dane)
+            elif self.format == 'npz':
+                for kolumna, zapis in zip(dane.T, self.plik):
+                    zapis.zapisz(kolumna)
+            else:
+                self.plik.write_batch(self.pa.record_batch([self.pa.array(k) for k in dane.T], names=list(self.nazwy)))
+
+    def zamknij(self):
+        '''
+        Zamyka plik wynikowy (dla npz pakuje zapisane kolumny do archiwum bez kompresji).
+        '''
+        if self.format == 'npy':
+            self.plik.zamknij()
+        elif self.format == 'npz':
+            with zipfile.ZipFile(self.sciezka, 'w', zipfile.ZIP_STORED, allowZip64=True) as archiwum:
+                for nazwa, zapis in zip(self.nazwy, self.plik):
+                    zapis.zamknij()
+                    archiwum.write(zapis.sciezka, arcname=f"{nazwa}.npy")
+            self.katalog.cleanup()
+        else:
+            self.plik.close()
+        if self.geo.profil is not None and self.format != 'txt':
+            self.geo.profil.bajty += os.path.getsize(self.sciezka)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *wyjatek):
+        ZapisWynikow.zamknij(self)
+
+
+def parsuj_linie(linie, kolumny, pierwsza_linia=1, bledne=None):
+    '''
+    Zamienia linie tekstu z liczbami rozdzielonymi przecinkiem na tablicę float64.
+    Najpierw próbowane jest szybkie parsowanie całego bloku, a dopiero gdy się nie powiedzie,
+    linie sprawdzane są pojedynczo i błędne są pomijane.
+
+    Parametry
+    ----------
+    linie : LIST
+        linie tekstu
+    kolumny : INT
+        wymagana liczba kolumn
+    pierwsza_linia : INT
+        numer w pliku pierwszej z linii (do raportu błędów)
+    bledne : LIST, opcjonalnie
+        lista, do której dopisywane są numery błędnych linii
+
+    Returns
+    -------
+    dane : ARRAY (n, kolumny)
+    '''
+    try:
+        dane = np.loadtxt(linie, delimiter=',', dtype=np.float64, ndmin=2, comments=None)
+        if dane.size == 0 or dane.shape[1] == kolumny:
+            return dane.reshape(-1, kolumny)
+    except ValueError:
+        pass
+    wiersze = []
+    for nr, linia in enumerate(linie, start=pierwsza_linia):
+        linia = linia.strip()
+        if not linia:
+            continue
+        try:
+            wiersz = [float(pole) for pole in linia.split(',')]
+        except ValueError:
+            wiersz = []
+        if len(wiersz) != kolumny:
+            if bledne is not None:
+                bledne.append(nr)
+            continue
+        wiersze.append(wiersz)
+    return np.array(wiersze, dtype=np.float64).reshape(-1, kolumny)
+
+
+def czytaj_bloki(plik, kolumny, rozmiar_bloku=100000, pomin=4, bledne=None):
+    '''
+    Czyta plik z danymi rozdzielonymi przecinkiem blokami o stałej liczbie linii,
+    dzięki czemu w pamięci znajduje się tylko jeden blok naraz.
+
+    Parametry
+    ----------
+    plik : obiekt pliku
+        otwarty plik tekstowy
+    kolumny : INT
+        liczba kolumn w linii
+    rozmiar_bloku : INT
+        liczba linii w bloku
+    pomin : INT
+        liczba linii nagłówka do pominięcia
+    bledne : LIST, opcjonalnie
+        lista, do której dopisywane są numery błędnych (pominiętych) linii
+
+    Returns
+    -------
+    generator ARRAY (n, kolumny)
+    '''
+    for _ in islice(plik, pomin):
+        pass
+    nr = pomin + 1
+    while True:
+        linie = list(islice(plik, rozmiar_bloku))
+        if not linie:
+            break
+        dane = parsuj_linie(linie, kolumny, nr, bledne)
+        nr += len(linie)
+        if len(dane):
+            yield dane
+
+
+def przelicz_blok(geo, trans_wsp, dane, stan):
+    '''
+    Przelicza jeden blok danych wejściowych wybraną transformacją.
+
+    Parametry
+    ----------
+    geo : Transformacje
+    trans_wsp : STR
+        klucz ze słownika funkcje
+    dane : ARRAY (n, k)
+        blok danych wejściowych
+    stan : DICT
+        stan przekazywany między blokami: kafle - rozmiar kafla [st.] dla XYZ_PL2000 i BL_PL2000
+        (przelicz_kafle), tryb_neu ('fixed' - domyślnie, 'consecutive'),
+        początek układu NEU XYZ0 z jego fi0, lam0 [rad] albo ostatni punkt poprzedniego bloku
+        (już w układzie docelowym) oraz helmert - (T, M) z macierz_helmerta, jeśli dane XYZ
+        są w innym układzie odniesienia niż elipsoida geo
+
+    Returns
+    -------
+    wynik : ARRAY (n, m)
+    '''
+    dane = zmien_datum(dane, stan)
+    if 'kafle' in stan and trans_wsp in ('XYZ_PL2000', 'BL_PL2000'):
+        return przelicz_kafle(geo, trans_wsp, dane, stan['kafle'])
+    if trans_wsp == 'XYZ_BLH':
+        wynik = geo.xyz2flh(dane[:, 0], dane[:, 1], dane[:, 2])
+    elif trans_wsp == 'BLH_XYZ':
+        wynik = geo.odwrotny_hirvonen(dane[:, 0], dane[:, 1], dane[:, 2])
+    elif trans_wsp == 'XYZ_NEU' and stan.get('tryb_neu', 'fixed') == 'consecutive':
+        if 'ostatni' not in stan:
+            stan['ostatni'] = np.array(dane[0])
+            dane = dane[1:]
+        XYZ = np.concatenate([stan['ostatni'][None], dane])
+        stan['ostatni'] = np.array(XYZ[-1])
+        wynik = geo.xyz2neu_tablice(XYZ).T
+    elif trans_wsp == 'XYZ_NEU':
+        if 'XYZ0' not in stan:
+            stan['XYZ0'] = np.array(dane[0])
+            dane = dane[1:]
+        if 'fi0' not in stan:
+            stan['fi0'], stan['lam0'], _ = geo.xyz2flh(*stan['XYZ0'], output="radiany")
+        wynik = geo.xyz2neu_tablice(dane, poczatek=stan['XYZ0'], fi=stan['fi0'], lam=stan['lam0']).T
+    elif trans_wsp == 'BL_PL2000':
+        wynik = geo.flh2PL2000(dane[:, 0], dane[:, 1])
+    elif trans_wsp == 'BL_PL1992':
+        wynik = geo.flh2PL1992(dane[:, 0], dane[:, 1])
+    elif trans_wsp == 'PL2000_BL':
+        wynik = geo.PL2000_2flh(dane[:, 0], dane[:, 1])
+    elif trans_wsp == 'PL1992_BL':
+        wynik = geo.PL1992_2flh(dane[:, 0], dane[:, 1])
+    elif trans_wsp == 'XYZ_PL2000':
+        wynik = geo.xyz2PL2000(dane[:, 0], dane[:, 1], dane[:, 2])[:2]
+    elif trans_wsp == 'XYZ_PL1992':
+        wynik = geo.xyz2PL1992(dane[:, 0], dane[:, 1], dane[:, 2])[:2]
+    return np.column_stack(wynik)
+
+
+class Kafle:
+    """
+    Podział punktów na kafle: strefa PL-2000 (południk osiowy), a w niej oczko siatki rozmiar x rozmiar
+    stopni. Stabilna permutacja kolejnosc ustawia punkty kafel po kaflu (w kaflu - w kolejności danych),
+    a odwrotna przywraca kolejność wejściową. Kafle są ciągłymi zakresami posortowanych danych,
+    więc nadają się na jednostki przetwarzania równoległego lub poza pamięcią; punkty spoza obszaru
+    układów PL-1992/PL-2000 tworzą jeden kafel strefy 0. Obszar i strefy wyznaczane są w stopniach
+    tak samo jak w flh2PL2000 (maska_PL, strefy_PL2000), także dla punktów na granicach stref.
+        kolejnosc, odwrotna - permutacja i permutacja odwrotna
+        poczatki, konce - granice kafli w posortowanych danych
+        strefy - strefa PL-2000 każdego kafla (0 - poza obszarem)
+    """
+
+    @staticmethod
+    def siatka(geo, rozmiar):
+        '''
+        Siatka kafli o rozmiarze rozmiar x rozmiar stopni w strefie PL-2000 i najmniejszy typ
+        całkowity mieszczący klucze kafli (1 + 4 strefy * wiersze * kolumny).
+
+        Returns
+        -------
+        wiersze, kolumny : INT
+            liczba oczek siatki w strefie
+        typ : np.dtype
+            int16 (sortowanie pozycyjne), int32 lub int64
+
+        Raises
+        ------
+        ValueError
+            klucze kafli nie mieszczą się w int64 (zbyt mały rozmiar kafla)
+        '''
+        wiersze = int(np.ceil((55 - 48.9) / rozmiar))
+        kolumny = int(np.ceil(3 / rozmiar))
+        # klucze do 32767 sortowane są sortowaniem pozycyjnym (liniowo)
+        for typ in (np.int16, np.int32, np.int64):
+            if 4 * wiersze * kolumny < np.iinfo(typ).max:
+                return wiersze, kolumny, typ
+        raise ValueError(f"rozmiar kafla {rozmiar}° daje {4 * wiersze * kolumny} kafli - klucze nie mieszczą się w int64")
+
+    def __init__(self, geo, fi, lam, rozmiar=1.0):
+        # fi, lam [st. dz.]
+        wiersze, kolumny, typ = Kafle.siatka(geo, rozmiar)
+        w_obszarze = Transformacje.maska_PL(geo, fi, lam)
+        strefa, _ = Transformacje.strefy_PL2000(geo, np.where(w_obszarze, lam, 13.5))
+        fi = np.where(w_obszarze, fi, 48.9)
+        lam = np.where(w_obszarze, lam, 13.5)
+        indeks = strefa - 5
+        wiersz = np.clip(np.floor((fi - 48.9) / rozmiar), 0, wiersze - 1)
+        kolumna = np.clip(np.floor((lam - 13.5 - indeks * 3) / rozmiar), 0, kolumny - 1)
+        # klucz liczony w typie całkowitym (float64 traci dokładność powyżej 2**53)
+        indeks, wiersz, kolumna = indeks.astype(typ), wiersz.astype(typ), kolumna.astype(typ)
+        klucz = np.where(w_obszarze, 1 + (indeks * typ(wiersze) + wiersz) * typ(kolumny) + kolumna, typ(0))
+        self.kolejnosc = np.argsort(klucz, kind='stable')
+        self.odwrotna = np.empty_like(self.kolejnosc)
+        self.odwrotna[self.kolejnosc] = np.arange(len(klucz))
+        klucz = klucz[self.kolejnosc]
+        self.poczatki = np.flatnonzero(np.r_[True, klucz[1:] != klucz[:-1]]) if len(klucz) else np.zeros(0, np.intp)
+        self.konce = np.r_[self.poczatki[1:], len(klucz)].astype(np.intp)
+        self.strefy = np.where(klucz[self.poczatki] > 0, (klucz[self.poczatki].astype(np.int64) - 1) // (wiersze * kolumny) + 5, 0)
+
+    def __len__(self):
+        return len(self.poczatki)
+
+    def zakresy(self):
+        '''
+        Returns
+        -------
+        LIST krotek (strefa, początek, koniec) kolejnych kafli w posortowanych danych
+        '''
+        return list(zip(self.strefy.tolist(), self.poczatki.tolist(), self.konce.tolist()))
+
+    def zakresy_stref(self):
+        '''
+        Zakresy kolejnych kafli tej samej strefy połączone w jeden (jeden południk osiowy).
+
+        Returns
+        -------
+        LIST krotek (strefa, początek, koniec)
+        '''
+        zakresy = []
+        for strefa, poczatek, koniec in Kafle.zakresy(self):
+            if zakresy and zakresy[-1][0] == strefa:
+                zakresy[-1] = (strefa, zakresy[-1][1], koniec)
+            else:
+                zakresy.append((strefa, poczatek, koniec))
+        return zakresy
+
+    def posortuj(self, dane):
+        return dane[self.kolejnosc]
+
+    def przywroc(self, wyniki):
+        return wyniki[self.odwrotna]
+
+
+def przelicz_kafle(geo, trans_wsp, dane, rozmiar=1.0):
+    '''
+    Przeliczenie XYZ_PL2000 lub BL_PL2000 kaflami (Kafle): punkty każdej strefy przeliczane są jednym
+    ciągłym blokiem z jednym południkiem osiowym, a wyniki wracają do kolejności danych wejściowych.
+
+    Parametry
+    ----------
+    geo : Transformacje
+    trans_wsp : STR
+        XYZ_PL2000 lub BL_PL2000
+    dane : ARRAY (n, k)
+    rozmiar : FLOAT
+        [st.] - rozmiar kafla
+
+    Returns
+    -------
+    wynik : ARRAY (n, 2)
+    '''
+    # te same jednostki co bez kafli: radiany dla XYZ_PL2000 (xyz2PL2000), stopnie dla BL_PL2000 (flh2PL2000)
+    if trans_wsp == 'XYZ_PL2000':
+        fi, lam, _ = geo.xyz2flh(dane[:, 0], dane[:, 1], dane[:, 2], output="radiany")
+        jednostki = "radiany"
+        kafle = Kafle(geo, fi*180/np.pi, lam*180/np.pi, rozmiar)
+    else:
+        fi, lam = dane[:, 0], dane[:, 1]
+        jednostki = "dec_degree"
+        kafle = Kafle(geo, fi, lam, rozmiar)
+    fi = kafle.posortuj(fi)
+    lam = kafle.posortuj(lam)
+    wynik = np.full((len(fi), 2), np.nan)
+    for strefa, poczatek, koniec in kafle.zakresy_stref():
+        if strefa:
+            x, y, _ = geo.PL_rad(fi[poczatek:koniec], lam[poczatek:koniec], "PL2000", strefa, jednostki)
+            wynik[poczatek:koniec, 0] = x
+            wynik[poczatek:koniec, 1] = y
+    return kafle.przywroc(wynik)
+
+
+def zmien_datum(dane, stan):
+    '''
+    Przelicza blok XYZ transformacją Helmerta ze stanu przelicz_blok (stan['helmert'] = (T, M));
+    bez niej zwraca dane bez zmian.
+    '''
+    if 'helmert' not in stan:
+        return dane
+    T, M = stan['helmert']
+    return np.asarray(dane) @ M.T + T
+
+
+def mierz_bloki(geo, nazwa, bloki):
+    '''
+    Przekazuje dalej bloki z iteratora, doliczając czas ich pobrania (np. wczytania z pliku)
+    do etapu nazwa, gdy włączone jest profilowanie.
+    '''
+    bloki = iter(bloki)
+    while True:
+        with geo.etap(nazwa) as pomiar:
+            blok = next(bloki, None)
+            pomiar['punkty'] = 0 if blok is None else len(blok)
+        if blok is None:
+            return
+        yield blok
+
+
+def zapisz_blok(geo, wynik, dane):
+    '''
+    Zapisuje blok wyników, jedna linia na punkt, wartości rozdzielone spacją.
+    '''
+    with geo.etap('formatowanie', len(dane)):
+        tekst = ''.join(' '.join(map(str, wiersz)) + '\n' for wiersz in dane.tolist())
+    with geo.etap('zapis', len(dane)):
+        wynik.write(tekst)
+    if geo.profil is not None:
+        geo.profil.bajty += len(tekst.encode())
+
+
+_pracownik = {}
+
+
+def parametry_pamieci(geo):
+    '''
+    Parametry (rozmiar, miejsca) pamięci podręcznej obiektu geo przekazywane procesom puli (None - wyłączona).
+    '''
+    return None if geo.pamiec is None else (geo.pamiec.rozmiar, geo.pamiec.miejsca)
+
+
+def parametry_tablicy(geo):
+    '''
+    Tablica interpolacyjna obiektu geo przekazywana procesom puli: ścieżka pliku (procesy mapują go
+    w pamięci), tablica współczynników, jeśli nie została zapisana, lub None - brak tablicy.
+    '''
+    if geo.tablica is None:
+        return None
+    return geo.tablica.sciezka if geo.tablica.sciezka is not None else np.asarray(geo.tablica.dane)
+
+
+def _inicjalizuj_pracownika(elipsoida, method, sciezka, profilowanie=False, pamiec=None, tablica=None):
+    '''
+    Inicjalizacja procesu puli: obiekt Transformacje oraz dane wejściowe mapowane w pamięci.
+    Przy profilowaniu każde zadanie zwraca dodatkowo własny obiekt Profil.
+    pamiec - (rozmiar, miejsca) pamięci podręcznej procesu lub None
+    tablica - tablica interpolacyjna Gaussa-Krügera (parametry_tablicy) lub None
+    '''
+    _pracownik['geo'] = Transformacje(elipsoida, method=method)
+    if pamiec is not None:
+        _pracownik['geo'].pamiec = PamiecPodreczna(*pamiec)
+    if isinstance(tablica, str):
+        _pracownik['geo'].tablica = wczytaj_tablice_gk(tablica)
+    elif tablica is not None:
+        _pracownik['geo'].tablica = TablicaGK(tablica)
+    _pracownik['dane'] = np.load(sciezka, mmap_mode='r')
+    _pracownik['profilowanie'] = profilowanie
+
+
+def _zapisz_zakres(start, stop, output):
+    '''
+    Zadanie procesu puli dla wczytanie_oraz_zapisanie: oblicza i formatuje wiersze wyników punktów
+    start..stop-1 oraz NEU par kończących się na tych punktach (dla start > 0 dołączany jest punkt
+    poprzedzający). Zwraca też fi, lam [rad] punktu start.
+    '''
+    geo = _pracownik['geo']
+    geo.profil = Profil() if _pracownik['profilowanie'] else None
+    poczatek = max(start - 1, 0)
+    XYZ = np.asarray(_pracownik['dane'][poczatek:stop])
+    wyniki, neu = geo.oblicz_wyniki(XYZ)
+    przesuniecie = start - poczatek
+    wyniki = {k: v[przesuniecie:] for k, v in wyniki.items()}
+    wyniki['X'], wyniki['Y'], wyniki['Z'] = XYZ[przesuniecie:, 0], XYZ[przesuniecie:, 1], XYZ[przesuniecie:, 2]
+    with geo.etap('formatowanie', len(XYZ) - przesuniecie + len(neu)):
+        tekst, tekst_neu = geo.tekst_wynikow(wyniki, output), geo.tekst_neu(neu)
+    return(tekst, tekst_neu, wyniki['fi'][:1], wyniki['lam'][:1], geo.profil)
+
+
+def _przelicz_zakres(trans_wsp, start, stop, stan):
+    '''
+    Zadanie procesu puli dla trybu -plik: przelicza wiersze start..stop-1 danych wejściowych.
+    stan - początkowy stan przelicz_blok; w trybie NEU 'consecutive' ostatnim punktem jest wiersz start-1.
+    '''
+    geo = _pracownik['geo']
+    geo.profil = Profil() if _pracownik['profilowanie'] else None
+    stan = dict(stan)
+    if trans_wsp == 'XYZ_NEU' and stan.get('tryb_neu') == 'consecutive' and start > 0:
+        stan['ostatni'] = zmien_datum(np.array(_pracownik['dane'][start - 1]), stan)
+    dane = np.asarray(_pracownik['dane'][start:stop])
+    with geo.etap('przeliczenie', len(dane)):
+        blok = przelicz_blok(geo, trans_wsp, dane, stan)
+    return blok, geo.profil
+
+
+def przetworz_plik_rownolegle(geo, plik, trans_wsp, workers, rozmiar_bloku=100000, bledne=None, format_wyjscia='txt',
+                              tryb_neu='fixed', helmert=None, kafle=None):
+    '''
+    Równoległe przeliczenie pliku pulą procesów. Plik wczytywany jest do tymczasowego pliku .npy
+    mapowanego w pamięci (plik wejściowy .npy używany jest bezpośrednio), z którego procesy czytają
+    swoje bloki; wyniki zapisywane są w kolejności danych wejściowych. Dla XYZ_NEU w trybie 'fixed'
+    początek układu (pierwszy punkt) wraz z jego fi, lam rozwiązywany jest raz i przekazywany każdemu
+    blokowi, a w trybie 'consecutive' każdy blok dołącza ostatni punkt bloku poprzedniego.
+
+    Parametry
+    ----------
+    geo : Transformacje
+    plik : STR
+        plik z danymi (pierwsze cztery linie są pomijane)
+    trans_wsp : STR
+        klucz ze słownika funkcje
+    workers : INT
+        liczba procesów
+    rozmiar_bloku : INT
+        liczba punktów w bloku
+    bledne : LIST, opcjonalnie
+        lista, do której dopisywane są numery pominiętych, błędnych linii
+    format_wyjscia : STR
+        format pliku wynikowego (formaty_wyjscia)
+    tryb_neu : STR
+        'fixed' - stały początek układu NEU, 'consecutive' - kolejne pary punktów
+    helmert : TUPLE (T, M), opcjonalnie
+        transformacja Helmerta danych XYZ do układu elipsoidy geo (macierz_helmerta)
+    kafle : FLOAT, opcjonalnie
+        [st.] - rozmiar kafla; zakres każdego procesu przeliczany jest kaflami (przelicz_kafle)
+    '''
+    kolumny = kolumny_wejscia[trans_wsp]
+    with tempfile.TemporaryDirectory() as katalog:
+        sciezka = os.path.join(katalog, "dane.npy")
+        with geo.etap('wczytanie') as pomiar:
+            if os.path.splitext(plik)[1].lower() == '.npy':
+                sciezka = plik
+                dane = wczytaj_binarne(plik, kolumny)
+            elif os.path.splitext(plik)[1].lower() in formaty_binarne:
+                zapis = ZapisNpy(sciezka, kolumny)
+                for blok in czytaj_bloki_binarne(plik, kolumny, rozmiar_bloku):
+                    zapis.zapisz(blok)
+                zapis.zamknij()
+                dane = np.load(sciezka, mmap_mode='r')
+            else:
+                dane, bl = geo.wczytanie_tablica(plik, mmap=sciezka, kolumny=kolumny, rozmiar_bloku=rozmiar_bloku)
+                if bledne is not None:
+                    bledne.extend(bl)
+            pomiar['punkty'] = len(dane)
+        n = len(dane)
+        stan = {'tryb_neu': tryb_neu}
+        if helmert is not None:
+            stan['helmert'] = helmert
+        if kafle is not None:
+            stan['kafle'] = kafle
+        start = 0
+        if trans_wsp == 'XYZ_NEU' and tryb_neu == 'fixed' and n:
+            stan['XYZ0'] = zmien_datum(np.array(dane[0]), stan)
+            stan['fi0'], stan['lam0'], _ = geo.xyz2flh(*stan['XYZ0'], output="radiany")
+            start = 1
+        elif trans_wsp == 'XYZ_NEU' and n:
+            start = 1
+        del dane
+        poczatki = list(range(start, n, rozmiar_bloku))
+        konce = [min(p + rozmiar_bloku, n) for p in poczatki]
+        with ProcessPoolExecutor(workers, initializer=_inicjalizuj_pracownika,
+                                 initargs=([geo.a, geo.e2], geo.method, sciezka, geo.profil is not None,
+                                           parametry_pamieci(geo), parametry_tablicy(geo))) as pula, \
+                ZapisWynikow(geo, trans_wsp, format_wyjscia) as wynik:
+            for blok, profil in pula.map(_przelicz_zakres, repeat(trans_wsp), poczatki, konce, repeat(stan)):
+                if profil is not None:
+                    geo.profil.dolacz(profil)
+                wynik.zapisz(blok)
+
+
+def przetworz_plik(geo, plik, trans_wsp, rozmiar_bloku=100000, bledne=None, format_wyjscia='txt', tryb_neu='fixed',
+                   helmert=None, kafle=None):
+    '''
+    Strumieniowe przeliczenie pliku: każdy blok jest wczytywany, przeliczany i zapisywany
+    do pliku WYNIK_<funkcja>.<format> przed wczytaniem kolejnego.
+
+    Parametry
+    ----------
+    geo : Transformacje
+    plik : STR
+        plik z danymi: tekst (pierwsze cztery linie są pomijane) lub plik binarny wybierany
+        po rozszerzeniu (.npy, .npz, .parquet, .arrow/.feather)
+    trans_wsp : STR
+        klucz ze słownika funkcje
+    rozmiar_bloku : INT
+        liczba linii (punktów) w bloku
+    bledne : LIST, opcjonalnie
+        lista, do której dopisywane są numery pominiętych, błędnych linii
+    format_wyjscia : STR
+        format pliku wynikowego (formaty_wyjscia)
+    tryb_neu : STR
+        dla XYZ_NEU: 'fixed' - wszystkie punkty względem pierwszego punktu pliku (początek układu
+        rozwiązywany raz), 'consecutive' - każdy punkt względem punktu go poprzedzającego
+    helmert : TUPLE (T, M), opcjonalnie
+        transformacja Helmerta danych XYZ do układu elipsoidy geo (macierz_helmerta), wykonywana
+        na każdym bloku przed przeliczeniem (XYZ -> Helmert -> BLH -> PL-2000 w jednym przejściu)
+    kafle : FLOAT, opcjonalnie
+        [st.] - rozmiar kafla; dla XYZ_PL2000 i BL_PL2000 każdy blok dzielony jest na kafle
+        i przeliczany strefami z jednym południkiem osiowym (przelicz_kafle)
+    '''
+    stan = {'tryb_neu': tryb_neu}
+    if helmert is not None:
+        stan['helmert'] = helmert
+    if kafle is not None:
+        stan['kafle'] = kafle
+    bloki = czytaj_bloki_pliku(plik, kolumny_wejscia[trans_wsp], rozmiar_bloku, bledne=bledne)
+    with ZapisWynikow(geo, trans_wsp, format_wyjscia) as wynik:
+        for dane in mierz_bloki(geo, 'wczytanie', bloki):
+            with geo.etap('przeliczenie', len(dane)):
+                blok = przelicz_blok(geo, trans_wsp, dane, stan)
+            wynik.zapisz(blok)
+
+
+def stan_do_zapisu(stan):
+    '''
+    Część stanu przelicz_blok potrzebna do kontynuacji w kolejnym uruchomieniu (początek układu NEU
+    lub ostatni punkt), zamieniona na listy zapisywalne w JSON.
+    '''
+    return {k: np.asarray(v).tolist() for k, v in stan.items() if k in ('XYZ0', 'fi0', 'lam0', 'ostatni')}
+
+
+def odcisk_pliku(plik, pozycja, okno=65536):
+    '''
+    Odcisk części pliku przeliczonej w trybie przyrostowym: SHA-256 pierwszych i ostatnich okno bajtów
+    przed pozycją. Pozwala rozpoznać plik zastąpiony innym (np. rotacja dobowa), nawet jeśli nowy plik
+    jest już dłuższy niż zapisana pozycja, bez ponownego czytania całej przeliczonej części.
+
+    Parametry
+    ----------
+    plik : STR
+    pozycja : INT
+        [B] - pozycja pierwszej nieprzeliczonej linii
+    okno : INT
+        [B] - rozmiar porównywanego początku i końca
+
+    Returns
+    -------
+    odcisk : STR
+    '''
+    skrot = hashlib.sha256()
+    with open(plik, 'rb') as f:
+        skrot.update(f.read(min(okno, pozycja)))
+        if pozycja > okno:
+            f.seek(max(okno, pozycja - okno))
+            skrot.update(f.read(pozycja - max(okno, pozycja - okno)))
+    return skrot.hexdigest()
+
+
+def przetworz_przyrost(geo, plik, trans_wsp, rozmiar_bloku=100000, bledne=None, tryb_neu='fixed', helmert=None,
+                       kafle=None, plik_stanu=None):
+    '''
+    Przyrostowe przeliczenie rosnącego pliku tekstowego: przeliczane są tylko linie dopisane od
+    poprzedniego uruchomienia, a wyniki dopisywane do pliku WYNIK_<funkcja>.txt. Obok pliku wyników
+    zapisywany jest plik stanu JSON z pozycją (w bajtach) pierwszej nieprzeliczonej linii, numerem
+    tej linii oraz stanem przelicz_blok (początek układu NEU lub ostatni punkt, dzięki czemu pary
+    XYZ_NEU 'consecutive' są ciągłe między uruchomieniami). Niepełna ostatnia linia (bez znaku końca
+    linii) czeka na kolejne uruchomienie. Stan zapisuje też rozmiar pliku wyników - wyniki dopisane
+    przez przerwane uruchomienie są obcinane. Jeśli plik stanu nie pasuje do ustawień, plik danych jest
+    krótszy niż zapisana pozycja, przeliczona część pliku danych ma inny odcisk (odcisk_pliku - plik
+    zastąpiony innym, np. przy rotacji) lub plik wyników jest krótszy niż zapisany, plik przeliczany
+    jest od początku.
+
+    Parametry
+    ----------
+    geo : Transformacje
+    plik : STR
+        plik tekstowy z danymi (pierwsze cztery linie są pomijane)
+    trans_wsp : STR
+        klucz ze słownika funkcje
+    rozmiar_bloku : INT
+        liczba linii (punktów) w bloku
+    bledne : LIST, opcjonalnie
+        lista, do której dopisywane są numery pominiętych, błędnych linii
+    tryb_neu, helmert, kafle :
+        jak w przetworz_plik
+    plik_stanu : STR, opcjonalnie
+        plik stanu (domyślnie WYNIK_<funkcja>_stan.json)
+
+    Returns
+    -------
+    liczba : INT
+        liczba przeliczonych punktów
+    '''
+    if os.path.splitext(plik)[1].lower() in formaty_binarne:
+        raise NotImplementedError(f"{plik} - tryb przyrostowy obsługuje tylko pliki tekstowe")
+    if plik_stanu is None:
+        plik_stanu = f"WYNIK_{trans_wsp.upper()}_stan.json"
+    ustawienia = {'plik': os.path.abspath(plik), 'funkcja': trans_wsp, 'elipsoida': [geo.a, geo.e2],
+                  'method': geo.method, 'tryb_neu': tryb_neu, 'kafle': kafle,
+                  'helmert': None if helmert is None else [np.asarray(p).tolist() for p in helmert]}
+    sciezka_wyniku = f"WYNIK_{trans_wsp.upper()}.txt"
+    zapisany = None
+    if os.path.exists(plik_stanu):
+        with open(plik_stanu, encoding="utf-8") as f:
+            zapisany = json.load(f)
+        if zapisany.get('ustawienia') != ustawienia or os.path.getsize(plik) < zapisany['pozycja'] \
+                or zapisany.get('odcisk') != odcisk_pliku(plik, zapisany['pozycja']) \
+                or not os.path.exists(sciezka_wyniku) or os.path.getsize(sciezka_wyniku) < zapisany['rozmiar_wyniku']:
+            zapisany = None
+        else:
+            os.truncate(sciezka_wyniku, zapisany['rozmiar_wyniku'])
+    stan = {'tryb_neu': tryb_neu}
+    if helmert is not None:
+        stan['helmert'] = helmert
+    if kafle is not None:
+        stan['kafle'] = kafle
+    if zapisany is None:
+        pozycja, nr, pomin = 0, 1, 4
+    else:
+        pozycja, nr, pomin = zapisany['pozycja'], zapisany['linia'], zapisany['pomin']
+        stan.update({k: np.array(v) for k, v in zapisany['stan'].items()})
+    liczba = 0
+    kolumny = kolumny_wejscia[trans_wsp]
+    with open(plik, 'rb') as dane_pliku, ZapisWynikow(geo, trans_wsp, 'txt', dopisz=zapisany is not None) as wynik:
+        dane_pliku.seek(pozycja)
+        while pomin:
+            linia = dane_pliku.readline()
+            if not linia.endswith(b'\n'):
+                dane_pliku.seek(pozycja)
+                break
+            pozycja += len(linia)
+            nr += 1
+            pomin -= 1
+        # dopóki nagłówek nie jest kompletny, linie danych nie są czytane
+        while not pomin:
+            linie = list(islice(dane_pliku, rozmiar_bloku))
+            if linie and not linie[-1].endswith(b'\n'):
+                linie.pop()
+            if not linie:
+                break
+            with geo.etap('wczytanie', len(linie)):
+                dane = parsuj_linie([l.decode('utf-8') for l in linie], kolumny, nr, bledne)
+            if len(dane):
+                with geo.etap('przeliczenie', len(dane)):
+                    blok = przelicz_blok(geo, trans_wsp, dane, stan)
+                wynik.zapisz(blok)
+                liczba += len(dane)
+            pozycja += sum(map(len, linie))
+            nr += len(linie)
+            if len(linie) < rozmiar_bloku:
+                break
+    tymczasowy = plik_stanu + ".tmp"
+    with open(tymczasowy, 'w', encoding="utf-8") as f:
+        json.dump({'ustawienia': ustawienia, 'pozycja': pozycja, 'odcisk': odcisk_pliku(plik, pozycja), 'linia': nr,
+                   'pomin': pomin, 'rozmiar_wyniku': os.path.getsize(sciezka_wyniku), 'stan': stan_do_zapisu(stan)}, f)
+    os.replace(tymczasowy, plik_stanu)
+    return liczba
+
+
+def sledz_plik(geo, plik, trans_wsp, interwal=1.0, **parametry):
+    '''
+    Tryb śledzenia: co interwal sekund sprawdza, czy plik się zmienił (rozmiar, czas modyfikacji lub
+    i-węzeł - także plik zastąpiony nowym), i przelicza nowe linie funkcją przetworz_przyrost
+    (parametry przekazywane są dalej). Działa do przerwania (Ctrl+C).
+    '''
+    poprzedni = None
+    try:
+        while True:
+            info = os.stat(plik)
+            if (info.st_size, info.st_mtime_ns, info.st_ino) != poprzedni:
+                poprzedni = (info.st_size, info.st_mtime_ns, info.st_ino)
+                liczba = przetworz_przyrost(geo, plik, trans_wsp, **parametry)
+                if liczba:
+                    print(f"{time.strftime('%H:%M:%S')} dopisano {liczba} punktów do WYNIK_{trans_wsp.upper()}.txt", flush=True)
+            time.sleep(interwal)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
     argumenty = sys.argv[1:]
 
     if not all(param in argumenty for param in ['-plik', '-elip', '-funkcja']):
@@ -610,44 +2962,88 @@ if __name__ == "__main__":
         elip = argumenty[argumenty.index('-elip') + 1]
         trans_wsp = argumenty[argumenty.index('-funkcja') + 1]
         plik = argumenty[argumenty.index('-plik') + 1]
+        rozmiar_bloku = int(argumenty[argumenty.index('-blok') + 1]) if '-blok' in argumenty else 100000
+        workers = int(argumenty[argumenty.index('--workers') + 1]) if '--workers' in argumenty else 1
+        profilowanie = '--profile' in argumenty
+        format_wyjscia = argumenty[argumenty.index('--out-format') + 1] if '--out-format' in argumenty else 'txt'
+        rozmiar_pamieci = int(argumenty[argumenty.index('--cache') + 1]) if '--cache' in argumenty else None
+        tryb_neu = argumenty[argumenty.index('--neu-mode') + 1] if '--neu-mode' in argumenty else 'fixed'
+        datum = argumenty[argumenty.index('--datum') + 1] if '--datum' in argumenty else None
+        plik_tablicy = argumenty[argumenty.index('--grid') + 1] if '--grid' in argumenty else None
+        blad_tablicy = float(argumenty[argumenty.index('--grid-error') + 1]) if '--grid-error' in argumenty else 1e-4
+        rozmiar_kafla = float(argumenty[argumenty.index('--tiles') + 1]) if '--tiles' in argumenty else None
+        przyrostowo = '--incremental' in argumenty or '--follow' in argumenty
+        interwal = None
+        if '--follow' in argumenty:
+            nastepny = argumenty[argumenty.index('--follow') + 1:argumenty.index('--follow') + 2]
+            interwal = float(nastepny[0]) if nastepny and not nastepny[0].startswith('-') else 1.0
     except IndexError:
         raise Exception('Nie podano wartości dla wszystkich wymaganych parametrów')
+    except ValueError:
+        raise Exception('Rozmiar bloku (-blok), liczba procesów (--workers) i rozmiar pamięci (--cache) muszą być liczbami całkowitymi, a błąd tablicy (--grid-error), rozmiar kafla (--tiles) i interwał (--follow) liczbami')
 
     if elip not in elipsoidy:
         raise Exception('Podano niewłaściwy typ modelu elipsoidy. Podaj jeden z dostępnych: GRS80, WGS84, Krasowski.')
 
     elipsoida = elipsoidy[elip]
     geo = Transformacje(elipsoida)
+    if profilowanie:
+        geo.profil = Profil()
+    if rozmiar_pamieci is not None:
+        geo.pamiec = PamiecPodreczna(rozmiar_pamieci)
+    if plik_tablicy is not None:
+        try:
+            geo.tablica = tablica_gk(geo.a, geo.e2, plik_tablicy, blad_tablicy)
+        except ValueError as blad:
+            print(f"Tablica interpolacyjna nie zostanie użyta ({blad}).")
 
     if trans_wsp not in funkcje:
-        raise Exception('Skrypt nie obsługuje podanej transformacji. Podaj jedną z możliwych: XYZ_BLH, BLH_XYZ, XYZ_NEU, BL_PL2000, BL_PL1992.')
+        raise Exception(f'Skrypt nie obsługuje podanej transformacji. Podaj jedną z możliwych: {", ".join(funkcje)}.')
+
+    if format_wyjscia not in formaty_wyjscia:
+        raise Exception(f'Nieobsługiwany format wyników (--out-format). Podaj jeden z możliwych: {", ".join(formaty_wyjscia)}.')
+
+    if tryb_neu not in tryby_neu:
+        raise Exception(f'Nieobsługiwany tryb NEU (--neu-mode). Podaj jeden z możliwych: {", ".join(tryby_neu)}.')
+
+    if rozmiar_kafla is not None and (trans_wsp not in ('XYZ_PL2000', 'BL_PL2000') or not 0 < rozmiar_kafla <= 6.1):
+        raise Exception('Podział na kafle (--tiles) obsługują funkcje XYZ_PL2000 i BL_PL2000, a rozmiar kafla musi mieścić się w zakresie (0, 6.1] stopnia.')
+    if rozmiar_kafla is not None:
+        try:
+            Kafle.siatka(geo, rozmiar_kafla)
+        except ValueError as blad:
+            raise Exception(f'Zbyt mały rozmiar kafla (--tiles): {blad}.')
 
+    if przyrostowo and (workers > 1 or format_wyjscia != 'txt' or os.path.splitext(plik)[1].lower() in formaty_binarne):
+        raise Exception('Tryb przyrostowy (--incremental, --follow) obsługuje tylko pliki tekstowe, format txt i jeden proces.')
+
+    parametry_helmerta = None
+    if datum is not None:
+        if not trans_wsp.startswith('XYZ'):
+            raise Exception('Transformacja między układami odniesienia (--datum) dotyczy tylko funkcji z danymi XYZ.')
+        if datum not in elipsoidy:
+            raise Exception(f'Nieznany układ danych wejściowych (--datum). Podaj jeden z możliwych: {", ".join(elipsoidy)}.')
+        try:
+            parametry_helmerta = macierz_helmerta(datum, elip)
+        except NotImplementedError as blad:
+            raise Exception(f'Brak transformacji między układami (--datum): {blad}')
+
+    bledne = []
     try:
-        with open(plik, 'r') as f, open(f"WYNIK_{trans_wsp.upper()}.txt", 'w') as wynik:
-            linie = f.readlines()[4:]  # Pominięcie pierwszych czterech linii
-            for index, linia in enumerate(linie):
-                linia = linia.strip()
-                if trans_wsp in ['XYZ_BLH', 'BLH_XYZ', 'XYZ_NEU']:
-                    x_str, y_str, z_str = linia.split(',')
-                    x, y, z = float(x_str), float(y_str), float(z_str)
-                    if trans_wsp == 'XYZ_BLH':
-                        result = geo.algorytm_hirvonena(x, y, z)
-                    elif trans_wsp == 'BLH_XYZ':
-                        result = geo.odwrotny_hirvonen(x, y, z)
-                    elif trans_wsp == 'XYZ_NEU':
-                        if index == 0:
-                            X0, Y0, Z0 = x, y, z
-                            continue
-                        result = geo.xyz2neu(X0, Y0, Z0, x, y, z)
-                    wynik.write(' '.join(map(str, result)) + '\n')
-                else:
-                    fi_str, lam_str = linia.split(',')
-                    fi, lam = float(fi_str), float(lam_str)
-                    if trans_wsp == 'BL_PL2000':
-                        result = geo.flh2PL2000(fi, lam)
-                    elif trans_wsp == 'BL_PL1992':
-                        result = geo.flh2PL1992(fi, lam)
-                    wynik.write(' '.join(map(str, result)) + '\n')
+        if interwal is not None:
+            print(f'Śledzenie pliku {plik} (co {interwal} s, Ctrl+C kończy)')
+            sledz_plik(geo, plik, trans_wsp, interwal, rozmiar_bloku=rozmiar_bloku, bledne=bledne, tryb_neu=tryb_neu,
+                       helmert=parametry_helmerta, kafle=rozmiar_kafla)
+        elif przyrostowo:
+            liczba = przetworz_przyrost(geo, plik, trans_wsp, rozmiar_bloku, bledne, tryb_neu, parametry_helmerta,
+                                        rozmiar_kafla)
+            print(f'Przeliczono {liczba} nowych punktów.')
+        elif workers > 1:
+            przetworz_plik_rownolegle(geo, plik, trans_wsp, workers, rozmiar_bloku, bledne, format_wyjscia, tryb_neu,
+                                      parametry_helmerta, rozmiar_kafla)
+        else:
+            przetworz_plik(geo, plik, trans_wsp, rozmiar_bloku, bledne, format_wyjscia, tryb_neu, parametry_helmerta,
+                           rozmiar_kafla)
     except FileNotFoundError:
         raise Exception('Podany plik nie istnieje. Podaj inny plik, sprawdź jego lokalizację lub sprawdź nazwę podanego pliku.')
     except (KeyError, IndexError, ValueError):
@@ -655,4 +3051,16 @@ if __name__ == "__main__":
     except AttributeError:
         print("Podana funkcja/elipsoida nie istnieje, proszę wprowadzić dostępne wartości.")
 
-    print('Zapisano. Wyniki znajdują się w pliku WYNIK_<funkcja>.txt')
\ No newline at end of file
+    if bledne:
+        print(f"Pominięto {len(bledne)} błędnych linii: {', '.join(map(str, bledne[:20]))}{' ...' if len(bledne) > 20 else ''}")
+    print(f'Zapisano. Wyniki znajdują się w pliku WYNIK_{trans_wsp.upper()}.{format_wyjscia}')
+    # przy --workers N pamięci podręczne mają procesy puli, więc statystyki procesu głównego są puste
+    statystyki_pamieci = geo.pamiec is not None and workers <= 1
+    if statystyki_pamieci:
+        statystyki = geo.pamiec.statystyki()
+        print(f"Pamięć podręczna: {statystyki['trafienia']} trafień, {statystyki['chybienia']} chybień")
+    if profilowanie:
+        opis = {'pamiec': geo.pamiec.statystyki()} if statystyki_pamieci else {}
+        geo.profil.zapisz(f"WYNIK_{trans_wsp.upper()}_profil.json", funkcja=trans_wsp, plik=plik, elipsoida=elip,
+                          workers=workers, rozmiar_bloku=rozmiar_bloku, **opis)
+        print(f'Profil przetwarzania zapisano w pliku WYNIK_{trans_wsp.upper()}_profil.json')